@@ -0,0 +1,150 @@
+"""
+Encoder Benchmark for NEF Converter
+
+Compares encode time and output size across output formats and encoder
+options, on one decoded synthetic raw (see nef_converter.synthetic).
+
+Usage:
+    python benchmarks/bench_encoders.py --megapixels 24 --json encoders.json
+    python benchmarks/bench_encoders.py --quick
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import rawpy
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nef_converter.converter import _array_to_image  # noqa: E402
+from nef_converter.encoders import ENCODERS, get_encoder  # noqa: E402
+from nef_converter.report import _percentile  # noqa: E402
+from nef_converter.synthetic import make_synthetic_raw  # noqa: E402
+
+# (format, options) pairs to compare; quality comes from --quality
+VARIANTS: List[Tuple[str, Dict[str, Any]]] = [
+    ("JPEG", {}),
+    ("JPEG", {"optimize": True}),
+    ("JPEG", {"progressive": True}),
+    ("JPEG", {"subsampling": "4:4:4"}),
+    ("WEBP", {"method": 0}),
+    ("WEBP", {"method": 4}),
+    ("WEBP", {"method": 6}),
+    ("AVIF", {"speed": 10}),
+    ("AVIF", {"speed": 6}),
+    ("PNG", {"compress_level": 1}),
+    ("PNG", {"compress_level": 6}),
+    ("TIFF", {"bits": 8, "compression": "none"}),
+    ("TIFF", {"bits": 16, "compression": "none"}),
+    ("TIFF", {"bits": 16, "compression": "deflate"}),
+]
+
+
+def _decode(raw: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode a raw file to 8-bit and 16-bit RGB arrays."""
+    with rawpy.imread(io.BytesIO(raw)) as image:
+        rgb16 = image.postprocess(output_bps=16)
+    return np.right_shift(rgb16, 8).astype(np.uint8), rgb16
+
+
+def bench_variant(
+    name: str,
+    options: Dict[str, Any],
+    rgb8: np.ndarray,
+    rgb16: np.ndarray,
+    quality: int,
+    repeats: int,
+) -> Dict[str, Any]:
+    """
+    Time one encoder configuration.
+
+    Args:
+        name: Format name
+        options: Encoder option overrides
+        rgb8: Decoded 8-bit frame
+        rgb16: Decoded 16-bit frame
+        quality: Quality for lossy formats
+        repeats: Number of timed encodes
+
+    Returns:
+        Result row with encode latency percentiles and output size
+    """
+    encoder = get_encoder(name)
+    resolved = encoder.options(options)
+    pixels = rgb16 if encoder.bit_depth(resolved) > 8 else _array_to_image(rgb8)
+
+    latencies = []
+    size = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        size = len(encoder.encode(pixels, quality, resolved))
+        latencies.append(time.perf_counter() - start)
+
+    megapixels = rgb8.shape[0] * rgb8.shape[1] / 1e6
+    return {
+        "format": name,
+        "options": options,
+        "quality": quality,
+        "encode_p50": _percentile(latencies, 50),
+        "encode_p95": _percentile(latencies, 95),
+        "megapixels_per_second": megapixels / _percentile(latencies, 50),
+        "output_bytes": size,
+        "bits_per_pixel": size * 8 / (megapixels * 1e6),
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print or save the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--quality", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="1 MP, one repeat")
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.megapixels, args.repeats = 1.0, 1
+
+    width = int((args.megapixels * 1e6 * 3 / 2) ** 0.5)
+    rgb8, rgb16 = _decode(make_synthetic_raw(width, width * 2 // 3))
+
+    results = []
+    for name, options in VARIANTS:
+        if name not in ENCODERS:
+            print(f"{name:5s} skipped: no encoder available")
+            continue
+        row = bench_variant(name, options, rgb8, rgb16, args.quality, args.repeats)
+        results.append(row)
+        label = ", ".join(f"{key}={value}" for key, value in options.items())
+        print(
+            f"{name:5s} {label:36s} "
+            f"p50 {row['encode_p50'] * 1000:8.1f} ms  "
+            f"{row['megapixels_per_second']:7.1f} MP/s  "
+            f"{row['output_bytes'] / 2**20:8.2f} MB  "
+            f"{row['bits_per_pixel']:6.2f} bpp"
+        )
+
+    if args.json:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "megapixels": args.megapixels,
+            },
+            "results": results,
+        }
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
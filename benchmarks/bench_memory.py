@@ -0,0 +1,191 @@
+"""
+Peak Memory Benchmark for NEF Converter
+
+Measures memory per converted file around the decode-to-encode hand-off.
+Each variant runs in a fresh interpreter so that the high-water mark
+reflects a single conversion:
+
+- legacy: Image.fromarray() with the source bytes and the NumPy array
+  kept alive through encoding (the pipeline before the hand-off rework)
+- current: NEFConverter._convert(), which hashes and reads EXIF from a
+  mapping of the file, lets LibRaw decode from the path, and hands the
+  array to Pillow with Image.frombuffer(), releasing it before encoding
+
+Two numbers are reported per variant: the peak RSS increase over the
+whole conversion, and the RSS increase still resident when JPEG encoding
+starts. The peak is reached inside postprocess(), while LibRaw's buffers
+and the output array are alive; the current pipeline no longer holds a
+copy of the file then. rawpy is replaced by a stand-in that allocates
+LibRaw-sized working buffers and returns a synthetic frame, so no NEF
+files are needed. Unix only (uses resource; encode RSS needs /proc).
+
+Usage:
+    python benchmarks/bench_memory.py --megapixels 24 45 --json memory.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# Bytes per pixel of a typical 14-bit lossless compressed NEF
+NEF_BYTES_PER_PIXEL = 1.1
+
+VARIANTS = ("legacy", "current")
+
+
+class _FakeRaw:
+    """rawpy stand-in that decodes to a synthetic frame."""
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self._buffers: List[Any] = []
+
+    def __enter__(self) -> "_FakeRaw":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._buffers.clear()
+
+    def postprocess(self, **params: Any) -> Any:
+        import numpy as np
+
+        # LibRaw keeps the Bayer data and a 4x16-bit working image until close
+        for shape in ((self.height, self.width), (self.height, self.width, 4)):
+            buffer = np.empty(shape, dtype=np.uint16)
+            buffer.fill(1)
+            self._buffers.append(buffer)
+
+        rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        rgb[...] = np.arange(self.width, dtype=np.uint8)[None, :, None]
+        return rgb
+
+
+def _peak_rss_bytes() -> int:
+    """Get this process's peak RSS in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _current_rss_bytes() -> int:
+    """Get this process's current RSS in bytes (0 where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return 0
+
+
+def _frame_size(megapixels: float) -> Tuple[int, int]:
+    """Get the width and height of a 3:2 frame."""
+    width = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    return width, width * 2 // 3
+
+
+def _run_variant(variant: str, megapixels: float, source: Path, queue: Any) -> None:
+    """Convert one synthetic file and report its memory use."""
+    from unittest.mock import patch
+
+    from PIL import Image
+
+    from nef_converter.converter import NEFConverter
+
+    fake_raw = _FakeRaw(*_frame_size(megapixels))
+    output = source.with_suffix(f".{variant}.jpg")
+    encode_rss = []
+    original_save = Image.Image.save
+
+    def recording_save(img: Any, *args: Any, **kwargs: Any) -> None:
+        encode_rss.append(_current_rss_bytes())
+        original_save(img, *args, **kwargs)
+
+    baseline_peak = _peak_rss_bytes()
+    baseline_rss = _current_rss_bytes()
+    with patch.object(Image.Image, "save", recording_save):
+        if variant == "legacy":
+            # Source bytes and array stay referenced until encoding is done
+            alive = [source.read_bytes()]
+            with fake_raw as raw:
+                alive.append(raw.postprocess())
+            img = Image.fromarray(alive[-1])
+            img.save(str(output), "JPEG", quality=95)
+            alive.clear()
+        else:
+            converter = NEFConverter(preserve_exif=False)
+            with patch("nef_converter.converter.rawpy.imread", return_value=fake_raw):
+                converter._convert(source, output)
+
+    queue.put(
+        {
+            "peak_rss_bytes": _peak_rss_bytes() - baseline_peak,
+            "encode_rss_bytes": max(encode_rss[0] - baseline_rss, 0),
+        }
+    )
+
+
+def measure(variant: str, megapixels: float, source: Path) -> Dict[str, int]:
+    """
+    Measure the memory use of converting one file in a fresh interpreter.
+
+    Args:
+        variant: One of VARIANTS
+        megapixels: Size of the synthetic frame
+        source: Placeholder NEF file of realistic size
+
+    Returns:
+        Peak RSS increase and RSS increase at encode start, in bytes
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_variant, args=(variant, megapixels, source, queue)
+    )
+    process.start()
+    result: Dict[str, int] = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    """Run the benchmark and print or save the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--megapixels", type=float, nargs="+", default=[24.0, 45.7], metavar="MP"
+    )
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.megapixels:
+            # Written here so the file contents never count towards a child's peak
+            width, height = _frame_size(megapixels)
+            source = Path(tmp) / f"frame_{megapixels}.nef"
+            source.write_bytes(bytes(int(width * height * NEF_BYTES_PER_PIXEL)))
+
+            row: Dict[str, Any] = {"megapixels": megapixels}
+            for variant in VARIANTS:
+                row[variant] = measure(variant, megapixels, source)
+            results.append(row)
+
+            print(f"{megapixels:6.1f} MP:")
+            for variant in VARIANTS:
+                print(
+                    f"    {variant:8s} peak {row[variant]['peak_rss_bytes'] / 2**20:7.1f} MB"
+                    f", at encode {row[variant]['encode_rss_bytes'] / 2**20:7.1f} MB"
+                )
+
+    if args.json:
+        args.json.write_text(json.dumps({"memory": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
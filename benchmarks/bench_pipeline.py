@@ -0,0 +1,306 @@
+"""
+Pipeline Benchmark for NEF Converter
+
+Times each stage of the conversion pipeline and end-to-end batch
+throughput on synthetic raw files (see nef_converter.synthetic), so it runs
+offline and results can be compared across commits.
+
+Benchmarks:
+- discovery: recursive iter_nef_files() over a nested tree
+- decode: rawpy postprocess() of one synthetic raw
+- encode: JPEG encoding of the decoded frame, per quality
+- exif: EXIF extraction from the in-memory file
+- batch: convert_batch() for every combination of worker count, quality
+  and file count, each in a fresh interpreter
+
+Every result row carries files/s, p50/p95 per-file latency in seconds and
+peak RSS in bytes (peak RSS needs the resource module, so Unix only).
+
+Usage:
+    python benchmarks/bench_pipeline.py --json results.json
+    python benchmarks/bench_pipeline.py --quick
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess  # nosec: B404
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from nef_converter.adjustments import Adjustments, apply_adjustments  # noqa: E402
+from nef_converter.converter import NEFConverter  # noqa: E402
+from nef_converter.report import _percentile  # noqa: E402
+from nef_converter.synthetic import make_synthetic_raw  # noqa: E402
+
+Result = Dict[str, Any]
+
+
+def _peak_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """Get the peak RSS of this process or its children, in bytes."""
+    if who == resource.RUSAGE_SELF:
+        # ru_maxrss survives exec, so a spawned child would report its
+        # parent's peak; VmHWM starts afresh with the new address space
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _frame_size(megapixels: float) -> List[int]:
+    """Get the width and height of a 3:2 frame."""
+    width = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    return [width, width * 2 // 3]
+
+
+def _summarise(name: str, params: Dict[str, Any], latencies: List[float]) -> Result:
+    """Build a result row from per-item latencies."""
+    total = sum(latencies)
+    return {
+        "benchmark": name,
+        "params": params,
+        "files_per_second": len(latencies) / total if total > 0 else 0.0,
+        "latency_p50": _percentile(latencies, 50),
+        "latency_p95": _percentile(latencies, 95),
+        "peak_rss_bytes": _peak_rss_bytes(),
+    }
+
+
+def _time_repeats(action: Callable[[], Any], repeats: int) -> List[float]:
+    """Run an action repeatedly and return the duration of each run."""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        action()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_discovery(tmp: Path, directories: int, files_per_directory: int) -> Result:
+    """Time recursive discovery over a tree of empty placeholder files."""
+    root = tmp / "discovery"
+    for index in range(directories):
+        folder = root / f"{2000 + index % 25}" / f"{index:04d}"
+        folder.mkdir(parents=True)
+        for number in range(files_per_directory):
+            suffix = ".NEF" if number % 2 else ".nef"
+            (folder / f"DSC_{number:04d}{suffix}").touch()
+            (folder / f"DSC_{number:04d}.xmp").touch()
+
+    converter = NEFConverter()
+    start = time.perf_counter()
+    found = sum(1 for _ in converter.iter_nef_files(root, recursive=True))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "benchmark": "discovery",
+        "params": {"directories": directories, "files": found},
+        "files_per_second": found / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": elapsed / found,
+        "latency_p95": elapsed / found,
+        "peak_rss_bytes": _peak_rss_bytes(),
+    }
+
+
+def bench_stages(
+    raw: bytes, megapixels: float, qualities: List[int], repeats: int
+) -> List[Result]:
+    """Time decode, adjust, encode and EXIF extraction on one synthetic raw."""
+    import rawpy
+    from PIL import Image
+
+    def decode() -> Any:
+        with rawpy.imread(io.BytesIO(raw)) as image:
+            return image.postprocess()
+
+    results = [
+        _summarise("decode", {"megapixels": megapixels}, _time_repeats(decode, repeats))
+    ]
+
+    img = Image.fromarray(decode())
+    for quality in qualities:
+        results.append(
+            _summarise(
+                "encode",
+                {"megapixels": megapixels, "quality": quality},
+                _time_repeats(
+                    lambda: img.save(io.BytesIO(), "JPEG", quality=quality), repeats
+                ),
+            )
+        )
+
+    with rawpy.imread(io.BytesIO(raw)) as image:
+        rgb16 = image.postprocess(output_bps=16)
+    adjustments = Adjustments(downscale=2, contrast=0.2, sharpen=0.5, dither=True)
+    results.append(
+        _summarise(
+            "adjust",
+            {"megapixels": megapixels, "downscale": 2, "sharpen": 0.5},
+            _time_repeats(lambda: apply_adjustments(rgb16, adjustments), repeats),
+        )
+    )
+
+    converter = NEFConverter()
+    results.append(
+        _summarise(
+            "exif",
+            {"megapixels": megapixels},
+            _time_repeats(
+                lambda: converter._extract_exif_data(Path("frame.nef"), raw),
+                repeats * 10,
+            ),
+        )
+    )
+    return results
+
+
+def _run_batch(directory: str, workers: int, quality: int, queue: Any) -> None:
+    """Convert a directory in a fresh interpreter and report the results."""
+    import logging
+    from unittest.mock import patch
+
+    logging.disable(logging.INFO)
+    os.environ["TQDM_DISABLE"] = "1"
+    converter = NEFConverter(quality=quality, max_workers=workers)
+    with (
+        tempfile.TemporaryDirectory() as output,
+        patch.object(NEFConverter, "_open_directory"),
+    ):
+        successful, total, stats = converter.convert_batch(
+            directory, parallel=workers > 1, output_directory=output
+        )
+    peak = max(_peak_rss_bytes(), _peak_rss_bytes(resource.RUSAGE_CHILDREN))
+    queue.put({"successful": successful, "total": total, "stats": stats, "peak": peak})
+
+
+def bench_batch(
+    tmp: Path,
+    raw: bytes,
+    megapixels: float,
+    file_counts: List[int],
+    worker_counts: List[int],
+    qualities: List[int],
+) -> List[Result]:
+    """Measure convert_batch() throughput over the parameter sweep."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for file_count in file_counts:
+        directory = tmp / f"batch_{file_count}"
+        directory.mkdir()
+        for index in range(file_count):
+            (directory / f"DSC_{index:04d}.nef").write_bytes(raw)
+
+        for workers in worker_counts:
+            for quality in qualities:
+                queue = context.Queue()
+                process = context.Process(
+                    target=_run_batch, args=(str(directory), workers, quality, queue)
+                )
+                process.start()
+                outcome = queue.get()
+                process.join()
+
+                stats = outcome["stats"]
+                results.append(
+                    {
+                        "benchmark": "batch",
+                        "params": {
+                            "megapixels": megapixels,
+                            "files": file_count,
+                            "workers": workers,
+                            "quality": quality,
+                        },
+                        "successful": outcome["successful"],
+                        "files_per_second": stats.get("files_per_second", 0.0),
+                        "latency_p50": stats.get("latency_p50", 0.0),
+                        "latency_p95": stats.get("latency_p95", 0.0),
+                        "peak_rss_bytes": outcome["peak"],
+                    }
+                )
+    return results
+
+
+def _git_revision() -> str:
+    """Get the current commit, or an empty string outside a git checkout."""
+    try:
+        return subprocess.run(  # nosec: B603, B607
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    """Run the benchmarks and print or save the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--quality", type=int, nargs="+", default=[85, 95])
+    parser.add_argument("--files", type=int, nargs="+", default=[8])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--quick", action="store_true", help="Small frames and sweeps for smoke runs"
+    )
+    parser.add_argument("--json", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.megapixels, args.workers, args.files, args.repeats = 1.0, [1, 2], [4], 2
+
+    width, height = _frame_size(args.megapixels)
+    raw = make_synthetic_raw(width, height)
+
+    results: List[Result] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results.append(bench_discovery(Path(tmp), 200, 25 if args.quick else 250))
+        results += bench_stages(raw, args.megapixels, args.quality, args.repeats)
+        results += bench_batch(
+            Path(tmp), raw, args.megapixels, args.files, args.workers, args.quality
+        )
+
+    for result in results:
+        params = ", ".join(f"{key}={value}" for key, value in result["params"].items())
+        print(
+            f"{result['benchmark']:9s} {params:50s} "
+            f"{result['files_per_second']:10.2f} files/s  "
+            f"p50 {result['latency_p50'] * 1000:8.2f} ms  "
+            f"p95 {result['latency_p95'] * 1000:8.2f} ms  "
+            f"peak {result['peak_rss_bytes'] / 2**20:7.1f} MB"
+        )
+
+    if args.json:
+        report = {
+            "meta": {
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "megapixels": args.megapixels,
+            },
+            "results": results,
+        }
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,32 @@ NEF Converter Package
 A modern Python package for converting Nikon NEF raw files to JPEG format.
 """
 
+from typing import Any, List
+
 __version__ = "2.0.0"
 __author__ = "r4inX"
 __email__ = "your-email@example.com"
 
-# Import main components
-try:
-    from .converter import NEFConverter  # noqa: F401
-    from .main import main  # noqa: F401
+__all__ = ["NEFConverter", "main"]
+
+# Public names and the submodules that define them. They are imported on
+# first access (PEP 562), so importing the package, e.g. for the CLI or in a
+# pool worker, does not pull in rawpy, numpy, Pillow or tkinter.
+_LAZY_ATTRIBUTES = {"NEFConverter": ".converter", "main": ".main"}
+
+
+def __getattr__(name: str) -> Any:
+    """Import public names from their submodules on first access."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
-    __all__ = ["NEFConverter", "main"]
-except ImportError:
-    # Handle cases where dependencies aren't installed yet
-    __all__ = []
+def __dir__() -> List[str]:
+    """List module attributes including the lazily imported names."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,243 @@
+"""
+Image Adjustments for NEF Converter
+
+An optional stage between raw decoding and encoding that works directly on
+the decoded NumPy RGB array: exposure and contrast through a precomputed
+lookup table, area-average downscaling, unsharp masking and reduction to 8
+bits with ordered dithering. Every step is vectorised, and the image is
+processed in bands of rows so the floating-point working copies stay small
+however large the image is.
+"""
+
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+import numpy as np
+
+# Output rows per band; bounds the float32 working copies to a few tens of
+# megabytes for full-frame sensors
+ADJUST_TILE_ROWS = 256
+
+# Largest unsharp mask radius (Gaussian sigma) in output pixels
+MAX_SHARPEN_RADIUS = 10.0
+
+# Largest exposure change in stops
+MAX_EXPOSURE = 10.0
+
+# 4x4 Bayer matrix for ordered dithering, as thresholds in (-0.5, 0.5).
+# Ordered dither is deterministic, so identical sources convert to identical
+# files, and needs no state shared between bands.
+BAYER_MATRIX = (
+    np.array(
+        [[0, 8, 2, 10], [12, 4, 14, 6], [3, 11, 1, 9], [15, 7, 13, 5]],
+        dtype=np.float32,
+    )
+    + 0.5
+) / 16 - 0.5
+
+
+@dataclass(frozen=True)
+class Adjustments:
+    """
+    Adjustments applied to every decoded image.
+
+    Attributes:
+        downscale: Integer factor to shrink by, averaging each block of
+            downscale x downscale pixels (1 = original size)
+        exposure: Exposure change in stops; highlights clip
+        contrast: S-curve strength around mid-grey, above -1; positive
+            values add contrast, negative values reduce it
+        sharpen: Unsharp mask amount (0 = off)
+        sharpen_radius: Unsharp mask radius (Gaussian sigma) in pixels
+        dither: Dither when reducing 16-bit data to 8 bits, instead of
+            rounding, which avoids banding in smooth gradients
+    """
+
+    downscale: int = 1
+    exposure: float = 0.0
+    contrast: float = 0.0
+    sharpen: float = 0.0
+    sharpen_radius: float = 1.0
+    dither: bool = False
+
+    def __post_init__(self) -> None:
+        """
+        Validate the adjustments.
+
+        Raises:
+            ValueError: If a value is out of range
+        """
+        if self.downscale < 1:
+            raise ValueError("Downscale factor must be at least 1")
+        if not abs(self.exposure) <= MAX_EXPOSURE:
+            raise ValueError(f"Exposure must be within ±{MAX_EXPOSURE:g} stops")
+        if not -1 < self.contrast <= 1:
+            raise ValueError("Contrast must be above -1 and at most 1")
+        if not self.sharpen >= 0:
+            raise ValueError("Sharpen amount must not be negative")
+        if not 0 < self.sharpen_radius <= MAX_SHARPEN_RADIUS:
+            raise ValueError(
+                f"Sharpen radius must be above 0 and at most {MAX_SHARPEN_RADIUS:g}"
+            )
+
+    @property
+    def active(self) -> bool:
+        """Whether the adjustments change the image at all."""
+        return self != Adjustments(sharpen_radius=self.sharpen_radius)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the adjustments as a JSON-compatible dict."""
+        return asdict(self)
+
+
+def tone_lut(adjustments: Adjustments, levels: int) -> np.ndarray:
+    """
+    Build the lookup table applying exposure and contrast.
+
+    Args:
+        adjustments: Exposure and contrast to apply
+        levels: Number of input levels, 256 or 65536
+
+    Returns:
+        float32 array mapping each input level to an output value in [0, 1]
+    """
+    values = np.linspace(0.0, 1.0, levels)
+    if adjustments.exposure:
+        values = np.minimum(values * 2.0**adjustments.exposure, 1.0)
+    if adjustments.contrast:
+        # Power curves meeting at mid-grey keep black and white fixed
+        power = 1.0 + adjustments.contrast
+        values = np.where(
+            values < 0.5,
+            0.5 * (2.0 * values) ** power,
+            1.0 - 0.5 * (2.0 * (1.0 - values)) ** power,
+        )
+    lut: np.ndarray = values.astype(np.float32)
+    return lut
+
+
+def _gaussian_kernel(sigma: float) -> np.ndarray:
+    """Build a normalised 1-D Gaussian kernel reaching three sigmas."""
+    reach = max(1, math.ceil(3 * sigma))
+    taps = np.arange(-reach, reach + 1, dtype=np.float32)
+    kernel = np.exp(-(taps**2) / (2 * sigma**2))
+    normalised: np.ndarray = kernel / kernel.sum()
+    return normalised
+
+
+def _area_downscale(band: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Average each block of factor x factor pixels.
+
+    Summing strided views is several times faster than a reshaped mean,
+    which reduces over non-contiguous axes.
+    """
+    total = band[::factor, ::factor].copy()
+    for row in range(factor):
+        for column in range(factor):
+            if row or column:
+                total += band[row::factor, column::factor]
+    total *= 1.0 / factor**2
+    return total
+
+
+def _blur(padded: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """
+    Blur a band padded by the kernel's reach on every side.
+
+    Each separable pass sums shifted views of the band, so the work is a
+    few whole-array operations per kernel tap.
+    """
+    reach = len(kernel) // 2
+    rows = padded.shape[0] - 2 * reach
+    columns = padded.shape[1] - 2 * reach
+    vertical = kernel[0] * padded[:rows]
+    for tap in range(1, len(kernel)):
+        vertical += kernel[tap] * padded[tap : tap + rows]
+    blurred = kernel[0] * vertical[:, :columns]
+    for tap in range(1, len(kernel)):
+        blurred += kernel[tap] * vertical[:, tap : tap + columns]
+    return blurred
+
+
+def _quantize(band: np.ndarray, bits: int, dither: bool, top: int) -> np.ndarray:
+    """Convert values in [0, 1] to 8- or 16-bit samples."""
+    if bits == 16:
+        return np.clip(np.rint(band * 65535.0), 0, 65535).astype(np.uint16)
+    scaled = band * 255.0
+    if dither:
+        # Thresholds follow image coordinates, so bands join seamlessly
+        rows, columns = band.shape[:2]
+        offset = top % len(BAYER_MATRIX)
+        reps = ((offset + rows) // 4 + 1, columns // 4 + 1)
+        threshold = np.tile(BAYER_MATRIX, reps)[offset : offset + rows, :columns]
+        scaled += threshold[:, :, None]
+    return np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+
+
+def apply_adjustments(
+    rgb: np.ndarray, adjustments: Adjustments, bits: int = 8
+) -> np.ndarray:
+    """
+    Apply adjustments to a decoded image.
+
+    The steps run per band of ADJUST_TILE_ROWS output rows: tone lookup,
+    area-average downscale, unsharp mask, then quantisation. Bands read a
+    margin of neighbouring rows for the blur, so they join seamlessly.
+
+    Args:
+        rgb: Array of shape (height, width, 3) with dtype uint8 or uint16
+        adjustments: Adjustments to apply
+        bits: Sample depth of the result, 8 or 16
+
+    Returns:
+        Adjusted array of shape (height // downscale, width // downscale,
+        3), dtype uint8 or uint16; rows and columns beyond a whole multiple
+        of the factor are dropped
+
+    Raises:
+        ValueError: If the image is smaller than the downscale factor, or
+            bits is not 8 or 16
+    """
+    if bits not in (8, 16):
+        raise ValueError(f"Unsupported sample depth: {bits} (expected 8 or 16)")
+    factor = adjustments.downscale
+    height, width = rgb.shape[0] // factor, rgb.shape[1] // factor
+    if not height or not width:
+        raise ValueError(
+            f"A {rgb.shape[1]}x{rgb.shape[0]} image cannot be downscaled {factor}x"
+        )
+
+    lut = tone_lut(adjustments, 65536 if rgb.dtype == np.uint16 else 256)
+    kernel = (
+        _gaussian_kernel(adjustments.sharpen_radius) if adjustments.sharpen else None
+    )
+    reach = len(kernel) // 2 if kernel is not None else 0
+    result = np.empty((height, width, 3), dtype=np.uint16 if bits == 16 else np.uint8)
+
+    for top in range(0, height, ADJUST_TILE_ROWS):
+        bottom = min(top + ADJUST_TILE_ROWS, height)
+        start, stop = max(0, top - reach), min(height, bottom + reach)
+
+        source = rgb[start * factor : stop * factor, : width * factor]
+        band = lut[source]
+        if factor > 1:
+            band = _area_downscale(band, factor)
+
+        core = band[top - start : bottom - start]
+        if kernel is not None:
+            # Repeat edge pixels where the margin runs past the image
+            padded = np.pad(
+                band,
+                (
+                    (reach - (top - start), reach - (stop - bottom)),
+                    (reach, reach),
+                    (0, 0),
+                ),
+                mode="edge",
+            )
+            core = core + adjustments.sharpen * (core - _blur(padded, kernel))
+
+        result[top:bottom] = _quantize(core, bits, adjustments.dither, top)
+    return result
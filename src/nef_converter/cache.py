@@ -0,0 +1,330 @@
+"""
+Conversion Cache for NEF Converter
+
+Content-addressed store of converted outputs, shared across runs and input
+directories. Entries are keyed by the SHA-256 of the raw file and the
+conversion settings, so a card copy, a client select and a backup of the
+same NEF are decoded once. Hits are served by reflink, hardlink or copy.
+"""
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from .checkpoint import partial_path, replace_file
+
+logger = logging.getLogger(__name__)
+
+# Ways to place a cached file: "auto" tries reflink, then hardlink, then copy;
+# the others fall back to a copy where the filesystem cannot link
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Default size limit of the cache in bytes
+DEFAULT_CACHE_SIZE = 10 * 2**30
+
+# Bump when the entry layout or key derivation changes
+CACHE_VERSION = 1
+
+# Seconds after which a staging directory left by an interrupted store is
+# removed during eviction
+STALE_STAGING_SECONDS = 3600
+
+# Linux ioctl that clones a file's extents (copy-on-write)
+FICLONE = 0x40049409
+
+
+def cache_key(sha256: str, settings: Dict[str, Any]) -> str:
+    """
+    Derive the cache key of a conversion.
+
+    Args:
+        sha256: Hex digest of the raw file's contents
+        settings: JSON-compatible settings that determine the output
+
+    Returns:
+        Hex digest identifying the converted output
+    """
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "source": sha256, "settings": settings},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def remove_file(path: Path) -> None:
+    """
+    Remove a file if it exists, including read-only files.
+
+    Outputs linked to the cache are read-only; removing instead of
+    overwriting them keeps the cache entry intact.
+
+    Args:
+        path: File to remove
+    """
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        # Windows refuses to delete read-only files
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+        path.unlink()
+
+
+def _reflink(source: Path, destination: Path) -> None:
+    """
+    Clone a file without copying its data.
+
+    Raises:
+        OSError: If the platform or filesystem does not support cloning
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported") from None
+
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            destination.unlink()
+            raise
+
+
+class ConversionCache:
+    """
+    On-disk cache of converted outputs with size-bounded LRU eviction.
+
+    Each entry is a directory holding one file per rendition, named by its
+    index. Entries are staged in a private directory and renamed into place,
+    so concurrent workers never see partial entries. The directory mtime
+    records the last use; eviction removes the least recently used entries
+    until the cache fits max_bytes.
+
+    Cached files are read-only, so outputs that share them through a
+    hardlink cannot be edited in place by accident.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: int = DEFAULT_CACHE_SIZE,
+        link: str = "auto",
+    ) -> None:
+        """
+        Initialize the cache, creating its directory if needed.
+
+        Args:
+            directory: Cache directory; may be shared by several runs
+            max_bytes: Size limit enforced by evict()
+            link: How cached files are placed, one of LINK_MODES
+
+        Raises:
+            ValueError: If the link mode is unknown or the size is not positive
+        """
+        if link not in LINK_MODES:
+            raise ValueError(
+                f"Unknown cache link mode: {link!r} "
+                f"(expected one of: {', '.join(LINK_MODES)})"
+            )
+        if max_bytes < 1:
+            raise ValueError("Cache size must be positive")
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.link = link
+        self._objects = self.directory / "objects"
+        self._staging = self.directory / "staging"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._staging.mkdir(exist_ok=True)
+
+        # Placement methods that failed once are not retried in this process
+        self._unsupported: Set[str] = set()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle without per-process placement state."""
+        state = dict(self.__dict__)
+        state["_unsupported"] = set()
+        return state
+
+    def _entry(self, key: str) -> Path:
+        """Get the directory of an entry."""
+        return self._objects / key[:2] / key
+
+    def _methods(self) -> List[str]:
+        """Get the placement methods to try, in order."""
+        if self.link == "auto":
+            methods = ["reflink", "hardlink"]
+        elif self.link == "copy":
+            methods = []
+        else:
+            methods = [self.link]
+        return [m for m in methods if m not in self._unsupported] + ["copy"]
+
+    def _place(self, source: Path, destination: Path) -> None:
+        """
+        Make destination a reflink, hardlink or copy of source.
+
+        Raises:
+            OSError: If source cannot be read or destination cannot be written
+        """
+        remove_file(destination)
+        for method in self._methods():
+            try:
+                if method == "reflink":
+                    _reflink(source, destination)
+                elif method == "hardlink":
+                    os.link(source, destination)
+                else:
+                    shutil.copyfile(source, destination)
+                return
+            except OSError as e:
+                if method == "copy" or e.errno == errno.ENOENT:
+                    raise
+                logger.debug(f"Cache {method} unavailable, falling back: {e}")
+                self._unsupported.add(method)
+
+    def fetch(self, key: str, outputs: Sequence[Path]) -> bool:
+        """
+        Place a cached conversion's files at the output paths.
+
+        Args:
+            key: Key from cache_key()
+            outputs: Output path of each rendition, in rendition order
+
+        Returns:
+            True on a hit; False if the entry is missing or incomplete
+        """
+        entry = self._entry(key)
+        if not entry.is_dir():
+            return False
+
+        try:
+            for index, output in enumerate(outputs):
+                # Placed beside the output and renamed, like converted files
+                temporary = partial_path(output)
+                try:
+                    self._place(entry / str(index), temporary)
+                    replace_file(temporary, output)
+                finally:
+                    remove_file(temporary)
+            os.utime(entry)
+        except OSError as e:
+            # Evicted or damaged meanwhile: the caller converts instead
+            logger.debug(f"Cache entry {key[:12]} unusable: {e}")
+            return False
+        return True
+
+    def store(self, key: str, outputs: Sequence[Path]) -> None:
+        """
+        Add a conversion's output files to the cache.
+
+        Errors are logged, not raised: the outputs are already written.
+
+        Args:
+            key: Key from cache_key()
+            outputs: Output path of each rendition, in rendition order
+        """
+        entry = self._entry(key)
+        if entry.is_dir():
+            return
+
+        staging = self._staging / f"{key}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            staging.mkdir()
+            for index, output in enumerate(outputs):
+                cached = staging / str(index)
+                self._place(output, cached)
+                os.chmod(cached, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+            entry.parent.mkdir(exist_ok=True)
+            os.rename(staging, entry)
+        except OSError as e:
+            # Most likely another worker stored the same entry first
+            if not entry.is_dir():
+                logger.warning(f"Could not cache {outputs[0].name}: {e}")
+            self._remove_tree(staging)
+
+    @staticmethod
+    def _remove_tree(path: Path) -> None:
+        """Remove an entry or staging directory, ignoring missing files."""
+        if not path.exists():
+            return
+        for child in path.iterdir():
+            try:
+                remove_file(child)
+            except OSError:
+                pass
+        try:
+            path.rmdir()
+        except OSError:
+            pass
+
+    def _scan(self) -> Tuple[List[Tuple[int, int, Path]], int]:
+        """
+        List entries with their last use and size.
+
+        Returns:
+            ((mtime_ns, size, path) per entry, total size in bytes)
+        """
+        entries = []
+        total = 0
+        for shard in os.scandir(self._objects):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    entries.append((entry.stat().st_mtime_ns, size, Path(entry.path)))
+                except OSError:
+                    continue  # removed by a concurrent eviction
+                total += size
+        return entries, total
+
+    def size(self) -> int:
+        """Get the total size of all entries in bytes."""
+        return self._scan()[1]
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used entries until the cache fits its limit.
+
+        Also removes staging directories left behind by interrupted stores.
+
+        Args:
+            max_bytes: Size limit (default: the cache's max_bytes)
+
+        Returns:
+            Number of entries removed
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        stale = time.time() - STALE_STAGING_SECONDS
+        for staging in os.scandir(self._staging):
+            try:
+                if staging.stat().st_mtime < stale:
+                    self._remove_tree(Path(staging.path))
+            except OSError:
+                continue
+
+        entries, total = self._scan()
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            self._remove_tree(path)
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(
+                f"Evicted {removed} cache entries; cache now {total / 2**20:.1f} MB"
+            )
+        return removed
@@ -0,0 +1,296 @@
+"""
+Checkpointing for NEF Converter
+
+Makes batch runs crash-safe. Outputs are written to a temporary file and
+renamed into place, so an interrupted run never leaves a half-written image
+under its final name, and a journal in the output directory records every
+finished file so `--resume` can continue the run where it stopped.
+"""
+
+import json
+import logging
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# File name of the checkpoint journal inside the output directory
+CHECKPOINT_NAME = ".nef_checkpoint.jsonl"
+
+# Bump when the journal layout changes; older journals are then ignored
+CHECKPOINT_VERSION = 1
+
+# Suffix of temporary output files; leftovers of a killed run are removed
+# when it is resumed
+PARTIAL_SUFFIX = ".partial"
+
+# Seconds between fsyncs of the journal; entries lost to a power failure
+# only cost their files being converted again
+CHECKPOINT_SYNC_INTERVAL = 5.0
+
+
+def partial_path(path: Path) -> Path:
+    """
+    Get the temporary path an output is written to before it is renamed.
+
+    The name is unique per process and thread, so concurrent writers of the
+    same output do not interfere.
+
+    Args:
+        path: Final output path
+
+    Returns:
+        Hidden temporary path in the same directory
+    """
+    return path.with_name(
+        f".{path.name}.{os.getpid()}.{threading.get_ident()}{PARTIAL_SUFFIX}"
+    )
+
+
+def replace_file(source: Path, destination: Path) -> None:
+    """
+    Atomically move a file over another.
+
+    Args:
+        source: File to move
+        destination: Path it replaces
+
+    Raises:
+        OSError: If the file cannot be moved
+    """
+    try:
+        os.replace(source, destination)
+    except PermissionError:
+        if not destination.exists():
+            raise
+        # Windows refuses to replace read-only files such as cache links
+        os.chmod(destination, stat.S_IWRITE | stat.S_IREAD)
+        destination.unlink()
+        os.replace(source, destination)
+
+
+def write_atomic(path: Path, contents: bytes) -> None:
+    """
+    Write a file so that it is either complete or absent, even after a crash.
+
+    The contents are written and synced to a temporary file, which is then
+    renamed over the destination. Files hardlinked to the cache keep their
+    contents because the link is replaced, not written through.
+
+    Args:
+        path: Output path
+        contents: File contents
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    temporary = partial_path(path)
+    try:
+        with open(temporary, "wb") as handle:
+            handle.write(contents)
+            handle.flush()
+            os.fsync(handle.fileno())
+        replace_file(temporary, path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def remove_partial_files(directory: Path) -> int:
+    """
+    Remove temporary outputs left behind by a killed run.
+
+    Args:
+        directory: Output directory to clean, including subdirectories
+
+    Returns:
+        Number of files removed
+    """
+    removed = 0
+    for path in directory.rglob(f".*{PARTIAL_SUFFIX}"):
+        try:
+            path.unlink()
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove partial output {path}: {e}")
+    return removed
+
+
+def find_resumable(base_directory: Path, pattern: str = "export_*") -> Optional[Path]:
+    """
+    Find the output directory of the most recently interrupted run.
+
+    Args:
+        base_directory: Directory holding the output directories
+        pattern: Glob pattern of output directory names
+
+    Returns:
+        Output directory with the newest checkpoint journal, or None
+    """
+    journals = [
+        path / CHECKPOINT_NAME
+        for path in base_directory.glob(pattern)
+        if (path / CHECKPOINT_NAME).is_file()
+    ]
+    if not journals:
+        return None
+    return max(journals, key=lambda journal: journal.stat().st_mtime).parent
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of files finished by a batch run.
+
+    The first line holds the conversion settings; every further line records
+    one finished source by its path relative to the input root, with its
+    size, mtime, content hash (when known) and output files relative to the
+    journal's directory. A line torn by a crash is ignored on load.
+    """
+
+    def __init__(self, path: Path, settings: Dict[str, Any]) -> None:
+        """
+        Initialize the journal; call open() before recording.
+
+        Args:
+            path: Location of the journal file
+            settings: Settings of the run the journal belongs to
+        """
+        self.path = path
+        self.settings = settings
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._handle: Optional[IO[str]] = None
+        self._synced = time.monotonic()
+
+    def open(self, resume: bool = False) -> "CheckpointJournal":
+        """
+        Open the journal for recording.
+
+        Args:
+            resume: Keep the entries of an existing journal written with the
+                same settings; otherwise the journal starts empty
+
+        Returns:
+            The journal itself
+        """
+        if resume:
+            self.entries = self._load()
+        if self.entries:
+            self._handle = open(self.path, "a", encoding="utf-8")
+        else:
+            self._handle = open(self.path, "w", encoding="utf-8")
+            header = {"version": CHECKPOINT_VERSION, "settings": self.settings}
+            self._write(header, sync=True)
+        return self
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the entries of an existing journal with matching settings."""
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                lines = handle.read().splitlines()
+        except FileNotFoundError:
+            return {}
+        except OSError as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return {}
+
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get("version") != CHECKPOINT_VERSION:
+            logger.warning(f"Ignoring checkpoint {self.path} with unsupported version")
+            return {}
+        if header.get("settings") != self.settings:
+            logger.warning(
+                f"Ignoring checkpoint {self.path}: it was written with other "
+                f"settings, so its files are converted again"
+            )
+            return {}
+
+        entries = {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                entries[entry.pop("key")] = entry
+            except (ValueError, KeyError, AttributeError):
+                continue  # torn by a crash while appending
+        return entries
+
+    def is_done(self, key: str, source: Path) -> bool:
+        """
+        Check whether a source was finished and has not changed since.
+
+        Args:
+            key: Journal key of the source
+            source: Path of the source file
+
+        Returns:
+            True if the source's size and mtime match and its outputs exist
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        if not all((self.path.parent / name).exists() for name in entry["outputs"]):
+            return False
+        try:
+            stat = source.stat()
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def record(
+        self,
+        key: str,
+        stat: os.stat_result,
+        sha256: Optional[str],
+        outputs: List[str],
+    ) -> None:
+        """
+        Record a finished source.
+
+        Args:
+            key: Journal key of the source
+            stat: Stat of the source taken before conversion
+            sha256: Content hash of the source, if computed
+            outputs: Output file names relative to the journal's directory
+        """
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "outputs": outputs,
+        }
+        self.entries[key] = entry
+        now = time.monotonic()
+        self._write(
+            {"key": key, **entry}, sync=now - self._synced >= CHECKPOINT_SYNC_INTERVAL
+        )
+
+    def _write(self, line: Dict[str, Any], sync: bool) -> None:
+        """Append one line, flushing it to the OS and optionally to disk."""
+        if self._handle is None:
+            raise ValueError("Checkpoint journal is not open")
+        self._handle.write(json.dumps(line) + "\n")
+        self._handle.flush()
+        if sync:
+            os.fsync(self._handle.fileno())
+            self._synced = time.monotonic()
+
+    def close(self, complete: bool = False) -> None:
+        """
+        Close the journal.
+
+        Args:
+            complete: The run finished every file, so the journal is removed;
+                otherwise it is kept for --resume
+        """
+        if self._handle is not None:
+            os.fsync(self._handle.fileno())
+            self._handle.close()
+            self._handle = None
+        if complete:
+            self.path.unlink(missing_ok=True)
@@ -2,15 +2,23 @@
 Command Line Interface for NEF Converter
 
 Provides argument parsing and CLI functionality.
+
+The conversion pipeline (rawpy, NumPy, Pillow) is imported only once the
+options that need it are parsed, so --version answers without loading it.
 """
 
 import argparse
 import logging
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, cast
 
-from .converter import NEFConverter
+if TYPE_CHECKING:
+    from .adjustments import Adjustments
+    from .converter import NEFConverter
+    from .renditions import Rendition
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +41,121 @@ def select_directory() -> Optional[str]:
         return None
 
 
+def parse_size(value: str) -> int:
+    """
+    Parse a byte size such as "512M" or "8G" (binary units).
+
+    Args:
+        value: Size with an optional K, M, G or T suffix
+
+    Returns:
+        Size in bytes
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid size
+    """
+    units = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+    text = value.strip().upper().removesuffix("B")
+    multiplier = units.get(text[-1:], 1)
+    if text[-1:] in units:
+        text = text[:-1]
+    try:
+        size = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive: {value!r}")
+    return size
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """
+    Parse a coordinator address such as "nas:8766", "10.0.0.5" or ":8766".
+
+    Args:
+        value: HOST[:PORT]; the host defaults to localhost and the port to
+            the coordinator's default port
+
+    Returns:
+        Tuple of (host, port)
+
+    Raises:
+        argparse.ArgumentTypeError: If the port is not a valid number
+    """
+    from .distributed import DEFAULT_COORDINATOR_PORT
+
+    host, _, port_text = value.strip().rpartition(":")
+    if not _:
+        host, port_text = port_text, ""
+    try:
+        port = int(port_text) if port_text else DEFAULT_COORDINATOR_PORT
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid address: {value!r}")
+    if not 0 < port < 2**16:
+        raise argparse.ArgumentTypeError(f"invalid port in address: {value!r}")
+    return host.strip("[]") or "127.0.0.1", port
+
+
+def parse_rendition(
+    value: str, quality: int = 95, output_format: str = "JPEG"
+) -> "Rendition":
+    """
+    Parse a rendition such as "2048:85:_web" or "full".
+
+    Args:
+        value: SIZE[:QUALITY[:SUFFIX[:FORMAT]]], where SIZE is a long edge in
+            pixels or "full"
+        quality: Quality used when the value does not give one
+        output_format: Format used when the value does not give one
+
+    Returns:
+        The parsed rendition
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid rendition
+    """
+    from .renditions import Rendition
+
+    parts = value.split(":")
+    if len(parts) > 4:
+        raise argparse.ArgumentTypeError(f"invalid rendition: {value!r}")
+    size, quality_text, suffix, format_text = parts + [""] * (4 - len(parts))
+    try:
+        return Rendition(
+            max_size=None if size.lower() in ("", "full") else int(size),
+            quality=int(quality_text) if quality_text else quality,
+            format=format_text or output_format,
+            suffix=suffix,
+        )
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid rendition {value!r}: {e}")
+
+
+def create_startup_parser() -> argparse.ArgumentParser:
+    """Create the parser for options handled before the pipeline is imported."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--version", action="version", version="%(prog)s 2.1.0")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="After a batch, print start-up costs: --version time in a fresh "
+        "interpreter, time to the first converted file and import times",
+    )
+    return parser
+
+
 def create_parser() -> argparse.ArgumentParser:
     """Create and configure argument parser."""
+    from .cache import DEFAULT_CACHE_SIZE, LINK_MODES
+    from .converter import DEFAULT_PROFILE, POSTPROCESS_PROFILES
+    from .dedupe import DEDUPE_MODES
+    from .encoders import ENCODER_ALIASES, ENCODERS
+    from .executors import EXECUTORS
+    from .exif import THUMBNAIL_POLICIES
+    from .schedule import SCHEDULES
+
     parser = argparse.ArgumentParser(
+        parents=[create_startup_parser()],
         description="Convert Nikon NEF raw files to JPEG format",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -43,6 +163,26 @@ Examples:
   %(prog)s                          # Open directory selector GUI
   %(prog)s -d /path/to/nef/files    # Convert files in directory
   %(prog)s -d . -q 90 -o output/    # Custom quality and output
+  %(prog)s -d . --mode preview      # Fast review JPEGs from embedded previews
+  %(prog)s -d . --incremental       # Only convert new or changed files
+  %(prog)s -d . --resume            # Continue an interrupted run
+  %(prog)s -d . -r --dedupe bursts  # Skip card copies and burst frames
+  %(prog)s -d . --schedule largest  # Biggest files first, shortest batch
+  %(prog)s -d . --downscale 2 --sharpen 0.5 --exposure 0.3 --dither
+                                    # Web-ready JPEGs without a second tool
+  %(prog)s -d . --profile fast      # Half-size proof sheets, about 4x faster
+  %(prog)s -d . -f tiff             # 16-bit TIFFs for editing
+  %(prog)s -d . -f webp --webp-method 2
+  %(prog)s -d . --rendition full --rendition 2048:85:_web --rendition 400:80:_thumb
+                                    # Several sizes from a single decode
+  %(prog)s -d . --report run.json   # Per-stage timing report as JSON
+  %(prog)s -d card2 --cache-dir ~/.cache/nef2jpg
+                                    # Reuse conversions of identical files
+  %(prog)s serve --port 8765        # Conversion server (see: %(prog)s serve -h)
+  %(prog)s coordinator -d /nas/shoot --host 0.0.0.0
+                                    # Share a batch with remote workers
+  %(prog)s worker --coordinator nas:8766
+                                    # Convert files served by a coordinator
         """,
     )
 
@@ -53,6 +193,14 @@ Examples:
         help="Directory containing NEF files to convert",
     )
 
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Also convert NEF files in subdirectories, mirroring the folder "
+        "structure in the output",
+    )
+
     parser.add_argument(
         "-o",
         "--output",
@@ -69,6 +217,179 @@ Examples:
         help="JPEG quality (1-100, default: 95)",
     )
 
+    parser.add_argument(
+        "-f",
+        "--format",
+        type=str.upper,
+        choices=[*ENCODERS, *ENCODER_ALIASES],
+        default="JPEG",
+        help="Output format (default: JPEG)",
+    )
+
+    parser.add_argument(
+        "--mode",
+        choices=["full", "preview"],
+        default="full",
+        help="Conversion mode: 'full' decodes the raw data, 'preview' uses the "
+        "embedded JPEG when large enough (much faster, default: full)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        choices=list(POSTPROCESS_PROFILES),
+        default=DEFAULT_PROFILE,
+        help="Raw processing profile: 'fast' decodes at half size (about 4x "
+        "less work), 'balanced' uses AHD demosaicing, 'quality' uses DCB with "
+        f"noise reduction (default: {DEFAULT_PROFILE})",
+    )
+
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=None,
+        metavar="PIXELS",
+        help="Maximum long edge of the output image (default: original size)",
+    )
+
+    parser.add_argument(
+        "--rendition",
+        action="append",
+        default=None,
+        metavar="SIZE[:Q[:SUFFIX[:FORMAT]]]",
+        help="Add an output rendition, e.g. 2048:85:_web; repeat for several "
+        "sizes from one decode. SIZE is a long edge in pixels or 'full'; "
+        "replaces --max-size (default: one full-size JPEG)",
+    )
+
+    adjusting = parser.add_argument_group(
+        "adjustments",
+        "Applied to the decoded 16-bit image before encoding, so no second "
+        "tool has to decode and re-encode the outputs",
+    )
+    adjusting.add_argument(
+        "--downscale",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Shrink by N, averaging each NxN block of pixels (default: 1)",
+    )
+    adjusting.add_argument(
+        "--exposure",
+        type=float,
+        default=0.0,
+        metavar="EV",
+        help="Exposure change in stops, e.g. 0.5 or -1 (default: 0)",
+    )
+    adjusting.add_argument(
+        "--contrast",
+        type=float,
+        default=0.0,
+        metavar="C",
+        help="Contrast curve, above -1 to 1; positive adds contrast (default: 0)",
+    )
+    adjusting.add_argument(
+        "--sharpen",
+        type=float,
+        default=0.0,
+        metavar="AMOUNT",
+        help="Unsharp mask amount, e.g. 0.5 (default: 0, off)",
+    )
+    adjusting.add_argument(
+        "--sharpen-radius",
+        type=float,
+        default=1.0,
+        metavar="PIXELS",
+        help="Unsharp mask radius in output pixels (default: 1.0)",
+    )
+    adjusting.add_argument(
+        "--dither",
+        action="store_true",
+        help="Dither instead of rounding when reducing to 8 bits (less banding)",
+    )
+
+    encoding = parser.add_argument_group(
+        "encoder options", "Speed/size trade-offs of each output format"
+    )
+    encoding.add_argument(
+        "--jpeg-optimize",
+        action="store_true",
+        help="Compute optimal Huffman tables (smaller, slightly slower)",
+    )
+    encoding.add_argument(
+        "--jpeg-progressive", action="store_true", help="Write progressive JPEGs"
+    )
+    encoding.add_argument(
+        "--jpeg-subsampling",
+        choices=["4:4:4", "4:2:2", "4:2:0"],
+        help="Chroma subsampling (default: Pillow's choice for the quality)",
+    )
+    encoding.add_argument(
+        "--webp-method",
+        type=int,
+        choices=range(7),
+        metavar="0-6",
+        help="WebP effort, 0 fastest to 6 smallest (default: 4)",
+    )
+    encoding.add_argument(
+        "--avif-speed",
+        type=int,
+        choices=range(11),
+        metavar="0-10",
+        help="AVIF speed, 0 smallest to 10 fastest (default: 6)",
+    )
+    encoding.add_argument(
+        "--png-compress-level",
+        type=int,
+        choices=range(10),
+        metavar="0-9",
+        help="PNG zlib level, 0 none to 9 smallest (default: 1)",
+    )
+    encoding.add_argument(
+        "--tiff-bits",
+        type=int,
+        choices=[8, 16],
+        help="TIFF sample depth; 16 keeps LibRaw's 16-bit output (default: 16)",
+    )
+    encoding.add_argument(
+        "--tiff-compression",
+        choices=["none", "deflate"],
+        help="TIFF compression (default: deflate)",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Convert into a stable output directory and skip files that are "
+        "already converted with the same settings",
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        choices=DEDUPE_MODES,
+        default="off",
+        help="Skip redundant files before converting: 'duplicates' converts "
+        "one of each set of identical copies, 'bursts' also only the sharpest "
+        "frame of each burst. Fingerprints are kept in the input directory "
+        "for later runs (default: off)",
+    )
+
+    parser.add_argument(
+        "--schedule",
+        choices=SCHEDULES,
+        default="discovery",
+        help="Work order: 'largest' converts the most expensive files first "
+        "so the batch does not end on one huge file while other workers idle, "
+        "'smallest' the cheapest first for the earliest results (default: "
+        "discovery, converting files as they are found)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run in its output directory (the newest "
+        "export_* directory, or --output), skipping files it finished",
+    )
+
     parser.add_argument(
         "--no-parallel",
         action="store_true",
@@ -82,12 +403,83 @@ Examples:
         help="Number of parallel workers (default: auto)",
     )
 
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Conversion cache shared across runs, folders and watch mode: "
+        "files already converted with the same settings are linked or copied "
+        "from it instead of decoded",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=parse_size,
+        default=DEFAULT_CACHE_SIZE,
+        metavar="SIZE",
+        help="Size limit of the cache, e.g. 50G; least recently used entries "
+        "are evicted (default: 10G)",
+    )
+
+    parser.add_argument(
+        "--cache-link",
+        choices=LINK_MODES,
+        default="auto",
+        help="How cached outputs are placed; 'auto' tries reflink, hardlink, "
+        "then copy. Linked outputs are read-only (default: auto)",
+    )
+
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="process",
+        help="Parallel backend: 'thread' avoids process start-up and pickling, "
+        "'process' sidesteps the GIL; 'auto' runs a short probe to measure which "
+        "suits this machine (default: process)",
+    )
+
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Maximum number of files queued to the worker pool at once; "
+        "bounds memory on huge batches (default: two per worker)",
+    )
+
+    parser.add_argument(
+        "--max-memory",
+        type=parse_size,
+        default=None,
+        metavar="SIZE",
+        help="Memory budget for parallel conversion, e.g. 16G; limits how "
+        "many files are converted at once (default: no limit)",
+    )
+
     parser.add_argument(
         "--no-exif",
         action="store_true",
         help="Do not preserve EXIF metadata",
     )
 
+    parser.add_argument(
+        "--exif-thumbnail",
+        choices=THUMBNAIL_POLICIES,
+        default="none",
+        help="Embed the raw file's thumbnail in the output's EXIF ('keep') or "
+        "leave it out (default: none)",
+    )
+
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="Write a JSON report with per-stage timing percentiles and bytes "
+        "read/written for the batch",
+    )
+
     parser.add_argument(
         "--watch",
         action="store_true",
@@ -107,8 +499,6 @@ Examples:
         help="Enable verbose logging",
     )
 
-    parser.add_argument("--version", action="version", version="%(prog)s 2.1.0")
-
     return parser
 
 
@@ -118,6 +508,26 @@ def validate_args(args: argparse.Namespace) -> bool:
         print("Error: Quality must be between 1 and 100")
         return False
 
+    if args.max_in_flight is not None and args.max_in_flight < 1:
+        print("Error: Max in flight must be at least 1")
+        return False
+
+    if args.max_size is not None and args.max_size < 1:
+        print("Error: Max size must be a positive number of pixels")
+        return False
+
+    try:
+        build_renditions(args)
+    except argparse.ArgumentTypeError as e:
+        print(f"Error: {e}")
+        return False
+
+    try:
+        build_adjustments(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+
     if args.directory:
         directory = Path(args.directory)
         if not directory.exists():
@@ -130,6 +540,71 @@ def validate_args(args: argparse.Namespace) -> bool:
     return True
 
 
+def build_renditions(args: argparse.Namespace) -> Optional[List["Rendition"]]:
+    """
+    Build the renditions given with --rendition.
+
+    Returns:
+        Parsed renditions, or None if none were given
+
+    Raises:
+        argparse.ArgumentTypeError: If a rendition is invalid
+    """
+    if not args.rendition:
+        return None
+    return [
+        parse_rendition(value, args.quality, args.format) for value in args.rendition
+    ]
+
+
+def build_adjustments(args: argparse.Namespace) -> "Adjustments":
+    """
+    Build the adjustments given on the command line.
+
+    Returns:
+        Adjustments to apply to every decoded image
+
+    Raises:
+        ValueError: If a value is out of range
+    """
+    from .adjustments import Adjustments
+
+    return Adjustments(
+        downscale=args.downscale,
+        exposure=args.exposure,
+        contrast=args.contrast,
+        sharpen=args.sharpen,
+        sharpen_radius=args.sharpen_radius,
+        dither=args.dither,
+    )
+
+
+def build_encoder_options(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """
+    Collect the encoder options given on the command line.
+
+    Returns:
+        Options per format, containing only the flags that were set
+    """
+    flags = {
+        "JPEG": {
+            "optimize": args.jpeg_optimize or None,
+            "progressive": args.jpeg_progressive or None,
+            "subsampling": args.jpeg_subsampling,
+        },
+        "WEBP": {"method": args.webp_method},
+        "AVIF": {"speed": args.avif_speed},
+        "PNG": {"compress_level": args.png_compress_level},
+        "TIFF": {"bits": args.tiff_bits, "compression": args.tiff_compression},
+    }
+    options = {}
+    for name, values in flags.items():
+        given = {key: value for key, value in values.items() if value is not None}
+        if given:
+            options[name] = given
+    return options
+
+
 def get_input_directory(args: argparse.Namespace) -> Optional[str]:
     """Get input directory from args or GUI."""
     if args.directory:
@@ -145,10 +620,273 @@ def get_input_directory(args: argparse.Namespace) -> Optional[str]:
     return directory
 
 
+def build_converter(args: argparse.Namespace) -> "NEFConverter":
+    """
+    Create the converter configured by the command line.
+
+    Returns:
+        Converter with the given settings
+
+    Raises:
+        ValueError: If a setting is invalid
+    """
+    from .converter import NEFConverter
+
+    return NEFConverter(
+        quality=args.quality,
+        output_format=args.format,
+        max_workers=args.workers,
+        executor=args.executor,
+        preserve_exif=not args.no_exif,
+        exif_thumbnail=args.exif_thumbnail,
+        dedupe=args.dedupe,
+        schedule=args.schedule,
+        adjustments=build_adjustments(args),
+        mode=args.mode,
+        profile=args.profile,
+        max_size=args.max_size,
+        renditions=build_renditions(args),
+        encoder_options=build_encoder_options(args),
+        incremental=args.incremental,
+        max_in_flight=args.max_in_flight,
+        max_memory=args.max_memory,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size,
+        cache_link=args.cache_link,
+    )
+
+
+def create_serve_parser() -> argparse.ArgumentParser:
+    """Create the parser of the serve command: conversion and server options."""
+    parser = create_parser()
+    parser.prog = f"{parser.prog} serve"
+    parser.description = (
+        "Run a conversion server: a warm worker pool taking jobs over HTTP on "
+        "localhost or a Unix socket"
+    )
+    parser.epilog = """
+Examples:
+  %(prog)s --port 8765 -q 90 --root /photos
+  %(prog)s --socket /tmp/nef2jpg.sock --profile fast
+
+  curl -X POST localhost:8765/jobs -H 'Content-Type: application/json' \\
+       -d '{"path": "/photos/DSC_0001.NEF", "priority": "interactive"}'
+  curl --data-binary @DSC_0001.NEF 'localhost:8765/jobs?name=DSC_0001.NEF'
+  curl localhost:8765/jobs/<id>
+  curl -o DSC_0001.jpg localhost:8765/jobs/<id>/result
+        """
+
+    group = parser.add_argument_group("server options")
+    group.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Loopback interface to listen on (default: 127.0.0.1)",
+    )
+    group.add_argument(
+        "--port", type=int, default=8765, help="TCP port (default: 8765)"
+    )
+    group.add_argument(
+        "--root",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="Directory path jobs may read from and write to; repeatable "
+        "(default: none, only uploads are accepted)",
+    )
+    group.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Listen on a Unix socket instead of TCP",
+    )
+    return parser
+
+
+def serve_main(argv: List[str]) -> None:
+    """
+    Run the serve command.
+
+    Args:
+        argv: Arguments after "serve"
+    """
+    args = create_serve_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    if not validate_args(args):
+        sys.exit(1)
+
+    from .server import serve
+
+    try:
+        serve(
+            build_converter(args),
+            host=args.host,
+            port=args.port,
+            socket_path=args.socket,
+            workers=args.workers,
+            roots=args.root,
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ Server error: {e}")
+        sys.exit(1)
+
+
+def create_coordinator_parser() -> argparse.ArgumentParser:
+    """Create the parser of the coordinator command: batch and listen options."""
+    from .distributed import DEFAULT_COORDINATOR_PORT, TOKEN_ENV
+
+    parser = create_parser()
+    parser.prog = f"{parser.prog} coordinator"
+    parser.description = (
+        "Convert a directory with remote workers: serve its files over TCP to "
+        "`worker` processes on machines sharing the input and output folders"
+    )
+    parser.epilog = """
+Workers must be started with the same conversion options and token as the
+coordinator. The token is checked when a worker connects, but messages are
+not encrypted: only accept workers from other machines on a trusted network.
+
+Examples:
+  export NEF2JPG_TOKEN=$(openssl rand -hex 16)
+  %(prog)s -d /nas/shoot --host 0.0.0.0 -q 90
+  nef2jpg worker --coordinator nas:8766 -q 90
+  nef2jpg worker --coordinator nas:8766 -q 90 -d /mnt/nas/shoot \\
+                 -o /mnt/nas/shoot/export_20250101_120000
+        """
+
+    group = parser.add_argument_group("coordinator options")
+    group.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Interface to listen on; 0.0.0.0 accepts workers on other "
+        "machines and requires --token (default: 127.0.0.1)",
+    )
+    group.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_COORDINATOR_PORT,
+        help=f"TCP port (default: {DEFAULT_COORDINATOR_PORT})",
+    )
+    group.add_argument(
+        "--token",
+        default=os.environ.get(TOKEN_ENV),
+        help=f"Shared secret workers must present (default: ${TOKEN_ENV})",
+    )
+    return parser
+
+
+def create_worker_parser() -> argparse.ArgumentParser:
+    """Create the parser of the worker command: conversion and worker options."""
+    from .distributed import DEFAULT_COORDINATOR_PORT, TOKEN_ENV
+
+    parser = create_parser()
+    parser.prog = f"{parser.prog} worker"
+    parser.description = (
+        "Convert files served by a coordinator until its batch is finished. "
+        "-d and -o give where the coordinator's input and output directories "
+        "are mounted on this machine, if not at the same paths; --workers "
+        "sets how many files convert at once"
+    )
+    parser.epilog = None
+
+    group = parser.add_argument_group("worker options")
+    group.add_argument(
+        "--coordinator",
+        type=parse_address,
+        required=True,
+        metavar="HOST[:PORT]",
+        help=f"Coordinator to take files from (default port: "
+        f"{DEFAULT_COORDINATOR_PORT})",
+    )
+    group.add_argument(
+        "--name",
+        default=None,
+        help="Name in the coordinator's statistics (default: hostname-pid)",
+    )
+    group.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=60.0,
+        metavar="SECONDS",
+        help="How long to keep trying to reach the coordinator (default: 60)",
+    )
+    group.add_argument(
+        "--token",
+        default=os.environ.get(TOKEN_ENV),
+        help=f"Shared secret of the coordinator (default: ${TOKEN_ENV})",
+    )
+    return parser
+
+
+def worker_main(argv: List[str]) -> None:
+    """
+    Run the worker command.
+
+    Args:
+        argv: Arguments after "worker"
+    """
+    args = create_worker_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    if not validate_args(args):
+        sys.exit(1)
+
+    from .distributed import Worker
+
+    host, port = args.coordinator
+    try:
+        worker = Worker(
+            build_converter(args),
+            host,
+            port,
+            name=args.name,
+            slots=args.workers,
+            input_root=Path(args.directory) if args.directory else None,
+            output_root=Path(args.output) if args.output else None,
+            token=args.token,
+        )
+        print(f"🛠️  Worker {worker.name} ({worker.slots} slots) → {host}:{port}")
+        counts = worker.run(connect_timeout=args.connect_timeout)
+    except KeyboardInterrupt:
+        print("\n🛑 Worker stopped")
+        sys.exit(130)
+    except (OSError, ValueError) as e:
+        print(f"❌ Worker error: {e}")
+        sys.exit(1)
+
+    print(
+        f"✅ Batch finished: {counts['converted']} converted, "
+        f"{counts['failed']} failed on this worker"
+    )
+
+
 def cli_main() -> None:
     """Main CLI entry point."""
-    parser = create_parser()
-    args = parser.parse_args()
+    started = time.perf_counter()
+
+    # Answer --version before importing the conversion pipeline
+    create_startup_parser().parse_known_args()
+
+    if sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["worker"]:
+        worker_main(sys.argv[2:])
+        return
+
+    # The coordinator runs an ordinary batch, with remote workers as its pool
+    coordinating = sys.argv[1:2] == ["coordinator"]
+    if coordinating:
+        args = create_coordinator_parser().parse_args(sys.argv[2:])
+    else:
+        args = create_parser().parse_args()
+    ready_seconds = time.perf_counter() - started
 
     # Configure logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
@@ -159,19 +897,20 @@ def cli_main() -> None:
     # Validate arguments
     if not validate_args(args):
         sys.exit(1)
+    if coordinating and args.watch:
+        print("Error: --watch cannot be combined with the coordinator")
+        sys.exit(1)
 
     # Get input directory
     input_directory = get_input_directory(args)
     if not input_directory:
         sys.exit(1)
 
+    from .report import RunReport
+
     try:
         # Initialize converter
-        converter = NEFConverter(
-            quality=args.quality,
-            max_workers=args.workers,
-            preserve_exif=not args.no_exif,
-        )
+        converter = build_converter(args)
 
         # Watch mode
         if args.watch:
@@ -194,14 +933,58 @@ def cli_main() -> None:
             return
 
         # Convert files
-        successful, total, stats = converter.convert_batch(
-            input_directory, parallel=not args.no_parallel
+        report = (
+            RunReport(converter.settings(), started=started)
+            if args.report or args.profile_startup
+            else None
         )
+        coordinator = None
+        if coordinating:
+            from .distributed import Coordinator
+
+            coordinator = Coordinator(converter, args.host, args.port, args.token)
+            coordinator.start()
+            print(f"🛰️  Coordinating on {coordinator.address}")
+            print(
+                f"🔄 Start workers: nef2jpg worker --coordinator {coordinator.address}"
+            )
+        try:
+            successful, total, stats = converter.convert_batch(
+                input_directory,
+                parallel=not args.no_parallel,
+                output_directory=args.output,
+                recursive=args.recursive,
+                report=report,
+                resume=args.resume,
+                coordinator=coordinator,
+            )
+        finally:
+            if coordinator is not None:
+                coordinator.close()
+        if report is not None and args.report:
+            report.write(args.report)
 
         # Show results
         print()
         print("✅ Conversion completed!")
         print(f"📊 Successfully converted: {successful}/{total} files")
+        if stats.get("skipped"):
+            print(f"⏭️  Up to date (skipped): {stats['skipped']} files")
+        if stats.get("duplicates") or stats.get("burst_frames"):
+            print(
+                f"🧬 Not converted: {stats['duplicates']} duplicates, "
+                f"{stats['burst_frames']} burst frames"
+            )
+        if stats.get("resumed"):
+            print(f"🔁 Finished before interruption: {stats['resumed']} files")
+        if stats.get("cache_hits"):
+            print(f"♻️  From cache: {stats['cache_hits']} files")
+        if coordinator is not None:
+            for worker in coordinator.workers.values():
+                print(
+                    f"🖥️  {worker.name}: {worker.converted} converted, "
+                    f"{worker.failed} failed, {worker.requeued} requeued"
+                )
 
         # Display statistics
         if stats:
@@ -210,6 +993,23 @@ def cli_main() -> None:
             print(f"   ⏱️  Total time: {stats['total_time']:.2f}s")
             print(f"   📸 Time per file: {stats['time_per_file']:.2f}s")
             print(f"   ⚡ Speed: {stats['files_per_second']:.2f} files/s")
+            print(f"   💾 Read per file: {stats['bytes_read_per_file'] / 1e6:.1f} MB")
+            if stats["tail_seconds"]:
+                print(
+                    f"   🐢 Tail: {stats['tail_seconds']:.2f}s with idle workers "
+                    f"({stats['tail_idle_seconds']:.2f} worker-seconds)"
+                )
+        if args.report:
+            print(f"📝 Report: {args.report}")
+        if args.profile_startup:
+            from .startup import format_startup_profile
+
+            print()
+            print("🚀 Start-up profile:")
+            for line in format_startup_profile(
+                ready_seconds, report.first_file_seconds if report else None
+            ):
+                print(f"   {line}")
 
         if successful == 0:
             print("❌ No files were converted. Please check the logs.")
@@ -4,36 +4,133 @@ NEF to JPG Converter Module
 Core conversion functionality for NEF files.
 """
 
+import hashlib
+import io
 import logging
+import mmap
+import os
 import subprocess  # nosec: B404
 import sys
 import time
 import uuid
-import warnings
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, as_completed, wait
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
+import numpy as np
 import rawpy
 from PIL import Image
-from tqdm import tqdm
 
-# Suppress PIL warnings about EXIF metadata
-warnings.filterwarnings("ignore", category=UserWarning, module="PIL.TiffImagePlugin")
+from .adjustments import Adjustments, apply_adjustments
+from .cache import DEFAULT_CACHE_SIZE, ConversionCache, cache_key
+from .checkpoint import (
+    CHECKPOINT_NAME,
+    CheckpointJournal,
+    find_resumable,
+    remove_partial_files,
+    write_atomic,
+)
+from .dedupe import DEDUPE_MODES, open_index, select_files
+from .encoders import Pixels, get_encoder
+from .executors import EXECUTORS, create_executor
+from .exif import THUMBNAIL_POLICIES, read_exif, reset_orientation
+from .manifest import MANIFEST_NAME, ConversionManifest
+from .renditions import Rendition, fit_size
+from .report import RunReport, StageTimer, _percentile, tail_idle
+from .schedule import SCHEDULES, order_files, raw_samples
+
+if TYPE_CHECKING:
+    from .distributed import Coordinator
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Platform-specific file browser
 if sys.platform == "win32":
-    import os
-
     FILEBROWSER_PATH = os.path.join(os.getenv("WINDIR", "C:\\Windows"), "explorer.exe")
 elif sys.platform == "darwin":
     FILEBROWSER_PATH = "open"
 else:
     FILEBROWSER_PATH = "xdg-open"
 
+# Per-file measurements returned by the conversion pipeline
+FileStats = Dict[str, Any]
+
+# File extensions recognised as NEF files (compared case-insensitively)
+NEF_EXTENSIONS = (".nef",)
+
+# Work item for the conversion pool: (converter, nef_path, output_path)
+ConversionTask = Tuple["NEFConverter", Path, Path]
+
+# Raw file contents accepted by the in-memory API, or a binary stream of them
+RawSource = Union[bytes, bytearray, memoryview, BinaryIO]
+
+# Default number of submitted but unfinished tasks per worker
+IN_FLIGHT_PER_WORKER = 2
+
+# Peak bytes per output pixel while converting: LibRaw's 4x16-bit working
+# image, the 8-bit RGB result and Pillow's 4-byte-per-pixel copy of it
+PEAK_BYTES_PER_PIXEL = 8 + 3 + 4
+
+# Extra peak bytes per output pixel when LibRaw also delivers 16-bit RGB
+HIGH_BIT_DEPTH_BYTES_PER_PIXEL = 6
+
+# Peak bytes per source byte when the raw header cannot be read
+FALLBACK_BYTES_PER_FILE_BYTE = 12
+
+# Safety margin for allocator overhead and encoder buffers
+MEMORY_OVERHEAD = 1.2
+
+# Conversion modes: "full" demosaics the raw data, "preview" reuses the
+# camera's embedded JPEG when it is large enough
+CONVERSION_MODES = ("full", "preview")
+
+# Minimum long edge of an embedded preview, as a fraction of the sensor's
+# long edge, for it to stand in for a full decode
+PREVIEW_MIN_COVERAGE = 0.9
+
+# Stable output directory used by incremental runs
+INCREMENTAL_DIR_NAME = "export"
+
+# Named rawpy postprocess() settings trading speed for quality; enum values
+# are stored by name so profiles stay JSON-compatible
+POSTPROCESS_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Half-size output merges each 2x2 Bayer block into one pixel instead of
+    # demosaicing: a quarter of the pixels and no interpolation
+    "fast": {"half_size": True, "demosaic_algorithm": "LINEAR"},
+    # LibRaw's default AHD demosaic
+    "balanced": {"demosaic_algorithm": "AHD"},
+    # DCB demosaic with refinement passes and noise reduction
+    "quality": {
+        "demosaic_algorithm": "DCB",
+        "dcb_iterations": 2,
+        "dcb_enhance": True,
+        "fbdd_noise_reduction": "Full",
+        "median_filter_passes": 1,
+    },
+}
+
+# Profile used when none is given; matches rawpy's defaults
+DEFAULT_PROFILE = "balanced"
+
+# Shrink by whole factors first while at least this much larger than the
+# target, then resample with LANCZOS, as Image.thumbnail() does
+REDUCING_GAP = 2.0
+
 
 class NEFConverter:
     """
@@ -47,6 +144,22 @@ class NEFConverter:
         output_format: str = "JPEG",
         max_workers: Optional[int] = None,
         preserve_exif: bool = True,
+        mode: str = "full",
+        max_size: Optional[int] = None,
+        incremental: bool = False,
+        max_in_flight: Optional[int] = None,
+        max_memory: Optional[int] = None,
+        profile: str = DEFAULT_PROFILE,
+        renditions: Optional[Sequence[Rendition]] = None,
+        encoder_options: Optional[Dict[str, Dict[str, Any]]] = None,
+        executor: str = "process",
+        cache_dir: Optional[Union[str, Path]] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_link: str = "auto",
+        exif_thumbnail: str = "none",
+        dedupe: str = "off",
+        schedule: str = "discovery",
+        adjustments: Optional[Adjustments] = None,
     ) -> None:
         """
         Initialize the NEF converter.
@@ -56,23 +169,173 @@ class NEFConverter:
             output_format: Output format (default: JPEG)
             max_workers: Maximum number of parallel workers (None = auto)
             preserve_exif: Preserve EXIF metadata from NEF files
+            mode: "full" to demosaic the raw data, "preview" to use the
+                embedded JPEG preview when available (default: full)
+            max_size: Maximum long edge of the output in pixels (None = original)
+            incremental: Convert batches into a stable output directory and
+                skip files that a manifest shows are already converted
+            max_in_flight: Maximum number of tasks submitted to the pool at
+                once (None = two per worker)
+            max_memory: Memory budget in bytes for parallel conversions;
+                concurrency is capped so the estimated peak memory of files
+                in flight fits (None = no limit)
+            profile: Name of the raw processing profile in
+                POSTPROCESS_PROFILES (default: balanced)
+            renditions: Output files to produce from each decoded image;
+                replaces quality, output_format and max_size (default: one
+                rendition built from those)
+            encoder_options: Per-format encoder options overriding the
+                encoder defaults, e.g. {"JPEG": {"progressive": True}}
+            executor: Parallel backend: "thread", "process", or "auto" to
+                pick threads when decoding and encoding measurably run in
+                parallel without the GIL, at the cost of a probe per process
+                (default: process)
+            cache_dir: Directory of a conversion cache shared across runs
+                and input directories; files whose content and settings
+                were converted before are served from it (None = no cache)
+            cache_size: Size limit of the cache in bytes
+            cache_link: How cached outputs are placed: "reflink",
+                "hardlink", "copy", or "auto" for the first that works
+            exif_thumbnail: "keep" to embed the raw file's thumbnail in the
+                output's EXIF, "none" to leave it out (default: none)
+            dedupe: Batch pre-pass that skips redundant files: "duplicates"
+                converts one of each group of byte-identical files, "bursts"
+                also one frame per burst (default: off)
+            schedule: Batch work order: "discovery" converts files as they
+                are found, "largest" the most expensive first to shorten
+                the tail where workers idle, "smallest" the cheapest first
+                for the earliest results (default: discovery)
+            adjustments: Downscale, tone, sharpening and dithering applied
+                to each decoded image before the renditions are encoded
+                (default: none)
+
+        Raises:
+            ValueError: If mode, profile, executor, format, cache link mode,
+                EXIF thumbnail policy, deduplication mode, schedule or an encoder
+                option is not known, two renditions would write the same
+                file, or a 16-bit rendition asks for a resize
         """
+        if mode not in CONVERSION_MODES:
+            raise ValueError(
+                f"Unknown conversion mode: {mode!r} "
+                f"(expected one of: {', '.join(CONVERSION_MODES)})"
+            )
+        if executor not in EXECUTORS:
+            raise ValueError(
+                f"Unknown executor: {executor!r} "
+                f"(expected one of: {', '.join(EXECUTORS)})"
+            )
+        if exif_thumbnail not in THUMBNAIL_POLICIES:
+            raise ValueError(
+                f"Unknown EXIF thumbnail policy: {exif_thumbnail!r} "
+                f"(expected one of: {', '.join(THUMBNAIL_POLICIES)})"
+            )
+        if dedupe not in DEDUPE_MODES:
+            raise ValueError(
+                f"Unknown deduplication mode: {dedupe!r} "
+                f"(expected one of: {', '.join(DEDUPE_MODES)})"
+            )
+        if schedule not in SCHEDULES:
+            raise ValueError(
+                f"Unknown schedule: {schedule!r} "
+                f"(expected one of: {', '.join(SCHEDULES)})"
+            )
+        if profile not in POSTPROCESS_PROFILES:
+            raise ValueError(
+                f"Unknown processing profile: {profile!r} "
+                f"(expected one of: {', '.join(POSTPROCESS_PROFILES)})"
+            )
+
+        if renditions is None:
+            renditions = [Rendition(max_size, quality, output_format)]
+        if len({(r.suffix, r.extension) for r in renditions}) < len(renditions):
+            raise ValueError("Renditions must differ in suffix or format")
+
+        overrides = {
+            get_encoder(name).name: options
+            for name, options in (encoder_options or {}).items()
+        }
+        self.encoder_options = {
+            name: get_encoder(name).options(options)
+            for name, options in overrides.items()
+        }
+        for rendition in renditions:
+            encoder = get_encoder(rendition.format)
+            options = self.encoder_options.setdefault(encoder.name, encoder.options())
+            if encoder.bit_depth(options) > 8 and rendition.max_size is not None:
+                raise ValueError(
+                    f"{encoder.name} renditions with {encoder.bit_depth(options)}"
+                    f"-bit output are written at full size; remove max_size"
+                )
+
         self.quality = quality
-        self.output_format = output_format
+        self.output_format = get_encoder(output_format).name
         self.max_workers = max_workers
         self.preserve_exif = preserve_exif
+        self.exif_thumbnail = exif_thumbnail
+        self.dedupe = dedupe
+        self.schedule = schedule
+        self.adjustments = adjustments or Adjustments()
+        self.mode = mode
+        self.max_size = max_size
+        self.incremental = incremental
+        self.max_in_flight = max_in_flight
+        self.max_memory = max_memory
+        self.profile = profile
+        self.renditions = list(renditions)
+        self.executor = executor
+        self.cache = (
+            ConversionCache(cache_dir, cache_size, cache_link)
+            if cache_dir is not None
+            else None
+        )
+        self.high_bit_depth = any(
+            self._bit_depth(rendition) > 8 for rendition in self.renditions
+        )
         logger.info(
             f"Initialized NEF Converter with "
             f"quality={quality}, format={output_format}, "
-            f"workers={max_workers or 'auto'}, preserve_exif={preserve_exif}"
+            f"workers={max_workers or 'auto'}, executor={executor}, "
+            f"max_in_flight={max_in_flight or 'auto'}, "
+            f"max_memory={max_memory or 'unlimited'}, preserve_exif={preserve_exif}, "
+            f"mode={mode}, profile={profile}, max_size={max_size or 'original'}, "
+            f"incremental={incremental}, renditions={len(self.renditions)}, "
+            f"cache={cache_dir or 'off'}, dedupe={dedupe}, schedule={schedule}, "
+            f"adjustments={'on' if self.adjustments.active else 'off'}"
         )
 
-    def get_nef_files(self, directory: Path) -> List[Path]:
+    def settings(self) -> Dict[str, Any]:
+        """
+        Get the settings that determine the converted output.
+
+        Returns:
+            JSON-compatible dict of output-affecting settings
+        """
+        return {
+            "quality": self.quality,
+            "output_format": self.output_format,
+            "preserve_exif": self.preserve_exif,
+            "exif_thumbnail": self.exif_thumbnail,
+            "mode": self.mode,
+            "profile": self.profile,
+            "max_size": self.max_size,
+            "renditions": [rendition.to_dict() for rendition in self.renditions],
+            "encoder_options": self.encoder_options,
+            "adjustments": self.adjustments.to_dict(),
+        }
+
+    def _bit_depth(self, rendition: Rendition) -> int:
+        """Get the sample depth a rendition is encoded from."""
+        encoder = get_encoder(rendition.format)
+        return encoder.bit_depth(self.encoder_options[encoder.name])
+
+    def get_nef_files(self, directory: Path, recursive: bool = False) -> List[Path]:
         """
         Find all NEF files in the given directory.
 
         Args:
             directory: Directory to search for NEF files
+            recursive: Also search subdirectories
 
         Returns:
             List of NEF file paths
@@ -80,6 +343,38 @@ class NEFConverter:
         Raises:
             ValueError: If directory doesn't exist or no NEF files found
         """
+        nef_files = list(self.iter_nef_files(directory, recursive))
+
+        if not nef_files:
+            raise ValueError(_no_files_message(directory))
+
+        logger.info(f"Found {len(nef_files)} NEF files in {directory}")
+        return nef_files
+
+    def iter_nef_files(
+        self,
+        directory: Path,
+        recursive: bool = False,
+        exclude: Iterable[Path] = (),
+    ) -> Iterator[Path]:
+        """
+        Yield NEF files as they are found, without listing the tree first.
+
+        Extensions are matched case-insensitively in a single os.scandir
+        pass per directory. Symlinked directories are not followed.
+
+        Args:
+            directory: Directory to search for NEF files
+            recursive: Also search subdirectories
+            exclude: Directories to skip, such as an output directory
+                inside the input tree
+
+        Yields:
+            NEF file paths
+
+        Raises:
+            ValueError: If directory doesn't exist or is not a directory
+        """
         if not directory.exists():
             raise ValueError(
                 f"❌ Directory does not exist: {directory}\n"
@@ -93,20 +388,28 @@ class NEFConverter:
                 f"💡 Tip: Provide a folder path, not a file path"
             )
 
-        # Find both .nef and .NEF files
-        nef_files: list[Path] = []
-        for pattern in ["*.nef", "*.NEF"]:
-            nef_files.extend(directory.glob(pattern))
-
-        if not nef_files:
-            raise ValueError(
-                f"❌ No NEF files found in: {directory}\n"
-                f"💡 Tip: Ensure the directory contains .nef or .NEF files\n"
-                f"📂 Supported: .nef, .NEF extensions"
-            )
+        excluded = {os.path.abspath(path) for path in exclude}
+        stack = [str(directory)]
+        while stack:
+            current = stack.pop()
+            subdirectories = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            if (
+                                os.path.splitext(entry.name)[1].lower()
+                                in NEF_EXTENSIONS
+                            ):
+                                yield Path(entry.path)
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            if os.path.abspath(entry.path) not in excluded:
+                                subdirectories.append(entry.path)
+            except PermissionError as e:
+                logger.warning(f"Skipping unreadable directory {current}: {e}")
 
-        logger.info(f"Found {len(nef_files)} NEF files in {directory}")
-        return nef_files
+            # Visit subdirectories in name order for a predictable run order
+            stack.extend(sorted(subdirectories, reverse=True))
 
     def create_output_directory(self, base_directory: Path) -> Path:
         """
@@ -134,47 +437,171 @@ class NEFConverter:
         Returns:
             True if conversion successful, False otherwise
         """
-        try:
-            # Extract EXIF data before conversion if needed
-            exif_data = None
-            if self.preserve_exif:
-                exif_data = self._extract_exif_data(nef_path)
+        return self._convert_with_feedback(nef_path, output_path) is not None
 
-            # Convert NEF to RGB array
-            with rawpy.imread(str(nef_path)) as raw:
-                rgb = raw.postprocess()
+    def convert_bytes(self, source: RawSource, name: str = "memory.nef") -> List[bytes]:
+        """
+        Convert raw file contents in memory, without touching the disk.
 
-            # Convert to PIL Image for better control
-            img = Image.fromarray(rgb)
+        rawpy decodes straight from the buffer and the encoders write to
+        memory. The conversion cache does not apply.
 
-            # Save with EXIF data if available
-            if exif_data:
-                try:
-                    img.save(
-                        str(output_path), "JPEG", quality=self.quality, exif=exif_data
-                    )
-                    logger.debug(f"Saved {output_path.name} with EXIF data")
-                except Exception as exif_err:
-                    # If EXIF save fails, save without EXIF
-                    logger.warning(
-                        f"Could not save with EXIF for {nef_path.name}: {exif_err}, saving without EXIF"
-                    )
-                    img.save(str(output_path), "JPEG", quality=self.quality)
-            else:
-                img.save(str(output_path), "JPEG", quality=self.quality)
+        Args:
+            source: Raw file contents, or a binary stream to read them from
+            name: File name for log messages
+
+        Returns:
+            Encoded contents of each rendition, in the order of self.renditions
+
+        Raises:
+            Exception: Any decoding or encoding error
+        """
+        return self._convert_memory(source, name)[0]
+
+    def convert_stream(
+        self,
+        source: RawSource,
+        destination: BinaryIO,
+        rendition: int = 0,
+        name: str = "memory.nef",
+    ) -> FileStats:
+        """
+        Convert raw file contents and write one rendition to a stream.
 
-            return True
+        Args:
+            source: Raw file contents, or a binary stream to read them from
+            destination: Writable binary stream, e.g. a socket or response body
+            rendition: Index of the rendition to write (default: the first)
+            name: File name for log messages
+
+        Returns:
+            Per-file statistics (see _convert())
+
+        Raises:
+            Exception: Any decoding or encoding error
+        """
+        encoded, file_stats = self._convert_memory(source, name)
+        destination.write(encoded[rendition])
+        return file_stats
+
+    def iter_convert_bytes(
+        self, sources: Iterable[RawSource], parallel: bool = True
+    ) -> Iterator[Tuple[bool, List[bytes], FileStats]]:
+        """
+        Convert a stream of raw files in memory, yielding results in order.
+
+        Sources are read lazily and at most max_in_flight conversions are
+        pending at once, so memory stays bounded for long streams. With a
+        process pool the contents are copied to the workers; threads share
+        them.
+
+        Args:
+            sources: Raw file contents or binary streams
+            parallel: Convert on the pool (default: True)
+
+        Yields:
+            Tuples of (success, encoded renditions, file_stats), in the order
+            of sources; failures have no renditions and an "error" entry
+        """
+        tasks = (
+            (self, _read_source(source), f"memory-{index}.nef")
+            for index, source in enumerate(sources)
+        )
+        if not parallel:
+            for task in tasks:
+                yield self._convert_memory_task(task)
+            return
+
+        workers = self.max_workers or os.cpu_count() or 1
+        window = self.max_in_flight or workers * IN_FLIGHT_PER_WORKER
+        with self.create_executor(workers) as executor:
+            pending: "deque[Future[Tuple[bool, List[bytes], FileStats]]]" = deque()
+            for task in tasks:
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(self._convert_memory_task, task))
+            while pending:
+                yield pending.popleft().result()
+
+    def _convert_memory(
+        self, source: RawSource, name: str
+    ) -> Tuple[List[bytes], FileStats]:
+        """
+        Run the conversion pipeline on raw file contents in memory.
+
+        Args:
+            source: Raw file contents, or a binary stream to read them from
+            name: File name for log messages
+
+        Returns:
+            Tuple of (encoded renditions, per-file statistics)
+        """
+        timer = StageTimer()
+        data = _read_source(source)
+        timer.lap("read")
+        file_stats: FileStats = {"bytes_read": len(data)}
+        exif_data = self._read_exif(name, data, timer)
+
+        raw_file = io.BytesIO(data)
+        del data
+        encoded = self._encode(raw_file, name, timer, file_stats, exif_data)
+
+        file_stats["bytes_written"] = sum(len(contents) for contents in encoded)
+        file_stats["seconds"] = timer.total
+        file_stats["stages"] = timer.stages
+        logger.info(
+            f"Converted {name} in memory "
+            f"(profile={file_stats['profile']}, {file_stats['seconds']:.2f}s)"
+        )
+        return encoded, file_stats
+
+    @staticmethod
+    def _convert_memory_task(
+        args: Tuple["NEFConverter", bytes, str],
+    ) -> Tuple[bool, List[bytes], FileStats]:
+        """
+        Convert raw file contents in a pool worker.
+
+        Args:
+            args: Tuple of (converter, raw file contents, name)
+
+        Returns:
+            Tuple of (success, encoded renditions, file_stats)
+        """
+        converter, data, name = args
+        try:
+            encoded, file_stats = converter._convert_memory(data, name)
+            return True, encoded, file_stats
+        except Exception as e:
+            logger.error(f"Failed to convert {name}: {e}")
+            return False, [], {"error": str(e)}
+
+    def _convert_with_feedback(
+        self, nef_path: Path, output_path: Path
+    ) -> Optional[FileStats]:
+        """
+        Convert a single file, printing actionable messages on failure.
+
+        Args:
+            nef_path: Path to input NEF file
+            output_path: Path for output JPG file
+
+        Returns:
+            Per-file statistics if conversion successful, None otherwise
+        """
+        try:
+            return self._convert(nef_path, output_path)
         except FileNotFoundError:
             logger.error(f"File not found: {nef_path}")
             print(f"❌ File not found: {nef_path.name}")
-            return False
+            return None
         except PermissionError:
             logger.error(f"Permission denied: {nef_path}")
             print(
                 f"❌ Permission denied: {nef_path.name}\n"
                 f"💡 Tip: Check file permissions or close any program using the file"
             )
-            return False
+            return None
         except Exception as e:
             error_msg = str(e).lower()
             logger.error(f"Failed to convert {nef_path}: {e}")
@@ -189,7 +616,8 @@ class NEFConverter:
             elif "memory" in error_msg:
                 print(
                     f"❌ Out of memory processing: {nef_path.name}\n"
-                    f"💡 Tip: Close other applications or use --no-parallel flag"
+                    f"💡 Tip: Close other applications, set --max-memory or use "
+                    f"--no-parallel flag"
                 )
             else:
                 print(
@@ -197,25 +625,312 @@ class NEFConverter:
                     f"💡 Error: {e}\n"
                     f"📖 See: https://github.com/r4inX/nef-to-jpg#troubleshooting"
                 )
-            return False
+            return None
+
+    def _convert(self, nef_path: Path, output_path: Path) -> FileStats:
+        """
+        Run the conversion pipeline for a single file.
+
+        The file is read once; the same in-memory buffer feeds both EXIF
+        extraction and raw decoding, and one decode feeds every rendition.
+        Errors are raised to the caller, which decides how to report them.
+
+        Args:
+            nef_path: Path to input NEF file
+            output_path: Path for output JPG file; other renditions are
+                written next to it with their own suffix and extension
 
-    def _extract_exif_data(self, source_path: Path) -> Optional[bytes]:
+        Returns:
+            Per-file statistics (bytes_read, bytes_written, seconds, stages
+            with seconds per pipeline stage, profile, sha256 in incremental
+            mode or with a cache, and cached when served from the cache)
+        """
+        timer = StageTimer()
+        outputs = [rendition.path_for(output_path) for rendition in self.renditions]
+        key = None
+        data = _map_file(nef_path)
+        try:
+            timer.lap("read")
+            file_stats: FileStats = {"bytes_read": len(data)}
+            if self.incremental or self.cache is not None:
+                file_stats["sha256"] = hashlib.sha256(data).hexdigest()
+                timer.lap("hash")
+
+            if self.cache is not None:
+                key = cache_key(file_stats["sha256"], self.settings())
+                if self.cache.fetch(key, outputs):
+                    timer.lap("write")
+                    file_stats["profile"] = "cache"
+                    file_stats["cached"] = True
+                    file_stats["bytes_written"] = sum(
+                        path.stat().st_size for path in outputs
+                    )
+                    file_stats["seconds"] = timer.total
+                    file_stats["stages"] = timer.stages
+                    logger.info(
+                        f"Converted {nef_path.name} → {output_path.name} (cache)"
+                    )
+                    return file_stats
+
+            exif_data = self._read_exif(nef_path.name, data, timer)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+        # LibRaw reads the file itself, so no copy of it is held in memory
+        # while it decodes
+        encoded = self._encode(
+            str(nef_path), nef_path.name, timer, file_stats, exif_data
+        )
+
+        for path, contents in zip(outputs, encoded):
+            write_atomic(path, contents)
+        if self.cache is not None and key is not None:
+            self.cache.store(key, outputs)
+        timer.lap("write")
+
+        file_stats["bytes_written"] = sum(len(contents) for contents in encoded)
+        file_stats["seconds"] = timer.total
+        file_stats["stages"] = timer.stages
+        logger.info(
+            f"Converted {nef_path.name} → {output_path.name} "
+            f"(profile={file_stats['profile']}, {file_stats['seconds']:.2f}s)"
+        )
+        return file_stats
+
+    def _read_exif(
+        self, name: str, data: "Union[bytes, mmap.mmap]", timer: StageTimer
+    ) -> Optional[bytes]:
+        """
+        Extract the EXIF metadata to copy, if EXIF is preserved.
+
+        Args:
+            name: File name for log messages
+            data: Raw file contents
+            timer: Timer to lap the exif stage on
+
+        Returns:
+            EXIF APP1 payload, or None
+        """
+        if not self.preserve_exif:
+            return None
+        exif_data = self._extract_exif_data(Path(name), data)  # type: ignore[arg-type]
+        timer.lap("exif")
+        return exif_data
+
+    def _encode(
+        self,
+        source: Union[io.BytesIO, str],
+        name: str,
+        timer: StageTimer,
+        file_stats: FileStats,
+        exif_data: Optional[bytes],
+    ) -> List[bytes]:
+        """
+        Decode a raw file and encode every rendition in memory.
+
+        One decode feeds every rendition. A buffer source is closed once
+        decoded, so the source bytes are freed before encoding unless the
+        caller holds another reference.
+
+        Args:
+            source: Raw file path for LibRaw to read, or raw file contents
+                positioned at the start
+            name: File name for log messages
+            timer: Timer to lap the decode and encode stages on
+            file_stats: Statistics to add the profile used to
+            exif_data: EXIF APP1 payload to embed, or None
+
+        Returns:
+            Encoded file contents, in the order of self.renditions
+        """
+        encoded: Optional[List[bytes]] = None
+        with rawpy.imread(source) as raw:
+            # Embedded previews are 8-bit, so 16-bit output needs a decode
+            if self.mode == "preview" and not self.high_bit_depth:
+                preview = self._read_preview(raw)
+                if preview is not None:
+                    timer.lap("decode")
+                    with Image.open(io.BytesIO(preview)) as img:
+                        if self.adjustments.active:
+                            adjusted = apply_adjustments(
+                                np.asarray(img.convert("RGB")), self.adjustments
+                            )
+                            timer.lap("adjust")
+                            encoded = self._render(_array_to_image(adjusted), exif_data)
+                        else:
+                            encoded = self._render(img, exif_data, preview)
+                    file_stats["profile"] = "preview"
+                else:
+                    logger.debug(
+                        f"No usable preview in {name}, falling back to full decode"
+                    )
+
+            if encoded is None:
+                # Convert NEF to RGB array
+                params = _postprocess_params(self.profile)
+                # Adjustments work on 16 bits and round or dither once
+                if self.high_bit_depth or self.adjustments.active:
+                    params["output_bps"] = 16
+                rgb = raw.postprocess(**params)
+                file_stats["profile"] = self.profile
+
+        if encoded is None:
+            timer.lap("decode")
+            # LibRaw's buffers were freed when the raw file closed; drop the
+            # source bytes and the array as soon as the image owns the pixels,
+            # so only one full-resolution buffer is alive while encoding
+            if isinstance(source, io.BytesIO):
+                source.close()
+            rgb16 = None
+            if self.adjustments.active:
+                if self.high_bit_depth:
+                    rgb16 = apply_adjustments(rgb, self.adjustments, bits=16)
+                    dither = Adjustments(dither=self.adjustments.dither)
+                    rgb = apply_adjustments(rgb16, dither)
+                else:
+                    rgb = apply_adjustments(rgb, self.adjustments)
+                timer.lap("adjust")
+            elif rgb.dtype == np.uint16:
+                rgb16, rgb = rgb, np.right_shift(rgb, 8).astype(np.uint8)
+            img = _array_to_image(rgb)
+            del rgb
+            if exif_data:
+                exif_data = reset_orientation(exif_data)
+            encoded = self._render(img, exif_data, rgb16=rgb16)
+        timer.lap("encode")
+        return encoded
+
+    def _read_preview(self, raw: "rawpy.RawPy") -> Optional[bytes]:
+        """
+        Get the embedded JPEG preview if it can replace a full decode.
+
+        Args:
+            raw: Opened rawpy image
+
+        Returns:
+            JPEG bytes of the preview, or None if there is no usable preview
+        """
+        try:
+            thumb = raw.extract_thumb()
+        except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+            return None
+
+        if thumb.format != rawpy.ThumbFormat.JPEG:
+            return None
+
+        with Image.open(io.BytesIO(thumb.data)) as preview:
+            preview_edge = max(preview.size)
+
+        sensor_edge = max(raw.sizes.width, raw.sizes.height)
+        required_edge = sensor_edge * PREVIEW_MIN_COVERAGE
+        largest = [rendition.max_size for rendition in self.renditions]
+        if None not in largest:
+            required_edge = min(required_edge, max(largest))  # type: ignore[type-var]
+
+        if preview_edge < required_edge:
+            return None
+        return bytes(thumb.data)
+
+    def _render(
+        self,
+        img: Image.Image,
+        exif_data: Optional[bytes],
+        preview: Optional[bytes] = None,
+        rgb16: Optional[np.ndarray] = None,
+    ) -> List[bytes]:
+        """
+        Encode every rendition from one image as a downscale pyramid.
+
+        Renditions are produced from largest to smallest, each resampled
+        from the previous level instead of from full resolution, so small
+        renditions cost little on top of the large ones.
+
+        Args:
+            img: Decoded full-size image
+            exif_data: EXIF data to embed, if any
+            preview: JPEG bytes that img was opened from; full-size JPEG
+                renditions reuse them without re-encoding
+            rgb16: Full-size 16-bit decode for renditions that keep 16 bits
+
+        Returns:
+            Encoded file contents, in the order of self.renditions
+        """
+        encoded = [b""] * len(self.renditions)
+        order = sorted(
+            range(len(self.renditions)),
+            key=lambda index: self.renditions[index].max_size or sys.maxsize,
+            reverse=True,
+        )
+
+        level = img
+        for index in order:
+            rendition = self.renditions[index]
+            if self._bit_depth(rendition) > 8:
+                assert rgb16 is not None
+                encoded[index] = self._encode_image(rgb16, exif_data, rendition)
+                continue
+
+            size = fit_size(level.size, rendition.max_size)
+
+            if preview is not None and level is img and rendition.format == "JPEG":
+                if size == img.size:
+                    encoded[index] = (
+                        _insert_exif_segment(preview, exif_data)
+                        if exif_data
+                        else preview
+                    )
+                    continue
+
+            if size != level.size:
+                level = level.resize(
+                    size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP
+                )
+            encoded[index] = self._encode_image(level, exif_data, rendition)
+        return encoded
+
+    def _encode_image(
+        self, pixels: Pixels, exif_data: Optional[bytes], rendition: Rendition
+    ) -> bytes:
+        """
+        Encode an image in memory with the rendition's encoder.
+
+        Encoding to memory keeps compression and disk writes apart, so each
+        is timed as its own stage.
+
+        Args:
+            pixels: Image already at the rendition's size, or a 16-bit array
+                for renditions that keep 16 bits
+            exif_data: EXIF data to embed, if any
+            rendition: Output format and quality
+
+        Returns:
+            Encoded output file contents
+        """
+        encoder = get_encoder(rendition.format)
+        options = self.encoder_options[encoder.name]
+        return encoder.encode(pixels, rendition.quality, options, exif_data)
+
+    def _extract_exif_data(
+        self, source_path: Path, data: Optional[bytes] = None
+    ) -> Optional[bytes]:
         """
         Extract EXIF metadata from source file.
 
+        The raw EXIF structures, maker note included, are copied without
+        decoding them; see read_exif().
+
         Args:
             source_path: Source NEF file
+            data: Contents of the source file, if already read
 
         Returns:
-            EXIF data as bytes or None if not available
+            EXIF APP1 payload or None if not available
         """
         try:
-            with Image.open(str(source_path)) as source_img:
-                exif = source_img.getexif()
-                if exif:
-                    # Convert to bytes for saving
-                    return exif.tobytes()
-                return None
+            if data is None:
+                data = source_path.read_bytes()
+            return read_exif(data, self.exif_thumbnail)
         except Exception as e:
             logger.warning(f"Could not extract EXIF data from {source_path.name}: {e}")
             return None
@@ -233,61 +948,119 @@ class NEFConverter:
         # This method is kept for backward compatibility but is no longer used
         pass
 
+    def estimate_memory(self, nef_path: Path) -> int:
+        """
+        Estimate the peak memory needed to convert a file.
+
+        The raw dimensions come from the file's TIFF header, read through a
+        memory map without opening it in LibRaw, so estimating stays cheap
+        in the loop that submits work. Output pixels are taken as the raw
+        sample count, slightly overestimating for the sensor margins.
+
+        Args:
+            nef_path: Path to input NEF file
+
+        Returns:
+            Estimated peak memory in bytes
+        """
+        samples = raw_samples(nef_path)
+        if not samples:
+            try:
+                file_size = nef_path.stat().st_size
+            except OSError:
+                file_size = 0
+            return int(file_size * FALLBACK_BYTES_PER_FILE_BYTE)
+
+        raw_bytes = samples * 2
+        pixels = samples
+        if POSTPROCESS_PROFILES[self.profile].get("half_size"):
+            pixels //= 4
+
+        bytes_per_pixel = PEAK_BYTES_PER_PIXEL
+        if self.high_bit_depth or self.adjustments.active:
+            bytes_per_pixel += HIGH_BIT_DEPTH_BYTES_PER_PIXEL
+        # LibRaw reads the file from its path, so no copy of it adds to the peak
+        peak = raw_bytes + pixels * bytes_per_pixel
+        return int(peak * MEMORY_OVERHEAD)
+
+    def create_executor(self, workers: Optional[int] = None) -> Executor:
+        """
+        Create the pool that runs parallel conversions.
+
+        Args:
+            workers: Number of workers (default: max_workers, or one per CPU)
+
+        Returns:
+            Thread or process pool, as chosen by the executor setting
+        """
+        workers = workers or self.max_workers or os.cpu_count() or 1
+        return create_executor(self.executor, workers)
+
     @staticmethod
-    def _convert_single_file(args: Tuple[Path, Path, int, bool]) -> Tuple[bool, Path]:
+    def _convert_single_file(
+        args: ConversionTask,
+    ) -> Tuple[bool, Path, FileStats]:
         """
         Static method for parallel processing of single file.
 
         Args:
-            args: Tuple of (nef_path, output_path, quality, preserve_exif)
+            args: Tuple of (converter, nef_path, output_path)
 
         Returns:
-            Tuple of (success, nef_path)
+            Tuple of (success, nef_path, file_stats)
         """
-        nef_path, output_path, quality, preserve_exif = args
+        converter, nef_path, output_path = args
         try:
-            # Extract EXIF data before conversion if needed
-            exif_data = None
-            if preserve_exif:
-                try:
-                    with Image.open(str(nef_path)) as source_img:
-                        exif = source_img.getexif()
-                        if exif:
-                            exif_data = exif.tobytes()
-                except Exception as e:
-                    logger.warning(f"Could not extract EXIF from {nef_path.name}: {e}")
-
-            # Convert NEF to RGB array
-            with rawpy.imread(str(nef_path)) as raw:
-                rgb = raw.postprocess()
-
-            # Convert to PIL Image and save
-            img = Image.fromarray(rgb)
-
-            # Save with EXIF data if available
-            if exif_data:
-                try:
-                    img.save(str(output_path), "JPEG", quality=quality, exif=exif_data)
-                except Exception:
-                    # If EXIF save fails, save without EXIF
-                    img.save(str(output_path), "JPEG", quality=quality)
-            else:
-                img.save(str(output_path), "JPEG", quality=quality)
-
-            return True, nef_path
+            return True, nef_path, converter._convert(nef_path, output_path)
         except Exception as e:
             logger.error(f"Failed to convert {nef_path}: {e}")
-            return False, nef_path
+            return False, nef_path, {"error": str(e)}
 
     def convert_batch(
-        self, input_directory: str, parallel: bool = True
+        self,
+        input_directory: str,
+        parallel: bool = True,
+        output_directory: Optional[str] = None,
+        recursive: bool = False,
+        report: Optional[RunReport] = None,
+        resume: bool = False,
+        coordinator: Optional["Coordinator"] = None,
     ) -> Tuple[int, int, Dict[str, float]]:
         """
         Convert all NEF files in a directory to JPG.
 
+        Files are handed to the converter as discovery finds them, so work
+        starts before a large tree has been fully scanned. With recursion,
+        the output directory mirrors the input folder structure.
+
+        In incremental mode, files recorded in the output directory's
+        manifest with unchanged size, mtime and settings are skipped and
+        count as successful.
+
+        With deduplication, all files are discovered and fingerprinted
+        before conversion starts; skipped duplicates and burst frames count
+        as successful. With a schedule other than discovery order, all files
+        are discovered and ordered by estimated cost before conversion starts.
+
+        Outputs are written atomically and each finished file is recorded
+        in a checkpoint journal in the output directory, which is removed
+        once every file has converted. With resume, files the journal shows
+        as finished are skipped; incremental runs always pick up the journal
+        of an interrupted run.
+
         Args:
             input_directory: Directory containing NEF files
             parallel: Use parallel processing (default: True)
+            output_directory: Output directory (default: a new export_*
+                directory, or a stable "export" directory when incremental)
+            recursive: Also convert NEF files in subdirectories
+            report: Run report to fill with per-file and per-stage
+                statistics (default: none)
+            resume: Continue an interrupted run: in output_directory if
+                given, otherwise in the export_* directory with the newest
+                checkpoint journal
+            coordinator: Started coordinator that hands the files to remote
+                workers instead of converting them in a local pool
 
         Returns:
             Tuple of (successful_conversions, total_files, statistics)
@@ -296,74 +1069,286 @@ class NEFConverter:
 
         try:
             directory = Path(input_directory)
-            nef_files = self.get_nef_files(directory)
-            output_dir = self.create_output_directory(directory)
+            created_output = False
 
-            successful = 0
+            if output_directory:
+                output_dir = Path(output_directory)
+                output_dir.mkdir(parents=True, exist_ok=True)
+            elif self.incremental:
+                output_dir = directory / INCREMENTAL_DIR_NAME
+                output_dir.mkdir(exist_ok=True)
+            else:
+                resumable = find_resumable(directory) if resume else None
+                if resumable is not None:
+                    output_dir = resumable
+                    logger.info(f"Resuming interrupted run in {output_dir}")
+                else:
+                    if resume:
+                        logger.warning(
+                            f"No interrupted run to resume in {directory}; "
+                            f"starting a new one"
+                        )
+                    output_dir = self.create_output_directory(directory)
+                    created_output = True
 
-            if parallel and len(nef_files) > 1:
-                # Parallel processing for better performance
-                tasks = [
-                    (
-                        nef_file,
-                        output_dir / f"{nef_file.stem}.jpg",
-                        self.quality,
-                        self.preserve_exif,
+            settings = self.settings()
+            journal = CheckpointJournal(output_dir / CHECKPOINT_NAME, settings)
+            journal.open(resume=resume or self.incremental)
+            if resume or self.incremental:
+                removed = remove_partial_files(output_dir)
+                if removed:
+                    logger.info(f"Removed {removed} partial outputs")
+
+            manifest: Optional[ConversionManifest] = None
+            if self.incremental:
+                manifest = ConversionManifest.load(output_dir / MANIFEST_NAME)
+                manifest.restore(journal.entries, settings)
+
+            source_stats: Dict[Path, os.stat_result] = {}
+            counts = {
+                "found": 0,
+                "skipped": 0,
+                "resumed": 0,
+                "duplicates": 0,
+                "burst_frames": 0,
+            }
+
+            def discover() -> Iterator[ConversionTask]:
+                nef_files: Iterable[Path] = self.iter_nef_files(
+                    directory, recursive, exclude=[output_dir]
+                )
+                if self.dedupe != "off":
+                    candidates = list(nef_files)
+                    index = open_index(
+                        self.cache.directory if self.cache is not None else output_dir
                     )
-                    for nef_file in nef_files
-                ]
-
-                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-                    futures = {
-                        executor.submit(self._convert_single_file, task): task[0]
-                        for task in tasks
-                    }
-
-                    with tqdm(
-                        total=len(nef_files), desc="Converting NEF files", unit="file"
-                    ) as pbar:
-                        for future in as_completed(futures):
-                            success, _ = future.result()
-                            if success:
-                                successful += 1
-                            pbar.update(1)
-            else:
-                # Sequential processing
-                for nef_file in tqdm(
-                    nef_files, desc="Converting NEF files", unit="file"
-                ):
-                    output_file = output_dir / f"{nef_file.stem}.jpg"
+                    try:
+                        nef_files, dropped = select_files(
+                            candidates, self.dedupe, index
+                        )
+                    finally:
+                        index.close()
+                    counts.update(dropped)
+                    counts["found"] += len(candidates) - len(nef_files)
+
+                for nef_file in nef_files:
+                    counts["found"] += 1
+                    key = nef_file.relative_to(directory).as_posix()
+                    if manifest is not None:
+                        if manifest.is_current(key, nef_file, settings):
+                            counts["skipped"] += 1
+                            continue
+                    elif journal.is_done(key, nef_file):
+                        counts["resumed"] += 1
+                        continue
+                    source_stats[nef_file] = nef_file.stat()
+                    output_file = output_dir / _output_name(directory, nef_file)
+                    output_file.parent.mkdir(parents=True, exist_ok=True)
+                    yield self, nef_file, output_file
+
+            converted = 0
+            failed = 0
+            finished = False
+            cache_hits = 0
+            bytes_read = 0
+            latencies: List[float] = []
+            completions: List[float] = []
+            tasks: Iterable[ConversionTask] = discover()
+            if self.schedule != "discovery":
+                pending = {task[1]: task for task in tasks}
+                tasks = [pending[path] for path in order_files(pending, self.schedule)]
+            results = (
+                coordinator.run(tasks, directory, output_dir)
+                if coordinator is not None
+                else self._iter_results(tasks, parallel)
+            )
+            try:
+                for success, nef_file, file_stats in results:
+                    completions.append(time.perf_counter())
+                    if not success:
+                        failed += 1
+                        if report is not None:
+                            report.add_failure()
+                        continue
+                    converted += 1
+                    cache_hits += bool(file_stats.get("cached"))
+                    if report is not None:
+                        report.add(nef_file, file_stats)
+                    bytes_read += file_stats.get("bytes_read", 0)
+                    latencies.append(file_stats.get("seconds", 0.0))
+                    key = nef_file.relative_to(directory).as_posix()
+                    source_stat = source_stats.pop(nef_file)
+                    outputs = [
+                        rendition.path_for(
+                            Path(_output_name(directory, nef_file))
+                        ).as_posix()
+                        for rendition in self.renditions
+                    ]
+                    sha256 = file_stats.get("sha256")
+                    journal.record(key, source_stat, sha256, outputs)
+                    if manifest is not None and sha256:
+                        manifest.record(key, source_stat, sha256, settings, outputs)
+                finished = True
+            finally:
+                # Keep finished work even if the run is interrupted
+                if manifest is not None:
+                    manifest.save()
+                # Failed files are retried by --resume
+                journal.close(complete=finished and not failed)
+                if self.cache is not None:
+                    self.cache.evict()
 
-                    if self.convert_nef_to_jpg(nef_file, output_file):
-                        successful += 1
+            total = counts["found"]
+            if total == 0:
+                if created_output:
+                    output_dir.rmdir()
+                raise ValueError(_no_files_message(directory))
+
+            if manifest is not None:
+                logger.info(
+                    f"Incremental run: {counts['skipped']} up to date, "
+                    f"{total - counts['skipped']} needed conversion"
+                )
 
             end_time = time.time()
             elapsed_time = end_time - start_time
 
+            if counts["resumed"]:
+                logger.info(
+                    f"Resumed run: {counts['resumed']} already converted, "
+                    f"{total - counts['resumed']} remaining"
+                )
+
+            deduplicated = counts["duplicates"] + counts["burst_frames"]
+            if deduplicated:
+                logger.info(
+                    f"Deduplicated: {counts['duplicates']} duplicates and "
+                    f"{counts['burst_frames']} burst frames not converted"
+                )
+
+            if coordinator is not None:
+                workers = coordinator.peak_slots
+            else:
+                workers = (self.max_workers or os.cpu_count() or 1) if parallel else 1
+            tail_seconds, tail_idle_seconds = tail_idle(completions, workers)
+
+            if report is not None:
+                report.skipped = counts["skipped"] + counts["resumed"] + deduplicated
+                report.wall_seconds = elapsed_time
+                report.workers = workers
+                report.tail_seconds = tail_seconds
+                report.tail_idle_seconds = tail_idle_seconds
+
             # Calculate statistics
+            successful = (
+                converted + counts["skipped"] + counts["resumed"] + deduplicated
+            )
             stats = {
                 "total_time": elapsed_time,
-                "time_per_file": elapsed_time / len(nef_files) if nef_files else 0,
-                "files_per_second": (
-                    len(nef_files) / elapsed_time if elapsed_time > 0 else 0
-                ),
+                "time_per_file": elapsed_time / total,
+                "files_per_second": total / elapsed_time if elapsed_time > 0 else 0,
+                "bytes_read": bytes_read,
+                "bytes_read_per_file": bytes_read / converted if converted else 0,
+                "skipped": counts["skipped"],
+                "resumed": counts["resumed"],
+                "duplicates": counts["duplicates"],
+                "burst_frames": counts["burst_frames"],
+                "cache_hits": cache_hits,
+                "latency_p50": _percentile(latencies, 50),
+                "latency_p95": _percentile(latencies, 95),
+                "tail_seconds": tail_seconds,
+                "tail_idle_seconds": tail_idle_seconds,
             }
+            if coordinator is not None:
+                stats["remote_workers"] = len(coordinator.workers)
+                stats["requeued"] = coordinator.requeued
 
             logger.info(
-                f"Conversion complete: {successful}/{len(nef_files)} "
+                f"Conversion complete: {successful}/{total} "
                 f"files converted in {elapsed_time:.2f}s"
             )
 
             # Open output directory
-            if successful > 0:
+            if converted > 0:
                 self._open_directory(output_dir)
 
-            return successful, len(nef_files), stats
+            return successful, total, stats
 
         except Exception as e:
             logger.error(f"Batch conversion failed: {e}")
             return 0, 0, {}
 
+    def _iter_results(
+        self, tasks: Iterable[ConversionTask], parallel: bool
+    ) -> Iterator[Tuple[bool, Path, FileStats]]:
+        """
+        Run conversion tasks, yielding results as they complete.
+
+        Tasks are consumed lazily, so a streaming source feeds the pool as
+        it produces work. At most max_in_flight tasks are submitted at once,
+        which keeps parent memory flat regardless of batch size. With a
+        memory budget, tasks are also held back until the estimated peak
+        memory of everything in flight fits. The progress bar total grows
+        with each task.
+
+        Args:
+            tasks: Tuples of (converter, nef_path, output_path)
+            parallel: Use parallel processing
+
+        Yields:
+            Tuples of (success, nef_path, file_stats)
+        """
+        from tqdm import tqdm
+
+        with tqdm(total=0, desc="Converting NEF files", unit="file") as pbar:
+            if parallel:
+                # Parallel processing for better performance
+                workers = self.max_workers or os.cpu_count() or 1
+                window = self.max_in_flight or workers * IN_FLIGHT_PER_WORKER
+                budget = self.max_memory
+
+                with self.create_executor(workers) as executor:
+                    in_flight: Set[Future[Tuple[bool, Path, FileStats]]] = set()
+                    reserved: Dict[Future[Tuple[bool, Path, FileStats]], int] = {}
+                    for task in tasks:
+                        cost = self.estimate_memory(task[1]) if budget else 0
+
+                        # Wait for a free slot, and for enough memory budget
+                        while in_flight and (
+                            len(in_flight) >= window
+                            or (budget and sum(reserved.values()) + cost > budget)
+                        ):
+                            done, in_flight = wait(
+                                in_flight, return_when=FIRST_COMPLETED
+                            )
+                            for future in done:
+                                reserved.pop(future, None)
+                                yield future.result()
+                                pbar.update(1)
+
+                        if budget and cost > budget:
+                            logger.warning(
+                                f"{task[1].name} needs about {cost / 2**20:.0f} MB, "
+                                f"more than the memory budget; converting it alone"
+                            )
+
+                        future = executor.submit(self._convert_single_file, task)
+                        in_flight.add(future)
+                        reserved[future] = cost
+                        pbar.total += 1
+                        pbar.refresh()
+
+                    for future in as_completed(in_flight):
+                        yield future.result()
+                        pbar.update(1)
+            else:
+                # Sequential processing
+                for _, nef_file, output_file in tasks:
+                    pbar.total += 1
+                    file_stats = self._convert_with_feedback(nef_file, output_file)
+                    yield file_stats is not None, nef_file, file_stats or {}
+                    pbar.update(1)
+
     def _open_directory(self, directory: Path) -> None:
         """Open directory in system file manager."""
         try:
@@ -375,3 +1360,146 @@ class NEFConverter:
                 subprocess.run([FILEBROWSER_PATH, str(directory)], check=False)
         except Exception as e:
             logger.warning(f"Could not open directory {directory}: {e}")
+
+
+def _map_file(path: Path) -> "Union[bytes, mmap.mmap]":
+    """
+    Map a file read-only, so its pages can be released before decoding.
+
+    Args:
+        path: File to map
+
+    Returns:
+        The mapping, or empty bytes for an empty file, which cannot be mapped
+    """
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_source(source: RawSource) -> bytes:
+    """
+    Get raw file contents from bytes-like data or a binary stream.
+
+    Args:
+        source: Raw file contents, or a binary stream to read them from
+
+    Returns:
+        The contents; bytes are returned as they are, without a copy
+    """
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    return source.read()
+
+
+def _postprocess_params(profile: str) -> Dict[str, Any]:
+    """
+    Get the rawpy postprocess() arguments for a processing profile.
+
+    Args:
+        profile: Profile name in POSTPROCESS_PROFILES
+
+    Returns:
+        Keyword arguments with enum names resolved to rawpy enums
+    """
+    params = dict(POSTPROCESS_PROFILES[profile])
+    if "demosaic_algorithm" in params:
+        params["demosaic_algorithm"] = rawpy.DemosaicAlgorithm[
+            params["demosaic_algorithm"]
+        ]
+    if "fbdd_noise_reduction" in params:
+        params["fbdd_noise_reduction"] = rawpy.FBDDNoiseReductionMode[
+            params["fbdd_noise_reduction"]
+        ]
+    return params
+
+
+def _array_to_image(rgb: np.ndarray) -> Image.Image:
+    """
+    Wrap a decoded RGB array in a Pillow image without intermediate copies.
+
+    The array buffer is handed to Image.frombuffer directly. Image.fromarray
+    would first serialise non-contiguous arrays with tobytes(); here only
+    Pillow's own unpack into its 4-bytes-per-pixel storage remains.
+
+    Args:
+        rgb: Array of shape (height, width, 3) with dtype uint8
+
+    Returns:
+        Image sharing no memory with the array
+    """
+    rgb = np.ascontiguousarray(rgb)
+    height, width = rgb.shape[:2]
+    return Image.frombuffer("RGB", (width, height), rgb, "raw", "RGB", 0, 1)
+
+
+def _output_name(root: Path, nef_path: Path) -> str:
+    """
+    Get the output path for a source, relative to the output directory.
+
+    Args:
+        root: Input directory the source was found in
+        nef_path: Source NEF file
+
+    Returns:
+        Relative POSIX path mirroring the source's folder structure
+    """
+    relative = nef_path.relative_to(root).with_name(f"{nef_path.stem}.jpg")
+    return relative.as_posix()
+
+
+def _no_files_message(directory: Path) -> str:
+    """Build the error message for a directory without NEF files."""
+    return (
+        f"❌ No NEF files found in: {directory}\n"
+        f"💡 Tip: Ensure the directory contains .nef or .NEF files\n"
+        f"📂 Supported: .nef, .NEF extensions"
+    )
+
+
+def _insert_exif_segment(jpeg: bytes, exif_data: bytes) -> bytes:
+    """
+    Insert an EXIF APP1 segment into JPEG data without re-encoding it.
+
+    Existing EXIF segments are dropped; the new one is placed after any
+    leading APP0 (JFIF) segments, as the EXIF specification requires.
+
+    Args:
+        jpeg: Complete JPEG file data
+        exif_data: APP1 payload, starting with the ``Exif\\0\\0`` header
+
+    Returns:
+        JPEG data with the EXIF segment in place
+
+    Raises:
+        ValueError: If the data is not a JPEG or the EXIF payload is too large
+    """
+    if jpeg[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG stream")
+    if len(exif_data) + 2 > 0xFFFF:
+        raise ValueError("EXIF data too large for a single APP1 segment")
+
+    app1 = b"\xff\xe1" + (len(exif_data) + 2).to_bytes(2, "big") + exif_data
+    head = [jpeg[:2]]
+    pos = 2
+    inserted = False
+    while pos + 4 <= len(jpeg) and jpeg[pos] == 0xFF:
+        marker = jpeg[pos + 1]
+        # Stop at start of scan; everything after is entropy-coded data
+        if marker == 0xDA:
+            break
+        length = int.from_bytes(jpeg[pos + 2 : pos + 4], "big")
+        segment = jpeg[pos : pos + 2 + length]
+        if not inserted and marker != 0xE0:
+            head.append(app1)
+            inserted = True
+        if not (marker == 0xE1 and segment[4:10] == b"Exif\x00\x00"):
+            head.append(segment)
+        pos += 2 + length
+
+    if not inserted:
+        head.append(app1)
+    return b"".join(head) + jpeg[pos:]
@@ -0,0 +1,460 @@
+"""
+Duplicate and Burst Detection for NEF Converter
+
+Fingerprints raw files from their metadata and embedded thumbnail without
+decoding the raw data: size, capture time, camera serial number, shutter
+count and a difference hash (dHash) of the thumbnail. Files are memory-
+mapped, so only the pages holding the metadata and thumbnail are read.
+
+Fingerprints find byte-identical copies (confirmed by SHA-256) and bursts
+of near-identical frames, so a batch can convert one file per duplicate
+group or one representative frame per burst. They are kept in a SQLite
+index that later runs reuse.
+"""
+
+import io
+import logging
+import mmap
+import sqlite3
+import struct
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .exif import EXIF_IFD, IFD, MAKER_NOTE, TiffReader, rgb_thumbnail
+from .manifest import file_sha256
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Deduplication modes: "duplicates" converts one file of each group of
+# byte-identical files; "bursts" also converts one frame per burst
+DEDUPE_MODES = ("off", "duplicates", "bursts")
+
+# File name of the fingerprint index, kept in the cache directory or else in
+# the batch's output directory; never in the input, which may be read-only
+INDEX_NAME = ".nef_fingerprints.sqlite"
+
+# Bump when fingerprints are computed differently; older rows are ignored
+INDEX_VERSION = 1
+
+# Consecutive frames of one camera at most this many seconds apart, with
+# thumbnails at most this many dHash bits apart, belong to one burst
+BURST_MAX_GAP = 1.0
+BURST_MAX_DISTANCE = 10
+
+# Side of the grayscale thumbnail the dHash is computed from (one column
+# more than rows, so each row yields HASH_SIZE bit comparisons)
+HASH_SIZE = 8
+
+# Tags read for the fingerprint
+DATE_TIME_ORIGINAL = 0x9003
+SUB_SEC_TIME_ORIGINAL = 0x9291
+BODY_SERIAL_NUMBER = 0xA431
+SUB_IFDS = 0x014A
+NIKON_SERIAL_NUMBER = 0x001D
+NIKON_SHUTTER_COUNT = 0x00A7
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """
+    Cheap identity of a raw file.
+
+    Attributes:
+        size: File size in bytes
+        captured: Capture time as seconds since the epoch (None if unknown)
+        serial: Camera body serial number (None if unknown)
+        shutter_count: Camera shutter count (None if unknown)
+        dhash: 64-bit difference hash of the embedded thumbnail (None if
+            the file has no readable thumbnail)
+        sharpness: Mean gradient of the thumbnail; the sharpest frame
+            represents a burst
+    """
+
+    size: int
+    captured: Optional[float] = None
+    serial: Optional[str] = None
+    shutter_count: Optional[int] = None
+    dhash: Optional[int] = None
+    sharpness: float = 0.0
+
+    def identity(self) -> Tuple[object, ...]:
+        """Get the fields that are equal for copies of the same file."""
+        return (self.size, self.captured, self.serial, self.shutter_count, self.dhash)
+
+
+def _ascii(entry: Optional[Tuple[int, int, bytes]]) -> Optional[str]:
+    """Decode an ASCII tag value."""
+    if entry is None:
+        return None
+    text = entry[2].split(b"\x00", 1)[0].decode("ascii", "replace").strip()
+    return text or None
+
+
+def _capture_time(exif: IFD) -> Optional[float]:
+    """Get the capture time, with sub-seconds, as seconds since the epoch."""
+    stamp = _ascii(exif.get(DATE_TIME_ORIGINAL))
+    if stamp is None:
+        return None
+    try:
+        # Camera clocks have no time zone; UTC keeps the arithmetic simple
+        moment = datetime.strptime(stamp, "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    seconds = moment.replace(tzinfo=timezone.utc).timestamp()
+    fraction = _ascii(exif.get(SUB_SEC_TIME_ORIGINAL))
+    if fraction and fraction.isdigit():
+        seconds += int(fraction) / 10 ** len(fraction)
+    return seconds
+
+
+def _nikon_maker_note(maker_note: bytes) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Read the serial number and shutter count from a Nikon maker note.
+
+    Type 3 maker notes start with "Nikon\\0", a version, and a TIFF header
+    that their offsets are relative to.
+    """
+    if not maker_note.startswith(b"Nikon\x00"):
+        return None, None
+    try:
+        reader = TiffReader(maker_note[10:])
+        entries, _ = reader.ifd(reader.first_ifd)
+        count = entries.get(NIKON_SHUTTER_COUNT)
+        shutter_count = reader.ints(count)[0] if count is not None else None
+    except (ValueError, IndexError, struct.error):
+        return None, None
+    return _ascii(entries.get(NIKON_SERIAL_NUMBER)), shutter_count
+
+
+def _thumbnail_image(reader: TiffReader, ifd0: IFD) -> Optional["Image.Image"]:
+    """Get the smallest embedded image: IFD0's RGB or a JPEG in a SubIFD."""
+    image = rgb_thumbnail(reader, ifd0)
+    if image is not None:
+        return image
+
+    from PIL import Image
+
+    jpegs = []
+    for offset in reader.ints(ifd0[SUB_IFDS]) if SUB_IFDS in ifd0 else []:
+        try:
+            entries, _ = reader.ifd(offset)
+            if 0x0201 in entries:  # JPEGInterchangeFormat
+                start_tag, length_tag = 0x0201, 0x0202
+            elif reader.ints(entries[0x0103]) in ([6], [7]):  # Compression: JPEG
+                start_tag, length_tag = 0x0111, 0x0117
+            else:
+                continue
+            start = reader.ints(entries[start_tag])[0]
+            length = reader.ints(entries[length_tag])[0]
+        except (ValueError, KeyError, IndexError, struct.error):
+            continue
+        jpegs.append((length, start))
+    for length, start in sorted(jpegs):
+        try:
+            image = Image.open(io.BytesIO(reader.data[start : start + length]))
+            image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+            return image
+        except OSError:
+            continue
+    return None
+
+
+def _dhash(image: "Image.Image") -> Tuple[int, float]:
+    """
+    Compute the difference hash and sharpness of an image.
+
+    Returns:
+        (64-bit hash of horizontal brightness gradients, mean absolute
+        gradient of the grayscale image)
+    """
+    from PIL import Image
+
+    gray = image.convert("L")
+    pixels = np.asarray(gray, dtype=np.float32)
+    sharpness = float(np.abs(np.diff(pixels, axis=1)).mean()) if gray.width > 1 else 0.0
+    small = np.asarray(
+        gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX), dtype=np.int16
+    )
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big"), sharpness
+
+
+def fingerprint(path: Path) -> Fingerprint:
+    """
+    Fingerprint a raw file from its metadata and embedded thumbnail.
+
+    Args:
+        path: TIFF-based raw file (NEF, DNG)
+
+    Returns:
+        Fingerprint; fields the file does not provide are None
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not TIFF-based
+    """
+    with open(path, "rb") as handle:
+        size = path.stat().st_size
+        if size < 8:
+            raise ValueError("Not a TIFF-based raw file")
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            reader = TiffReader(data)  # type: ignore[arg-type]
+            ifd0, _ = reader.ifd(reader.first_ifd)
+            exif = reader.sub_ifd(ifd0, EXIF_IFD) or {}
+
+            serial, shutter_count = None, None
+            if MAKER_NOTE in exif:
+                serial, shutter_count = _nikon_maker_note(exif[MAKER_NOTE][2])
+            serial = _ascii(exif.get(BODY_SERIAL_NUMBER)) or serial
+
+            dhash, sharpness = None, 0.0
+            try:
+                image = _thumbnail_image(reader, ifd0)
+                if image is not None:
+                    dhash, sharpness = _dhash(image)
+            except (ValueError, OSError, struct.error) as e:
+                logger.debug(f"No thumbnail hash for {path.name}: {e}")
+
+    return Fingerprint(
+        size=size,
+        captured=_capture_time(exif),
+        serial=serial,
+        shutter_count=shutter_count,
+        dhash=dhash,
+        sharpness=sharpness,
+    )
+
+
+class FingerprintIndex:
+    """
+    SQLite store of fingerprints and content hashes, keyed by file path.
+
+    Rows are reused while the file's size and mtime are unchanged.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """
+        Open or create the index.
+
+        Args:
+            path: Database file, or ":memory:" for an index of this run only
+
+        Raises:
+            sqlite3.Error: If the database cannot be opened
+        """
+        self.path = path
+        self._db = sqlite3.connect(str(path))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " path TEXT PRIMARY KEY, version INTEGER, size INTEGER,"
+            " mtime_ns INTEGER, captured REAL, serial TEXT, shutter_count INTEGER,"
+            " dhash BLOB, sharpness REAL, sha256 TEXT)"
+        )
+
+    def get(self, path: Path) -> Tuple[Fingerprint, Optional[str]]:
+        """
+        Get a file's fingerprint, computing and storing it if needed.
+
+        Args:
+            path: Raw file
+
+        Returns:
+            (fingerprint, SHA-256 if computed before)
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not TIFF-based
+        """
+        stat = path.stat()
+        row = self._db.execute(
+            "SELECT captured, serial, shutter_count, dhash, sharpness, sha256"
+            " FROM fingerprints WHERE path = ? AND version = ? AND size = ?"
+            " AND mtime_ns = ?",
+            (str(path), INDEX_VERSION, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if row is not None:
+            captured, serial, shutter_count, dhash, sharpness, sha256 = row
+            dhash = int.from_bytes(dhash, "big") if dhash is not None else None
+            return (
+                Fingerprint(
+                    stat.st_size, captured, serial, shutter_count, dhash, sharpness
+                ),
+                sha256,
+            )
+
+        computed = fingerprint(path)
+        self._db.execute(
+            "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(path),
+                INDEX_VERSION,
+                stat.st_size,
+                stat.st_mtime_ns,
+                computed.captured,
+                computed.serial,
+                computed.shutter_count,
+                (
+                    computed.dhash.to_bytes(8, "big")
+                    if computed.dhash is not None
+                    else None
+                ),
+                computed.sharpness,
+                None,
+            ),
+        )
+        return computed, None
+
+    def sha256(self, path: Path, known: Optional[str]) -> str:
+        """
+        Get a file's content hash, computing and storing it if needed.
+
+        Args:
+            path: Raw file, already in the index
+            known: Hash returned by get(), if any
+
+        Returns:
+            Hex digest of the file contents
+        """
+        if known is not None:
+            return known
+        digest = file_sha256(path)
+        self._db.execute(
+            "UPDATE fingerprints SET sha256 = ? WHERE path = ?", (digest, str(path))
+        )
+        return digest
+
+    def close(self) -> None:
+        """Save and close the index."""
+        self._db.commit()
+        self._db.close()
+
+
+def open_index(directory: Path) -> FingerprintIndex:
+    """
+    Open the fingerprint index kept in a directory.
+
+    Falls back to an index for this run only if the directory is not
+    writable.
+
+    Args:
+        directory: Cache directory, or the batch's output directory
+
+    Returns:
+        Opened index
+    """
+    try:
+        return FingerprintIndex(directory / INDEX_NAME)
+    except sqlite3.Error as e:
+        logger.warning(
+            f"Fingerprint index not saved ({e}); fingerprints are not reused"
+        )
+        return FingerprintIndex(":memory:")
+
+
+def _same_burst(last: Fingerprint, current: Fingerprint) -> bool:
+    """Check whether a frame continues the burst that last ended."""
+    if last.dhash is None or current.dhash is None:
+        return False
+    if last.captured is None or current.captured is None:
+        return False
+    return (
+        current.serial == last.serial
+        and current.captured - last.captured <= BURST_MAX_GAP
+        and bin(last.dhash ^ current.dhash).count("1") <= BURST_MAX_DISTANCE
+    )
+
+
+def select_files(
+    files: Sequence[Path], mode: str, index: FingerprintIndex
+) -> Tuple[List[Path], Dict[str, int]]:
+    """
+    Pick the files to convert, dropping duplicates and, optionally, bursts.
+
+    Files with equal fingerprints are compared by SHA-256, and only the
+    first of each byte-identical group is kept. In "bursts" mode, frames
+    from one camera taken at most BURST_MAX_GAP seconds apart whose
+    thumbnails differ by at most BURST_MAX_DISTANCE dHash bits form a
+    burst, represented by its sharpest frame. Files that cannot be
+    fingerprinted are always kept.
+
+    Args:
+        files: Candidate raw files, in processing order
+        mode: One of DEDUPE_MODES
+        index: Fingerprint index
+
+    Returns:
+        (files to convert in their original order, counts of "duplicates"
+        and "burst_frames" dropped)
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in DEDUPE_MODES:
+        raise ValueError(
+            f"Unknown deduplication mode: {mode!r} "
+            f"(expected one of: {', '.join(DEDUPE_MODES)})"
+        )
+    counts = {"duplicates": 0, "burst_frames": 0}
+    if mode == "off":
+        return list(files), counts
+
+    prints: Dict[Path, Fingerprint] = {}
+    hashes: Dict[Path, Optional[str]] = {}
+    groups: Dict[Tuple[object, ...], List[Path]] = {}
+    for path in files:
+        try:
+            prints[path], hashes[path] = index.get(path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Cannot fingerprint {path.name}: {e}")
+            continue
+        groups.setdefault(prints[path].identity(), []).append(path)
+
+    dropped = set()
+    for candidates in groups.values():
+        if len(candidates) < 2:
+            continue
+        seen: Dict[str, Path] = {}
+        for path in candidates:
+            digest = index.sha256(path, hashes[path])
+            if digest in seen:
+                logger.info(f"Skipping {path.name}: duplicate of {seen[digest].name}")
+                dropped.add(path)
+                counts["duplicates"] += 1
+            else:
+                seen[digest] = path
+
+    if mode == "bursts":
+        frames = sorted(
+            (
+                path
+                for path, print_ in prints.items()
+                if path not in dropped and print_.captured is not None
+            ),
+            key=lambda path: (prints[path].serial or "", prints[path].captured),
+        )
+        bursts: List[List[Path]] = []
+        for path in frames:
+            if bursts and _same_burst(prints[bursts[-1][-1]], prints[path]):
+                bursts[-1].append(path)
+            else:
+                bursts.append([path])
+
+        for burst in bursts:
+            if len(burst) < 2:
+                continue
+            best = max(burst, key=lambda frame: prints[frame].sharpness)
+            logger.info(
+                f"Burst of {len(burst)} frames from {burst[0].name}: "
+                f"converting {best.name}"
+            )
+            dropped.update(frame for frame in burst if frame != best)
+            counts["burst_frames"] += len(burst) - 1
+
+    return [path for path in files if path not in dropped], counts
@@ -0,0 +1,751 @@
+"""
+Distributed Conversion for NEF Converter
+
+Spreads a batch over several machines. The coordinator runs the batch as
+usual (discovery, manifest, checkpoint journal, statistics), but instead of
+converting in a local pool it serves the files as work items over TCP to
+`nef2jpg worker` processes, which convert them with their own pool and
+report the results back.
+
+Sources and outputs live on a filesystem every node can reach (NFS, SMB).
+Task paths are relative to the coordinator's input and output directories,
+so a worker can mount them elsewhere (`nef2jpg worker -d MOUNT -o MOUNT`).
+
+Protocol: one JSON object per line, over one TCP connection per worker.
+    worker       {"type": "hello", "name": ..., "slots": N, "settings": {...},
+                  "token": ...}
+    coordinator  {"type": "welcome", "hash": bool}   or  {"type": "error", ...}
+    coordinator  {"type": "batch", "input": DIR, "output": DIR}
+    coordinator  {"type": "task", "id": N, "source": PATH, "output": PATH}
+    worker       {"type": "result", "id": N, "success": bool, "stats": {...}}
+    worker       {"type": "heartbeat"}            every HEARTBEAT_INTERVAL
+    coordinator  {"type": "done"}                 once the batch is finished
+
+A worker that disconnects or stays silent for HEARTBEAT_TIMEOUT seconds is
+dropped and its unfinished tasks are queued again for the other workers.
+
+Security: workers authenticate with a shared token, compared in constant
+time. The coordinator only listens on a non-loopback interface when it has
+one. Messages are not encrypted, so run distributed batches on trusted
+networks only. Workers resolve every task path and refuse those outside
+their input and output directories, so a coordinator cannot make them
+read or write elsewhere.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import math
+import os
+import queue
+import re
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .converter import ConversionTask, FileStats, NEFConverter
+from .server import is_loopback
+
+logger = logging.getLogger(__name__)
+
+# Default TCP port of the coordinator
+DEFAULT_COORDINATOR_PORT = 8766
+
+# Seconds between heartbeats sent by a worker
+HEARTBEAT_INTERVAL = 2.0
+
+# Seconds of silence after which the coordinator drops a worker
+HEARTBEAT_TIMEOUT = 10.0
+
+# Times a task is handed out before it fails; a file that takes down every
+# worker it lands on is not retried forever
+MAX_ATTEMPTS = 3
+
+# Tasks sent to a worker beyond its slots, so it starts the next file
+# without waiting for a round trip
+PREFETCH_PER_WORKER = 1
+
+# Tasks discovered ahead of the workers; bounds the coordinator's memory on
+# huge trees while keeping every worker busy
+QUEUE_AHEAD = 256
+
+# Largest accepted message line in bytes
+MAX_MESSAGE_BYTES = 2**20
+
+# Seconds between attempts of a worker to reach the coordinator
+CONNECT_RETRY_INTERVAL = 1.0
+
+# Environment variable holding the shared token, so it stays out of the
+# process list
+TOKEN_ENV = "NEF2JPG_TOKEN"
+
+Result = Tuple[bool, Path, FileStats]
+
+
+@dataclass
+class WorkerStats:
+    """Work done by one worker over the coordinator's lifetime."""
+
+    name: str
+    slots: int
+    address: str
+    converted: int = 0
+    failed: int = 0
+    requeued: int = 0
+    seconds: float = 0.0
+    connected: bool = True
+
+
+@dataclass
+class _Task:
+    """A file waiting for, or assigned to, a worker."""
+
+    id: int
+    source: Path
+    relative_source: str
+    relative_output: str
+    attempts: int = 0
+
+
+@dataclass
+class _Connection:
+    """A connected worker and the tasks assigned to it."""
+
+    stats: WorkerStats
+    writer: asyncio.StreamWriter
+    tasks: Dict[int, _Task] = field(default_factory=dict)
+
+    def send(self, message: Dict[str, Any]) -> None:
+        """Queue a message for the worker."""
+        if not self.writer.is_closing():
+            self.writer.write(_encode(message))
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    """Serialize a message as one JSON line."""
+    return json.dumps(message, default=str).encode("utf-8") + b"\n"
+
+
+def _confine(root: Path, relative: str) -> Path:
+    """
+    Resolve a task path, which must lie below root.
+
+    Raises:
+        ValueError: If the path leaves root, through "..", an absolute
+            path or a symlink
+    """
+    resolved = (root / relative).resolve()
+    if not resolved.is_relative_to(root.resolve()):
+        raise ValueError(f"Task path is outside {root}: {relative}")
+    return resolved
+
+
+def _check_stats(file_stats: Any, success: bool, needs_hash: bool) -> Optional[str]:
+    """
+    Check the statistics of a worker's result before the batch uses them.
+
+    Returns:
+        What is wrong with them, or None if they are well formed
+    """
+    if not isinstance(file_stats, dict):
+        return "stats are not an object"
+    if not success:
+        return None
+    bytes_read = file_stats.get("bytes_read")
+    if not isinstance(bytes_read, int) or isinstance(bytes_read, bool):
+        return "bytes_read is not an integer"
+    if bytes_read < 0:
+        return "bytes_read is negative"
+    seconds = file_stats.get("seconds")
+    if not isinstance(seconds, (int, float)) or isinstance(seconds, bool):
+        return "seconds is not a number"
+    if not (math.isfinite(seconds) and seconds >= 0):
+        return "seconds is not a finite, non-negative number"
+    stages = file_stats.get("stages", {})
+    if not isinstance(stages, dict) or not all(
+        isinstance(value, (int, float)) for value in stages.values()
+    ):
+        return "stages are not numbers"
+    sha256 = file_stats.get("sha256")
+    if needs_hash and not (
+        isinstance(sha256, str) and re.fullmatch(r"[0-9a-f]{64}", sha256)
+    ):
+        return "sha256 is missing or malformed"
+    return None
+
+
+def _token_matches(given: Any, expected: str) -> bool:
+    """Compare a worker's token with the coordinator's in constant time."""
+    return isinstance(given, str) and hmac.compare_digest(
+        given.encode("utf-8"), expected.encode("utf-8")
+    )
+
+
+def _normalize(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Round-trip settings through JSON, as they arrive from a worker."""
+    normalized: Dict[str, Any] = json.loads(json.dumps(settings))
+    return normalized
+
+
+class Coordinator:
+    """
+    Serves the files of a batch to remote workers.
+
+    The coordinator listens on a background thread running an asyncio loop;
+    run() is a drop-in for the local pool of NEFConverter.convert_batch().
+    Workers must convert with the same settings as the coordinator's
+    converter, or they are turned away.
+    """
+
+    def __init__(
+        self,
+        converter: NEFConverter,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_COORDINATOR_PORT,
+        token: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the coordinator; call start() before run().
+
+        Args:
+            converter: Converter whose settings workers must match
+            host: Interface to listen on; other machines can only connect
+                through a non-loopback interface, which requires a token
+            port: TCP port (0 = any free port)
+            token: Shared secret workers must present
+        """
+        self.converter = converter
+        self.host = host
+        self.requested_port = port
+        self.token = token
+        self.workers: Dict[str, WorkerStats] = {}
+        self.requeued = 0
+        self.peak_slots = 0
+        self._settings = _normalize(converter.settings())
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: List[_Connection] = []
+        self._handlers: List["asyncio.Task[None]"] = []
+        self._pending: Deque[_Task] = deque()
+        self._results: "queue.Queue[Result]" = queue.Queue()
+        self._batch: Optional[Dict[str, Any]] = None
+        self._next_id = 0
+        self._closing = False
+
+    def __enter__(self) -> "Coordinator":
+        """Start listening."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop listening and release the workers."""
+        self.close()
+
+    def start(self) -> None:
+        """
+        Start listening for workers on a background thread.
+
+        Raises:
+            OSError: If the address is in use
+            ValueError: If host is not a loopback interface and there is
+                no token
+        """
+        if not self.token and not is_loopback(self.host):
+            raise ValueError(
+                f"Refusing to listen on {self.host!r} without a token: any "
+                f"machine that can connect could take work and write outputs "
+                f"(set --token or {TOKEN_ENV})"
+            )
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=loop.run_forever, name="nef-coordinator", daemon=True
+        )
+        self._thread.start()
+        self._loop = loop
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self._handle, self.host, self.requested_port),
+                loop,
+            ).result()
+        except BaseException:
+            self._stop_loop()
+            raise
+        logger.info(f"Coordinating on {self.address}")
+
+    @property
+    def port(self) -> int:
+        """TCP port the coordinator listens on."""
+        assert self._server is not None, "Coordinator is not started"
+        return int(self._server.sockets[0].getsockname()[1])
+
+    @property
+    def address(self) -> str:
+        """Address workers connect to, e.g. 127.0.0.1:8766."""
+        return f"{self.host}:{self.port}"
+
+    def close(self) -> None:
+        """Tell connected workers the batch is finished and stop listening."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._stop_loop()
+
+    def _stop_loop(self) -> None:
+        """Stop the background loop and wait for its thread."""
+        assert self._loop is not None and self._thread is not None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    async def _shutdown(self) -> None:
+        """Release the workers and wait for their handlers."""
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        for connection in self._connections:
+            connection.send({"type": "done"})
+            connection.writer.close()
+        # Closing the connections ends the handlers' reads
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def run(
+        self, tasks: Iterable[ConversionTask], input_root: Path, output_root: Path
+    ) -> Iterator[Result]:
+        """
+        Have the workers convert tasks, yielding results as they complete.
+
+        Tasks are consumed lazily; at most QUEUE_AHEAD of them are waiting
+        for or assigned to workers at a time. Without workers the batch
+        waits until one connects.
+
+        Args:
+            tasks: Tuples of (converter, nef_path, output_path) with paths
+                inside input_root and output_root; the converter is unused
+            input_root: Input directory of the batch
+            output_root: Output directory of the batch
+
+        Yields:
+            Tuples of (success, nef_path, file_stats)
+        """
+        from tqdm import tqdm
+
+        batch = {"type": "batch", "input": str(input_root), "output": str(output_root)}
+        self._call(self._begin, batch)
+        if not self.workers:
+            logger.info(f"Waiting for workers to connect to {self.address}")
+
+        outstanding = 0
+        with tqdm(total=0, desc="Converting NEF files", unit="file") as pbar:
+            for _, source, output in tasks:
+                while outstanding >= QUEUE_AHEAD:
+                    yield self._results.get()
+                    outstanding -= 1
+                    pbar.update(1)
+                self._call(
+                    self._add,
+                    source,
+                    source.relative_to(input_root).as_posix(),
+                    output.relative_to(output_root).as_posix(),
+                )
+                outstanding += 1
+                pbar.total += 1
+                pbar.refresh()
+
+            while outstanding:
+                yield self._results.get()
+                outstanding -= 1
+                pbar.update(1)
+
+    def _call(self, callback: Any, *args: Any) -> None:
+        """Run a callback on the coordinator's loop."""
+        assert self._loop is not None, "Coordinator is not started"
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def _begin(self, batch: Dict[str, Any]) -> None:
+        """Announce a batch to the connected workers."""
+        self._batch = batch
+        for connection in self._connections:
+            connection.send(batch)
+
+    def _add(self, source: Path, relative_source: str, relative_output: str) -> None:
+        """Queue a task and hand it out if a worker has room."""
+        self._next_id += 1
+        self._pending.append(
+            _Task(self._next_id, source, relative_source, relative_output)
+        )
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand pending tasks to the workers with the most free slots."""
+        while self._pending and self._connections:
+            connection = max(
+                self._connections,
+                key=lambda c: c.stats.slots + PREFETCH_PER_WORKER - len(c.tasks),
+            )
+            if len(connection.tasks) >= connection.stats.slots + PREFETCH_PER_WORKER:
+                return
+            task = self._pending.popleft()
+            task.attempts += 1
+            connection.tasks[task.id] = task
+            connection.send(
+                {
+                    "type": "task",
+                    "id": task.id,
+                    "source": task.relative_source,
+                    "output": task.relative_output,
+                }
+            )
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve one worker until it disconnects or goes silent."""
+        handler = asyncio.current_task()
+        assert handler is not None
+        self._handlers.append(handler)
+        peer = writer.get_extra_info("peername")
+        address = f"{peer[0]}:{peer[1]}" if peer else "unknown"
+        connection: Optional[_Connection] = None
+        try:
+            hello = await self._receive(reader)
+            connection = self._register(hello, address, writer)
+            if connection is None:
+                return
+            while True:
+                message = await self._receive(reader)
+                if message.get("type") == "result":
+                    self._finish(connection, message)
+        except (ConnectionError, asyncio.TimeoutError, ValueError) as e:
+            if connection is not None and not self._closing:
+                logger.warning(f"Lost worker {connection.stats.name}: {e}")
+        finally:
+            if connection is not None:
+                self._drop(connection)
+            writer.close()
+            self._handlers.remove(handler)
+
+    async def _receive(self, reader: asyncio.StreamReader) -> Dict[str, Any]:
+        """
+        Read one message, waiting at most HEARTBEAT_TIMEOUT.
+
+        Raises:
+            ConnectionError: If the worker disconnected
+            asyncio.TimeoutError: If the worker stayed silent
+            ValueError: If the message is malformed or too long
+        """
+        line = await asyncio.wait_for(reader.readline(), HEARTBEAT_TIMEOUT)
+        if not line:
+            raise ConnectionError("connection closed")
+        if len(line) > MAX_MESSAGE_BYTES:
+            raise ValueError("message too long")
+        message = json.loads(line)
+        if not isinstance(message, dict):
+            raise ValueError("message is not a JSON object")
+        return message
+
+    def _register(
+        self, hello: Dict[str, Any], address: str, writer: asyncio.StreamWriter
+    ) -> Optional[_Connection]:
+        """Accept a worker whose settings match, or turn it away."""
+        if hello.get("type") != "hello":
+            raise ValueError("expected a hello message")
+        if self.token and not _token_matches(hello.get("token"), self.token):
+            logger.warning(f"Rejected worker at {address}: invalid token")
+            writer.write(_encode({"type": "error", "message": "Invalid token"}))
+            return None
+        settings = hello.get("settings") or {}
+        differing = sorted(
+            key
+            for key in set(settings) | set(self._settings)
+            if settings.get(key) != self._settings.get(key)
+        )
+        if differing:
+            message = (
+                f"Worker settings differ from the coordinator's: "
+                f"{', '.join(differing)}"
+            )
+            logger.warning(f"Rejected worker at {address}: {message}")
+            writer.write(_encode({"type": "error", "message": message}))
+            return None
+
+        name = str(hello.get("name") or address)
+        if name in self.workers and self.workers[name].connected:
+            name = f"{name}@{address}"
+        stats = self.workers.get(name) or WorkerStats(name, 0, address)
+        stats.slots = max(1, int(hello.get("slots") or 1))
+        stats.address = address
+        stats.connected = True
+        self.workers[name] = stats
+
+        connection = _Connection(stats, writer)
+        self._connections.append(connection)
+        self.peak_slots = max(
+            self.peak_slots, sum(c.stats.slots for c in self._connections)
+        )
+        connection.send({"type": "welcome", "hash": self._needs_hash()})
+        if self._batch is not None:
+            connection.send(self._batch)
+        logger.info(f"Worker {name} joined from {address} with {stats.slots} slots")
+        self._dispatch()
+        return connection
+
+    def _needs_hash(self) -> bool:
+        """Whether results must carry the source's SHA-256 for the manifest."""
+        return self.converter.incremental
+
+    def _finish(self, connection: _Connection, message: Dict[str, Any]) -> None:
+        """Record a worker's result and give it more work."""
+        task_id = message.get("id")
+        task = connection.tasks.pop(task_id, None) if isinstance(task_id, int) else None
+        if task is None:
+            return  # already requeued and reported elsewhere
+        file_stats: FileStats = message.get("stats") or {}
+        success = message.get("success") is True
+        problem = _check_stats(file_stats, success, self._needs_hash())
+        if problem is not None:
+            logger.warning(
+                f"Malformed result for {task.source.name} from "
+                f"{connection.stats.name}: {problem}"
+            )
+            success = False
+            file_stats = {"error": f"Malformed result from worker: {problem}"}
+        if success:
+            connection.stats.converted += 1
+            connection.stats.seconds += float(file_stats.get("seconds", 0.0))
+        else:
+            connection.stats.failed += 1
+        file_stats["worker"] = connection.stats.name
+        self._results.put((success, task.source, file_stats))
+        self._dispatch()
+
+    def _drop(self, connection: _Connection) -> None:
+        """Forget a worker and queue its unfinished tasks again."""
+        self._connections.remove(connection)
+        connection.stats.connected = False
+        for task in sorted(connection.tasks.values(), key=lambda t: t.id, reverse=True):
+            if task.attempts >= MAX_ATTEMPTS:
+                logger.error(f"Giving up on {task.source}: lost {task.attempts} times")
+                self._results.put(
+                    (
+                        False,
+                        task.source,
+                        {"error": f"Worker lost {task.attempts} times"},
+                    )
+                )
+            else:
+                self._pending.appendleft(task)
+                connection.stats.requeued += 1
+                self.requeued += 1
+        if connection.tasks:
+            logger.info(
+                f"Requeued {len(connection.tasks)} tasks of {connection.stats.name}"
+            )
+        connection.tasks.clear()
+        self._dispatch()
+
+
+class Worker:
+    """
+    Converts files served by a Coordinator.
+
+    Tasks run in the converter's pool, up to slots at once; a heartbeat
+    thread tells the coordinator the worker is alive while files convert.
+    """
+
+    def __init__(
+        self,
+        converter: NEFConverter,
+        host: str,
+        port: int = DEFAULT_COORDINATOR_PORT,
+        name: Optional[str] = None,
+        slots: Optional[int] = None,
+        input_root: Optional[Path] = None,
+        output_root: Optional[Path] = None,
+        token: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the worker.
+
+        Args:
+            converter: Converter with the same settings as the coordinator's
+            host: Coordinator host
+            port: Coordinator port
+            name: Name shown in the coordinator's statistics (default:
+                hostname and process ID)
+            slots: Files converted at once (default: the converter's
+                max_workers, or one per CPU)
+            input_root: Where the coordinator's input directory is mounted
+                on this machine (default: the coordinator's path)
+            output_root: Where the coordinator's output directory is mounted
+                on this machine (default: the coordinator's path)
+            token: Shared secret the coordinator expects
+        """
+        self.converter = converter
+        self.host = host
+        self.port = port
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.slots = slots or converter.max_workers or os.cpu_count() or 1
+        self.input_root = input_root
+        self.output_root = output_root
+        self.token = token
+        self._socket: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._roots: Tuple[Path, Path] = (Path(), Path())
+        self.counts = {"converted": 0, "failed": 0}
+
+    def run(self, connect_timeout: float = 60.0) -> Dict[str, int]:
+        """
+        Convert tasks until the coordinator finishes the batch.
+
+        Args:
+            connect_timeout: Seconds to keep trying to reach the coordinator
+
+        Returns:
+            Counts of converted and failed files
+
+        Raises:
+            ConnectionError: If the coordinator cannot be reached, or the
+                connection is lost before the batch is finished
+            ValueError: If the coordinator rejects the worker
+        """
+        self._socket = self._connect(connect_timeout)
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(stop,), name="nef-heartbeat", daemon=True
+        )
+        executor = None
+        try:
+            with self._socket.makefile("rb") as reader:
+                self._send(
+                    {
+                        "type": "hello",
+                        "name": self.name,
+                        "slots": self.slots,
+                        "settings": self.converter.settings(),
+                        "token": self.token,
+                    }
+                )
+                welcome = self._receive(reader)
+                if welcome.get("type") == "error":
+                    raise ValueError(welcome.get("message", "Rejected by coordinator"))
+                if welcome.get("hash"):
+                    # The coordinator's manifest needs each source's hash
+                    self.converter.incremental = True
+                heartbeat.start()
+                executor = self.converter.create_executor(self.slots)
+                logger.info(f"Worker {self.name} connected to {self.host}:{self.port}")
+
+                while True:
+                    message = self._receive(reader)
+                    kind = message.get("type")
+                    if kind == "done":
+                        break
+                    if kind == "batch":
+                        self._roots = (
+                            self.input_root or Path(message["input"]),
+                            self.output_root or Path(message["output"]),
+                        )
+                    elif kind == "task":
+                        self._start(executor, message)
+        finally:
+            stop.set()
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self._socket.close()
+        logger.info(
+            f"Batch finished: {self.counts['converted']} converted, "
+            f"{self.counts['failed']} failed"
+        )
+        return self.counts
+
+    def _connect(self, timeout: float) -> socket.socket:
+        """Connect to the coordinator, retrying until the timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=5.0)
+                break
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(
+                        f"Cannot reach coordinator at {self.host}:{self.port}: {e}"
+                    ) from None
+                time.sleep(CONNECT_RETRY_INTERVAL)
+        sock.settimeout(None)
+        # Notice a coordinator host that vanished without closing the connection
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return sock
+
+    def _receive(self, reader: Any) -> Dict[str, Any]:
+        """Read one message from the coordinator."""
+        line = reader.readline(MAX_MESSAGE_BYTES)
+        if not line:
+            raise ConnectionError("Coordinator closed the connection")
+        message: Dict[str, Any] = json.loads(line)
+        return message
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        """Send a message; safe to call from any thread."""
+        assert self._socket is not None
+        with self._send_lock:
+            self._socket.sendall(_encode(message))
+
+    def _heartbeat(self, stop: threading.Event) -> None:
+        """Send heartbeats until stopped."""
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self._send({"type": "heartbeat"})
+            except OSError:
+                return
+
+    def _start(self, executor: Any, message: Dict[str, Any]) -> None:
+        """Submit a task to the pool, reporting its result when done."""
+        input_root, output_root = self._roots
+        try:
+            source = _confine(input_root, str(message["source"]))
+            output = _confine(output_root, str(message["output"]))
+            output.parent.mkdir(parents=True, exist_ok=True)
+        except (KeyError, ValueError, OSError) as e:
+            logger.warning(f"Refused task {message.get('id')}: {e}")
+            self._report(message, False, {"error": str(e)})
+            return
+        future = executor.submit(
+            NEFConverter._convert_single_file, (self.converter, source, output)
+        )
+
+        def report(done: Any) -> None:
+            try:
+                success, _, file_stats = done.result()
+            except Exception as e:
+                success, file_stats = False, {"error": str(e)}
+            self._report(message, success, file_stats)
+
+        future.add_done_callback(report)
+
+    def _report(
+        self, message: Dict[str, Any], success: bool, file_stats: FileStats
+    ) -> None:
+        """Count a finished task and send its result to the coordinator."""
+        with self._send_lock:
+            self.counts["converted" if success else "failed"] += 1
+        try:
+            self._send(
+                {
+                    "type": "result",
+                    "id": message.get("id"),
+                    "success": success,
+                    "stats": file_stats,
+                }
+            )
+        except OSError as e:
+            logger.warning(f"Could not report task {message.get('id')}: {e}")
@@ -0,0 +1,293 @@
+"""
+Output Encoders for NEF Converter
+
+One encoder per output format, each with tunable speed/size options.
+Encoders are looked up by format name, so new formats can be added with
+register_encoder().
+"""
+
+import io
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, features
+
+from .tiff import write_rgb_tiff
+
+logger = logging.getLogger(__name__)
+
+# Decoded pixels: an 8-bit image, or a 16-bit RGB array Pillow cannot hold
+Pixels = Union[Image.Image, np.ndarray]
+
+
+class Encoder(ABC):
+    """
+    Base class for output encoders.
+
+    Subclasses set the class attributes and implement encode().
+
+    Attributes:
+        name: Format name used in renditions, e.g. "JPEG"
+        aliases: Other names the format is known by, e.g. "JPG"
+        extension: File extension including the dot
+        defaults: Supported options and their default values
+    """
+
+    name = ""
+    aliases: Tuple[str, ...] = ()
+    extension = ""
+    defaults: Dict[str, Any] = {}
+
+    def options(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Merge option overrides into the defaults.
+
+        Args:
+            overrides: Options to change (default: none)
+
+        Returns:
+            Complete options
+
+        Raises:
+            ValueError: If an option is not supported by this encoder
+        """
+        overrides = overrides or {}
+        unknown = set(overrides) - set(self.defaults)
+        if unknown:
+            raise ValueError(
+                f"Unknown {self.name} option(s): {', '.join(sorted(unknown))} "
+                f"(supported: {', '.join(self.defaults) or 'none'})"
+            )
+        return {**self.defaults, **overrides}
+
+    def bit_depth(self, options: Dict[str, Any]) -> int:
+        """
+        Get the sample depth this encoder needs as input.
+
+        Args:
+            options: Complete options
+
+        Returns:
+            8, or 16 for encoders that take 16-bit arrays
+        """
+        return 8
+
+    @abstractmethod
+    def encode(
+        self,
+        pixels: Pixels,
+        quality: int,
+        options: Dict[str, Any],
+        exif_data: Optional[bytes] = None,
+    ) -> bytes:
+        """
+        Encode pixels in memory.
+
+        Args:
+            pixels: Image, or an RGB uint16 array when bit_depth() is 16
+            quality: Quality (1-100) for lossy formats
+            options: Complete options from options()
+            exif_data: EXIF data to embed, if any
+
+        Returns:
+            Encoded file contents
+        """
+
+
+class PillowEncoder(Encoder):
+    """Encoder backed by a Pillow image plugin."""
+
+    # Option names passed straight through to Image.save()
+    save_options: Tuple[str, ...] = ()
+
+    def encode(
+        self,
+        pixels: Pixels,
+        quality: int,
+        options: Dict[str, Any],
+        exif_data: Optional[bytes] = None,
+    ) -> bytes:
+        """Encode an image with Image.save(); see Encoder.encode()."""
+        params = {key: options[key] for key in self.save_options}
+        params.update(self.save_params(quality, options))
+        if exif_data:
+            params["exif"] = exif_data
+
+        buffer = io.BytesIO()
+        pixels.save(buffer, self.name, **params)  # type: ignore[union-attr]
+        return buffer.getvalue()
+
+    def save_params(self, quality: int, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Get format-specific Image.save() arguments beyond save_options."""
+        return {"quality": quality}
+
+
+class JPEGEncoder(PillowEncoder):
+    """
+    JPEG encoder.
+
+    optimize computes Huffman tables per image (a few percent smaller, a
+    little slower); progressive implies an extra pass over the coefficients;
+    subsampling is "4:4:4", "4:2:2" or "4:2:0" (None = Pillow's choice).
+    """
+
+    name = "JPEG"
+    aliases = ("JPG",)
+    extension = ".jpg"
+    defaults = {"optimize": False, "progressive": False, "subsampling": None}
+    save_options = ("optimize", "progressive")
+
+    def save_params(self, quality: int, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Add quality and, when set, chroma subsampling."""
+        params: Dict[str, Any] = {"quality": quality}
+        if options["subsampling"] is not None:
+            params["subsampling"] = options["subsampling"]
+        return params
+
+
+class WebPEncoder(PillowEncoder):
+    """
+    WebP encoder.
+
+    method trades speed for size from 0 (fastest) to 6 (smallest); lossless
+    ignores quality for the pixels.
+    """
+
+    name = "WEBP"
+    extension = ".webp"
+    defaults = {"method": 4, "lossless": False}
+    save_options = ("method", "lossless")
+
+
+class AVIFEncoder(PillowEncoder):
+    """
+    AVIF encoder (needs Pillow built with libavif).
+
+    speed runs from 0 (slowest, smallest) to 10 (fastest).
+    """
+
+    name = "AVIF"
+    extension = ".avif"
+    defaults = {"speed": 6}
+    save_options = ("speed",)
+
+
+class PNGEncoder(PillowEncoder):
+    """
+    PNG encoder.
+
+    compress_level runs from 0 (no compression) to 9; the default of 1 is
+    several times faster than zlib's usual 6 for photographs at a modest
+    size cost.
+    """
+
+    name = "PNG"
+    extension = ".png"
+    defaults = {"compress_level": 1}
+    save_options = ("compress_level",)
+
+    def save_params(self, quality: int, options: Dict[str, Any]) -> Dict[str, Any]:
+        """PNG is lossless; quality does not apply."""
+        return {}
+
+
+class TIFFEncoder(Encoder):
+    """
+    TIFF encoder.
+
+    bits=16 keeps LibRaw's 16-bit output. Both depths are written by the
+    native TIFF writer, since Pillow has no 16-bit RGB mode and its libtiff
+    writer cannot store EXIF sub-IFDs. compression is
+    "none" or "deflate" (with a horizontal predictor), at zlib level level;
+    on 16-bit photographs level 1 is over three times faster than 6 for a
+    few percent more bytes.
+    """
+
+    name = "TIFF"
+    extension = ".tif"
+    defaults = {"bits": 16, "compression": "deflate", "level": 1}
+
+    def options(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Merge options, also validating bits and compression."""
+        options = super().options(overrides)
+        if options["bits"] not in (8, 16):
+            raise ValueError("TIFF bits must be 8 or 16")
+        if options["compression"] not in ("none", "deflate"):
+            raise ValueError("TIFF compression must be 'none' or 'deflate'")
+        return options
+
+    def bit_depth(self, options: Dict[str, Any]) -> int:
+        """TIFF output keeps the requested depth."""
+        return int(options["bits"])
+
+    def encode(
+        self,
+        pixels: Pixels,
+        quality: int,
+        options: Dict[str, Any],
+        exif_data: Optional[bytes] = None,
+    ) -> bytes:
+        """
+        Encode a TIFF with the native writer; see Encoder.encode().
+
+        Both depths carry EXIF, including the Exif and GPS sub-IFDs that
+        Pillow's libtiff writer rejects.
+        """
+        if not isinstance(pixels, np.ndarray):
+            pixels = np.asarray(pixels.convert("RGB"))
+        return write_rgb_tiff(
+            pixels, options["compression"], options["level"], exif_data
+        )
+
+
+# Encoders by format name
+ENCODERS: Dict[str, Encoder] = {}
+
+# Format names by alias, e.g. "JPG" -> "JPEG"
+ENCODER_ALIASES: Dict[str, str] = {}
+
+
+def register_encoder(encoder: Encoder) -> None:
+    """
+    Make an encoder available under its format name and aliases.
+
+    Args:
+        encoder: Encoder instance; replaces any encoder of the same name
+    """
+    ENCODERS[encoder.name] = encoder
+    for alias in encoder.aliases:
+        ENCODER_ALIASES[alias] = encoder.name
+
+
+def get_encoder(name: str) -> Encoder:
+    """
+    Look up the encoder for a format.
+
+    Args:
+        name: Format name or alias, case-insensitive
+
+    Returns:
+        The registered encoder
+
+    Raises:
+        ValueError: If no encoder is registered for the format
+    """
+    name = name.upper()
+    try:
+        return ENCODERS[ENCODER_ALIASES.get(name, name)]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported output format: {name!r} "
+            f"(expected one of: {', '.join(ENCODERS)})"
+        ) from None
+
+
+for _encoder in (JPEGEncoder(), PNGEncoder(), WebPEncoder(), TIFFEncoder()):
+    register_encoder(_encoder)
+
+if "avif" in features.modules and features.check_module("avif"):
+    register_encoder(AVIFEncoder())
+else:
+    logger.debug("AVIF output unavailable: Pillow was built without libavif")
@@ -0,0 +1,190 @@
+"""
+Execution Backends for NEF Converter
+
+Chooses between a thread pool and a process pool for parallel conversion.
+LibRaw's postprocess() and Pillow's encoders release the GIL while they
+work, so threads can run them in parallel without the start-up, import and
+pickling cost of worker processes. The automatic choice measures how well
+that works on this machine.
+
+Worker processes are warmed up by warm_worker() when the pool starts, so
+the first conversion in each worker does not pay for imports and codec
+initialisation.
+"""
+
+import functools
+import io
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Executor choices: "auto" measures GIL release and picks one of the others
+EXECUTORS = ("auto", "thread", "process")
+
+# Threads are used when they reach this share of ideal parallel speed-up
+THREAD_MIN_EFFICIENCY = 0.8
+
+# Threads run concurrently in the probe, and its frame size
+PROBE_THREADS = 2
+PROBE_SIZE = (1200, 800)
+
+# Timed probe rounds; the best round counts, to ignore scheduling noise
+PROBE_ROUNDS = 3
+
+# Size of the raw decoded and encoded to warm up a worker process
+WARM_UP_SIZE = (64, 64)
+
+
+def _parallel_efficiency(work: Callable[[], object], threads: int) -> float:
+    """
+    Measure how close threads come to running work truly in parallel.
+
+    Args:
+        work: Function to run once per thread
+        threads: Number of concurrent threads
+
+    Returns:
+        Speed-up of running work on all threads at once over running it
+        back to back, divided by the ideal speed-up (1.0 = no GIL contention)
+    """
+    work()  # warm up caches and lazy imports
+
+    best = 0.0
+    for _ in range(PROBE_ROUNDS):
+        start = time.perf_counter()
+        for _ in range(threads):
+            work()
+        sequential = time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            start = time.perf_counter()
+            for future in [pool.submit(work) for _ in range(threads)]:
+                future.result()
+            parallel = time.perf_counter() - start
+
+        best = max(best, sequential / parallel / threads)
+    return best
+
+
+@functools.lru_cache(maxsize=None)
+def measure_gil_release() -> Dict[str, float]:
+    """
+    Measure parallel efficiency of threads for raw decoding and encoding.
+
+    Decodes and encodes a small synthetic raw on PROBE_THREADS threads at
+    once; takes well under a second and runs once per process.
+
+    Returns:
+        Efficiency (0-1) of "decode" (rawpy postprocess) and "encode"
+        (Pillow JPEG) in threads
+    """
+    import rawpy
+    from PIL import Image
+
+    from .synthetic import make_synthetic_raw
+
+    raw = make_synthetic_raw(*PROBE_SIZE, preview=False)
+    with rawpy.imread(io.BytesIO(raw)) as image:
+        frame = Image.fromarray(image.postprocess())
+
+    def decode() -> None:
+        with rawpy.imread(io.BytesIO(raw)) as image:
+            image.postprocess()
+
+    def encode() -> None:
+        frame.save(io.BytesIO(), "JPEG", quality=95)
+
+    return {
+        "decode": _parallel_efficiency(decode, PROBE_THREADS),
+        "encode": _parallel_efficiency(encode, PROBE_THREADS),
+    }
+
+
+def resolve_executor(kind: str) -> str:
+    """
+    Turn an executor choice into "thread" or "process".
+
+    With "auto", a single CPU always gets threads since processes cannot
+    run faster there; otherwise threads are chosen when both decoding and
+    encoding reach THREAD_MIN_EFFICIENCY in measure_gil_release().
+
+    Args:
+        kind: One of EXECUTORS
+
+    Returns:
+        "thread" or "process"
+
+    Raises:
+        ValueError: If kind is not a known executor
+    """
+    if kind not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor: {kind!r} (expected one of: {', '.join(EXECUTORS)})"
+        )
+    if kind != "auto":
+        return kind
+
+    if (os.cpu_count() or 1) < PROBE_THREADS:
+        logger.info("Executor auto: threads (single CPU)")
+        return "thread"
+
+    efficiency = measure_gil_release()
+    chosen = (
+        "thread" if min(efficiency.values()) >= THREAD_MIN_EFFICIENCY else "process"
+    )
+    logger.info(
+        f"Executor auto: {chosen}s (thread efficiency: "
+        f"decode {efficiency['decode']:.2f}, encode {efficiency['encode']:.2f})"
+    )
+    return chosen
+
+
+def warm_worker() -> None:
+    """
+    Prepare a worker process for conversions.
+
+    Imports the conversion pipeline, then decodes and encodes a tiny
+    synthetic raw so that LibRaw, Pillow's plugin registry and the
+    encoders are initialised before the first real file arrives.
+    """
+    import rawpy
+
+    from . import converter  # noqa: F401
+    from .encoders import ENCODERS
+    from .synthetic import make_synthetic_raw
+
+    try:
+        raw = make_synthetic_raw(*WARM_UP_SIZE, preview=False)
+        with rawpy.imread(io.BytesIO(raw)) as image:
+            rgb = image.postprocess(half_size=True)
+        pixels = converter._array_to_image(rgb)
+        for encoder in ENCODERS.values():
+            options = encoder.options()
+            if encoder.bit_depth(options) == 8:
+                encoder.encode(pixels, 90, options)
+    except Exception as e:
+        # Warming up is an optimisation; a failure shows up in the real work
+        logger.debug(f"Worker warm-up failed: {e}")
+
+
+def create_executor(kind: str, workers: int) -> Executor:
+    """
+    Create the pool for parallel conversion.
+
+    Worker processes run warm_worker() on start-up; threads share the
+    parent's imports and need no warm-up.
+
+    Args:
+        kind: One of EXECUTORS
+        workers: Number of worker threads or processes
+
+    Returns:
+        A ThreadPoolExecutor or ProcessPoolExecutor
+    """
+    if resolve_executor(kind) == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nef")
+    return ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
@@ -0,0 +1,492 @@
+"""
+EXIF Passthrough for NEF Converter
+
+Reads the metadata of TIFF-based raw files (NEF, DNG) and rebuilds it as
+an EXIF APP1 payload without decoding any values. Tag values, including
+the maker note and the GPS and interoperability IFDs, are copied byte for
+byte in the source's byte order; only the IFD pointers are rewritten.
+This avoids Pillow's TIFF parser, which drops sub-IFDs and maker notes
+and can produce EXIF that its own encoders then reject.
+"""
+
+import io
+import logging
+import struct
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Header of an EXIF APP1 payload, ahead of the TIFF structure
+EXIF_HEADER = b"Exif\x00\x00"
+
+# Thumbnail policies: "none" drops the EXIF thumbnail; "keep" embeds the
+# source's thumbnail as a JPEG in IFD1 when it fits the APP1 segment
+THUMBNAIL_POLICIES = ("none", "keep")
+
+# Largest payload of a JPEG APP1 segment
+MAX_EXIF_SIZE = 0xFFFF - 2
+
+# JPEG quality of thumbnails encoded from uncompressed source thumbnails
+THUMBNAIL_QUALITY = 85
+
+# Byte size of one value of each TIFF field type, including the signed,
+# undefined, floating-point and IFD types that appear in maker notes
+FIELD_SIZES = {
+    1: 1,  # BYTE
+    2: 1,  # ASCII
+    3: 2,  # SHORT
+    4: 4,  # LONG
+    5: 8,  # RATIONAL
+    6: 1,  # SBYTE
+    7: 1,  # UNDEFINED
+    8: 2,  # SSHORT
+    9: 4,  # SLONG
+    10: 8,  # SRATIONAL
+    11: 4,  # FLOAT
+    12: 8,  # DOUBLE
+    13: 4,  # IFD
+}
+SHORT, LONG = 3, 4
+
+# Pointer tags of the sub-IFDs that are carried over
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+INTEROP_IFD = 0xA005
+MAKER_NOTE = 0x927C
+
+# Carried-over sub-IFDs by name: (parent IFD, pointer tag in the parent)
+SUB_IFDS = {
+    "exif": ("primary", EXIF_IFD),
+    "interop": ("exif", INTEROP_IFD),
+    "gps": ("primary", GPS_IFD),
+}
+
+# IFD0 tag of the orientation in which viewers should display the pixels
+ORIENTATION = 0x0112
+
+# IFD1 tags locating a JPEG thumbnail
+THUMBNAIL_OFFSET = 0x0201
+THUMBNAIL_LENGTH = 0x0202
+
+# IFD0 tags that describe the photo rather than the raw file's image data
+PRIMARY_TAGS = frozenset(
+    {
+        0x010E,  # ImageDescription
+        0x010F,  # Make
+        0x0110,  # Model
+        ORIENTATION,
+        0x011A,  # XResolution
+        0x011B,  # YResolution
+        0x0128,  # ResolutionUnit
+        0x0131,  # Software
+        0x0132,  # DateTime
+        0x013B,  # Artist
+        0x013E,  # WhitePoint
+        0x013F,  # PrimaryChromaticities
+        0x0211,  # YCbCrCoefficients
+        0x0213,  # YCbCrPositioning
+        0x0214,  # ReferenceBlackWhite
+        0x8298,  # Copyright
+    }
+)
+
+# (field type, value count, raw value bytes in the file's byte order)
+Entry = Tuple[int, int, bytes]
+IFD = Dict[int, Entry]
+
+
+class TiffReader:
+    """Bounds-checked reader of TIFF IFDs that keeps values undecoded."""
+
+    def __init__(self, data: bytes) -> None:
+        """
+        Initialize the reader.
+
+        Args:
+            data: Contents of a TIFF-based file
+
+        Raises:
+            ValueError: If the data does not start with a TIFF header
+        """
+        if data[:4] == b"II*\x00":
+            self.order = "<"
+        elif data[:4] == b"MM\x00*":
+            self.order = ">"
+        else:
+            raise ValueError("Not a TIFF-based raw file")
+        self.data = data
+        self.first_ifd = self.unpack("I", 4)[0]
+
+    def unpack(self, fmt: str, offset: int) -> Tuple[int, ...]:
+        """Unpack values at an offset in the file's byte order."""
+        return struct.unpack_from(self.order + fmt, self.data, offset)
+
+    def ifd(self, offset: int) -> Tuple[IFD, int]:
+        """
+        Read an IFD.
+
+        Entries of unknown types or with values outside the file are left
+        out, so a damaged tag costs only itself.
+
+        Args:
+            offset: File offset of the IFD
+
+        Returns:
+            (entries by tag, offset of the next IFD or 0)
+
+        Raises:
+            ValueError: If the IFD lies outside the file
+        """
+        if offset < 8 or offset + 2 > len(self.data):
+            raise ValueError(f"IFD offset {offset} out of range")
+        (count,) = self.unpack("H", offset)
+        end = offset + 2 + count * 12
+        if end + 4 > len(self.data):
+            raise ValueError(f"IFD at {offset} runs past the end of the file")
+
+        entries: IFD = {}
+        for position in range(offset + 2, end, 12):
+            tag, field_type, values = self.unpack("HHI", position)
+            size = FIELD_SIZES.get(field_type)
+            if size is None:
+                continue
+            length = size * values
+            if length <= 4:
+                start = position + 8
+            else:
+                (start,) = self.unpack("I", position + 8)
+                if start + length > len(self.data):
+                    continue
+            entries[tag] = (field_type, values, self.data[start : start + length])
+        return entries, self.unpack("I", end)[0]
+
+    def ints(self, entry: Entry) -> List[int]:
+        """Decode the values of a BYTE, SHORT, LONG or IFD entry."""
+        field_type, count, raw = entry
+        fmt = {1: "B", 3: "H", 4: "I", 13: "I"}.get(field_type)
+        if fmt is None:
+            raise ValueError(f"Expected an integer tag, got type {field_type}")
+        return list(struct.unpack(f"{self.order}{count}{fmt}", raw))
+
+    def sub_ifd(self, ifd: IFD, tag: int) -> Optional[IFD]:
+        """Read the sub-IFD a pointer tag refers to, if present and valid."""
+        if tag not in ifd:
+            return None
+        try:
+            return self.ifd(self.ints(ifd[tag])[0])[0]
+        except (ValueError, IndexError, struct.error) as e:
+            logger.debug(f"Skipping sub-IFD {tag:#06x}: {e}")
+            return None
+
+
+def _thumbnail(reader: TiffReader, ifd0: IFD, next_ifd: int) -> Optional[bytes]:
+    """
+    Get the source's thumbnail as JPEG data.
+
+    Uses the JPEG thumbnail of IFD1 when there is one; otherwise encodes
+    an uncompressed 8-bit RGB image in IFD0, the layout of NEF thumbnails.
+    """
+    if next_ifd:
+        ifd1, _ = reader.ifd(next_ifd)
+        if THUMBNAIL_OFFSET in ifd1 and THUMBNAIL_LENGTH in ifd1:
+            (start,) = reader.ints(ifd1[THUMBNAIL_OFFSET])
+            (length,) = reader.ints(ifd1[THUMBNAIL_LENGTH])
+            jpeg = reader.data[start : start + length]
+            return jpeg if jpeg[:2] == b"\xff\xd8" else None
+
+    image = rgb_thumbnail(reader, ifd0)
+    if image is None:
+        return None
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+
+def rgb_thumbnail(reader: TiffReader, ifd: IFD) -> Optional["Image.Image"]:
+    """
+    Read an uncompressed 8-bit RGB image, the layout of NEF thumbnails.
+
+    Args:
+        reader: Reader of the file
+        ifd: Entries of the IFD describing the image
+
+    Returns:
+        The image, or None if the IFD holds another kind of image
+    """
+
+    def value(tag: int) -> List[int]:
+        return reader.ints(ifd[tag]) if tag in ifd else []
+
+    if (
+        value(0x0103) != [1]  # Compression: none
+        or value(0x0106) != [2]  # PhotometricInterpretation: RGB
+        or value(0x0102) != [8, 8, 8]  # BitsPerSample
+        or value(0x011C) not in ([], [1])  # PlanarConfiguration: interleaved
+        or not value(0x0100)
+        or not value(0x0101)
+    ):
+        return None
+    width, height = value(0x0100)[0], value(0x0101)[0]
+    pixels = b"".join(
+        reader.data[start : start + length]
+        for start, length in zip(value(0x0111), value(0x0117))
+    )
+    if len(pixels) < width * height * 3:
+        return None
+
+    from PIL import Image
+
+    return Image.frombytes("RGB", (width, height), pixels[: width * height * 3])
+
+
+def _pack_ifd(order: str, entries: IFD, offset: int, next_ifd: int) -> bytes:
+    """
+    Serialise an IFD whose out-of-line values follow the entry table.
+
+    The size of the result does not depend on offset or next_ifd.
+    """
+    table_size = 2 + len(entries) * 12 + 4
+    table = [struct.pack(order + "H", len(entries))]
+    values = b""
+    for tag in sorted(entries):
+        field_type, count, raw = entries[tag]
+        if len(raw) <= 4:
+            field = raw.ljust(4, b"\x00")
+        else:
+            field = struct.pack(order + "I", offset + table_size + len(values))
+            values += raw + b"\x00" * (len(raw) % 2)
+        table.append(struct.pack(order + "HHI", tag, field_type, count) + field)
+    table.append(struct.pack(order + "I", next_ifd))
+    return b"".join(table) + values
+
+
+def _pointer(order: str, offset: int) -> Entry:
+    """Build a LONG entry holding an offset."""
+    return (LONG, 1, struct.pack(order + "I", offset))
+
+
+def _layout(order: str, ifds: Dict[str, IFD], start: int) -> Dict[str, int]:
+    """
+    Assign offsets to IFDs written back to back from start.
+
+    Adds the pointers from parent to child IFDs (see SUB_IFDS) where both
+    are present in ifds.
+
+    Returns:
+        Offset of each IFD by name, and "end" for the offset after the last
+    """
+    links = [(parent, tag, child) for child, (parent, tag) in SUB_IFDS.items()]
+    links = [link for link in links if link[0] in ifds and link[2] in ifds]
+
+    # Pointers do not change the size of an IFD, so lay out with
+    # placeholders first, then fill in the real offsets
+    for parent, tag, _ in links:
+        ifds[parent][tag] = _pointer(order, 0)
+    offsets = {}
+    position = start
+    for name, entries in ifds.items():
+        offsets[name] = position
+        position += len(_pack_ifd(order, entries, position, 0))
+    for parent, tag, child in links:
+        ifds[parent][tag] = _pointer(order, offsets[child])
+    offsets["end"] = position
+    return offsets
+
+
+def _read_ifds(reader: TiffReader) -> Tuple[IFD, Dict[str, IFD], int]:
+    """
+    Read IFD0 and the sub-IFDs that are carried over.
+
+    Returns:
+        (IFD0 entries, sub-IFD entries by name without their pointers,
+        offset of IFD1 or 0)
+    """
+    ifd0, next_ifd = reader.ifd(reader.first_ifd)
+    ifds = {"primary": ifd0}
+    for child, (parent, tag) in SUB_IFDS.items():
+        if parent in ifds:
+            entries = reader.sub_ifd(ifds[parent], tag)
+            if entries is not None:
+                ifds[child] = entries
+    for child, (parent, tag) in SUB_IFDS.items():
+        if parent in ifds:
+            ifds[parent].pop(tag, None)
+    del ifds["primary"]
+    return ifd0, ifds, next_ifd
+
+
+def build_exif(
+    order: str,
+    primary: IFD,
+    exif: Optional[IFD] = None,
+    gps: Optional[IFD] = None,
+    interop: Optional[IFD] = None,
+    thumbnail: Optional[bytes] = None,
+) -> bytes:
+    """
+    Serialise IFDs as an EXIF APP1 payload.
+
+    Args:
+        order: Byte order of the entries' raw values, "<" or ">"
+        primary: IFD0 entries, without sub-IFD pointers
+        exif: Exif IFD entries, without the interoperability pointer
+        gps: GPS IFD entries
+        interop: Interoperability IFD entries (needs exif)
+        thumbnail: JPEG thumbnail to store through IFD1
+
+    Returns:
+        Payload starting with the Exif header
+    """
+    ifds: Dict[str, IFD] = {"primary": dict(primary)}
+    for name, entries in (("exif", exif), ("interop", interop), ("gps", gps)):
+        if entries is not None:
+            ifds[name] = dict(entries)
+    if thumbnail:
+        ifds["thumbnail"] = {
+            0x0103: (SHORT, 1, struct.pack(order + "H", 6)),  # Compression: JPEG
+            THUMBNAIL_OFFSET: _pointer(order, 0),
+            THUMBNAIL_LENGTH: _pointer(order, len(thumbnail)),
+        }
+    offsets = _layout(order, ifds, 8)
+    if thumbnail:
+        ifds["thumbnail"][THUMBNAIL_OFFSET] = _pointer(order, offsets["end"])
+
+    header = (b"II*\x00" if order == "<" else b"MM\x00*") + struct.pack(order + "I", 8)
+    parts = [EXIF_HEADER, header]
+    for name, entries in ifds.items():
+        next_ifd = offsets.get("thumbnail", 0) if name == "primary" else 0
+        parts.append(_pack_ifd(order, entries, offsets[name], next_ifd))
+    parts.append(thumbnail or b"")
+    return b"".join(parts)
+
+
+def _little_endian(order: str, entry: Entry) -> Entry:
+    """Convert an entry's raw values to little-endian byte order."""
+    field_type, count, raw = entry
+    # Rationals are pairs of 4-byte integers
+    size = {5: 4, 10: 4}.get(field_type, FIELD_SIZES[field_type])
+    if order == "<" or size == 1:
+        return entry
+    fmt = {2: "H", 4: "I", 8: "Q"}[size]
+    values = struct.unpack(f">{len(raw) // size}{fmt}", raw)
+    return (field_type, count, struct.pack(f"<{len(values)}{fmt}", *values))
+
+
+def tiff_metadata(exif_data: bytes, offset: int) -> Tuple[IFD, bytes]:
+    """
+    Relocate an EXIF payload for embedding in a little-endian TIFF file.
+
+    Args:
+        exif_data: Payload from read_exif()
+        offset: File offset at which the returned block will be written
+
+    Returns:
+        (IFD0 entries for the TIFF's main IFD, including pointers into the
+        block, block of Exif, GPS and interoperability IFDs)
+
+    Raises:
+        ValueError: If the payload is not EXIF data
+    """
+    if not exif_data.startswith(EXIF_HEADER):
+        raise ValueError("EXIF data must start with the Exif header")
+    reader = TiffReader(exif_data[len(EXIF_HEADER) :])
+    ifd0, ifds, _ = _read_ifds(reader)
+    ifds = {
+        name: {tag: _little_endian(reader.order, e) for tag, e in entries.items()}
+        for name, entries in ifds.items()
+    }
+    offsets = _layout("<", ifds, offset)
+
+    primary = {
+        tag: _little_endian(reader.order, entry)
+        for tag, entry in ifd0.items()
+        if tag in PRIMARY_TAGS
+    }
+    for child, (parent, tag) in SUB_IFDS.items():
+        if parent == "primary" and child in ifds:
+            primary[tag] = _pointer("<", offsets[child])
+    block = b"".join(
+        _pack_ifd("<", entries, offsets[name], 0) for name, entries in ifds.items()
+    )
+    return primary, block
+
+
+def read_exif(data: bytes, thumbnail: str = "none") -> Optional[bytes]:
+    """
+    Extract the EXIF metadata of a TIFF-based raw file as an APP1 payload.
+
+    The descriptive IFD0 tags are kept along with the complete Exif, GPS
+    and interoperability IFDs. If the result does not fit a single APP1
+    segment, the thumbnail is dropped first, then the maker note.
+
+    Args:
+        data: Contents of the raw file
+        thumbnail: One of THUMBNAIL_POLICIES
+
+    Returns:
+        Payload starting with the Exif header, or None if the file has no
+        EXIF metadata
+
+    Raises:
+        ValueError: If the file is not TIFF-based or its IFD0 is damaged,
+            or the thumbnail policy is unknown
+    """
+    if thumbnail not in THUMBNAIL_POLICIES:
+        raise ValueError(
+            f"Unknown EXIF thumbnail policy: {thumbnail!r} "
+            f"(expected one of: {', '.join(THUMBNAIL_POLICIES)})"
+        )
+
+    reader = TiffReader(data)
+    ifd0, ifds, next_ifd = _read_ifds(reader)
+    primary = {tag: entry for tag, entry in ifd0.items() if tag in PRIMARY_TAGS}
+    exif, gps, interop = ifds.get("exif"), ifds.get("gps"), ifds.get("interop")
+    if not primary and exif is None and gps is None:
+        return None
+
+    thumb = None
+    if thumbnail == "keep":
+        try:
+            thumb = _thumbnail(reader, ifd0, next_ifd)
+        except (ValueError, IndexError, struct.error) as e:
+            logger.debug(f"No usable EXIF thumbnail: {e}")
+
+    payload = build_exif(reader.order, primary, exif, gps, interop, thumb)
+    if len(payload) > MAX_EXIF_SIZE and thumb is not None:
+        logger.debug("EXIF thumbnail does not fit the APP1 segment; dropping it")
+        payload = build_exif(reader.order, primary, exif, gps, interop)
+    if len(payload) > MAX_EXIF_SIZE and exif is not None and MAKER_NOTE in exif:
+        logger.debug("Maker note does not fit the APP1 segment; dropping it")
+        exif = {tag: entry for tag, entry in exif.items() if tag != MAKER_NOTE}
+        payload = build_exif(reader.order, primary, exif, gps, interop)
+    if len(payload) > MAX_EXIF_SIZE:
+        raise ValueError("EXIF metadata does not fit a JPEG APP1 segment")
+    return payload
+
+
+def reset_orientation(exif_data: bytes) -> bytes:
+    """
+    Mark EXIF data as describing upright pixels.
+
+    LibRaw rotates decoded images as the camera was held, so a copied
+    Orientation tag would make viewers rotate them a second time. Embedded
+    previews are stored unrotated and keep the tag.
+
+    Args:
+        exif_data: Payload from read_exif()
+
+    Returns:
+        Payload with Orientation set to 1 (unchanged if it has none)
+    """
+    reader = TiffReader(exif_data[len(EXIF_HEADER) :])
+    (count,) = reader.unpack("H", reader.first_ifd)
+    for position in range(reader.first_ifd + 2, reader.first_ifd + 2 + count * 12, 12):
+        tag, field_type, _ = reader.unpack("HHI", position)
+        if tag == ORIENTATION and field_type == SHORT:
+            start = len(EXIF_HEADER) + position + 8
+            value = struct.pack(reader.order + "H", 1)
+            return exif_data[:start] + value + exif_data[start + 2 :]
+    return exif_data
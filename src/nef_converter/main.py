@@ -6,16 +6,10 @@ This module provides the command-line interface and GUI functionality.
 
 import logging
 import sys
-from tkinter import Tk
-from tkinter.filedialog import askdirectory
 from typing import Optional
 
 from .converter import NEFConverter
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +20,9 @@ def select_directory() -> Optional[str]:
     Returns:
         Selected directory path or None if cancelled
     """
+    from tkinter import Tk
+    from tkinter.filedialog import askdirectory
+
     root = Tk()
     root.withdraw()  # Hide the main window
 
@@ -37,6 +34,10 @@ def select_directory() -> Optional[str]:
 
 def main() -> None:
     """Main entry point for the NEF to JPG converter."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
     print("=" * 50)
     print("🔄 NEF-to-JPG Converter V2.1")
     print("=" * 50)
@@ -0,0 +1,192 @@
+"""
+Conversion Manifest for NEF Converter
+
+Keeps a record of converted files so incremental runs can skip sources
+that have not changed since they were last converted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# File name of the manifest inside the output directory
+MANIFEST_NAME = ".nef_manifest.json"
+
+# Bump when the entry layout changes; older manifests are then ignored
+MANIFEST_VERSION = 1
+
+# Read size used when hashing files from disk
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's contents.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Record of converted sources, keyed by path relative to the input root.
+
+    Each entry stores the source size, mtime, content hash, the conversion
+    settings that produced it and the output files (relative to the
+    manifest's directory).
+    """
+
+    def __init__(
+        self, path: Path, entries: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Initialize the manifest.
+
+        Args:
+            path: Location of the manifest file
+            entries: Existing entries (default: empty)
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Path) -> "ConversionManifest":
+        """
+        Load a manifest, starting empty if it is missing or unreadable.
+
+        Args:
+            path: Location of the manifest file
+
+        Returns:
+            Loaded manifest
+        """
+        if not path.exists():
+            return cls(path)
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return cls(path)
+
+        if data.get("version") != MANIFEST_VERSION:
+            logger.warning(f"Ignoring manifest {path} with unsupported version")
+            return cls(path)
+
+        return cls(path, data.get("files", {}))
+
+    def is_current(self, key: str, source: Path, settings: Dict[str, Any]) -> bool:
+        """
+        Check whether a source's recorded conversion is still valid.
+
+        Unchanged files cost a single stat. When only the mtime differs the
+        content hash decides, so touched-but-identical files are not redone.
+
+        Args:
+            key: Manifest key of the source
+            source: Path of the source file
+            settings: Settings the conversion would use now
+
+        Returns:
+            True if the outputs exist and match the source and settings
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry["settings"] != settings:
+            return False
+
+        if not all((self.path.parent / name).exists() for name in entry["outputs"]):
+            return False
+
+        try:
+            stat = source.stat()
+        except OSError:
+            return False
+
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+
+        if file_sha256(source) != entry["sha256"]:
+            return False
+
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def record(
+        self,
+        key: str,
+        stat: os.stat_result,
+        sha256: str,
+        settings: Dict[str, Any],
+        outputs: List[str],
+    ) -> None:
+        """
+        Record a successful conversion.
+
+        Args:
+            key: Manifest key of the source
+            stat: Stat of the source taken before conversion
+            sha256: Content hash of the source
+            settings: Settings used for the conversion
+            outputs: Output file names relative to the manifest's directory
+        """
+        self.entries[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "settings": settings,
+            "outputs": outputs,
+        }
+        self._dirty = True
+
+    def restore(
+        self, entries: Dict[str, Dict[str, Any]], settings: Dict[str, Any]
+    ) -> None:
+        """
+        Record conversions finished by an interrupted run.
+
+        Args:
+            entries: Checkpoint journal entries by manifest key; entries
+                without a content hash are left out
+            settings: Settings the journal was written with
+        """
+        for key, entry in entries.items():
+            if entry.get("sha256") is None:
+                continue
+            self.entries[key] = {
+                "size": entry["size"],
+                "mtime_ns": entry["mtime_ns"],
+                "sha256": entry["sha256"],
+                "settings": settings,
+                "outputs": entry["outputs"],
+            }
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the manifest atomically if it has changed."""
+        if not self._dirty:
+            return
+
+        data = {"version": MANIFEST_VERSION, "files": self.entries}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        logger.debug(f"Saved manifest with {len(self.entries)} entries: {self.path}")
@@ -0,0 +1,83 @@
+"""
+Output Renditions for NEF Converter
+
+Describes the output files produced from each decoded image, such as a
+full-size JPEG, a web-sized copy and a thumbnail.
+"""
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .encoders import get_encoder
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """
+    One output file produced from each source.
+
+    Attributes:
+        max_size: Maximum long edge in pixels (None = original size)
+        quality: Encoder quality (1-100) for lossy formats
+        format: Output format with a registered encoder (see encoders)
+        suffix: Appended to the source stem, e.g. "_web" for DSC_0001_web.jpg
+    """
+
+    max_size: Optional[int] = None
+    quality: int = 95
+    format: str = "JPEG"
+    suffix: str = ""
+
+    def __post_init__(self) -> None:
+        """
+        Validate the rendition.
+
+        Raises:
+            ValueError: If the format, size or quality is out of range
+        """
+        # Normalise the name, raising for formats without an encoder
+        object.__setattr__(self, "format", get_encoder(self.format).name)
+        if self.max_size is not None and self.max_size < 1:
+            raise ValueError("Rendition size must be a positive number of pixels")
+        if not 1 <= self.quality <= 100:
+            raise ValueError("Rendition quality must be between 1 and 100")
+
+    @property
+    def extension(self) -> str:
+        """File extension of the output format."""
+        return get_encoder(self.format).extension
+
+    def path_for(self, output_path: Path) -> Path:
+        """
+        Get this rendition's file for a conversion's primary output path.
+
+        Args:
+            output_path: Output path of the conversion, e.g. out/DSC_0001.jpg
+
+        Returns:
+            Path with the rendition's suffix and extension
+        """
+        return output_path.with_name(f"{output_path.stem}{self.suffix}{self.extension}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the rendition as a JSON-compatible dict."""
+        return asdict(self)
+
+
+def fit_size(size: Tuple[int, int], max_size: Optional[int]) -> Tuple[int, int]:
+    """
+    Scale a size down to fit a maximum long edge, keeping the aspect ratio.
+
+    Args:
+        size: (width, height) in pixels
+        max_size: Maximum long edge (None = no limit)
+
+    Returns:
+        The fitted (width, height); the input size if it already fits
+    """
+    width, height = size
+    if max_size is None or max(width, height) <= max_size:
+        return size
+    scale = max_size / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
@@ -0,0 +1,254 @@
+"""
+Run Reports for NEF Converter
+
+Per-stage timing of the conversion pipeline and the aggregated JSON report
+written by ``--report``, used to tell whether a machine is bound by disk
+I/O, demosaicing, encoding or metadata handling.
+"""
+
+import heapq
+import json
+import logging
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in execution order:
+# read: loading the source file, hash: content hash (incremental mode only),
+# exif: metadata extraction, decode: raw decoding or preview extraction,
+# adjust: the optional adjustment stage, encode: resizing and compressing
+# the output, write: writing it to disk
+STAGES = ("read", "hash", "exif", "decode", "adjust", "encode", "write")
+
+# Percentiles reported for every stage
+REPORT_PERCENTILES = (50, 90, 95, 99)
+
+# Number of slowest files listed in the report
+SLOWEST_FILES = 10
+
+# Bump when the report layout changes
+REPORT_VERSION = 1
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """
+    Get a nearest-rank percentile.
+
+    Args:
+        values: Samples (need not be sorted)
+        percent: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def tail_idle(completions: List[float], workers: int) -> Tuple[float, float]:
+    """
+    Measure the tail of a batch, where workers idle waiting for the last files.
+
+    Once fewer files remain than there are workers, every completion leaves
+    a worker with nothing to do until the batch ends.
+
+    Args:
+        completions: Completion times of every file, in seconds on any clock
+        workers: Number of files converted at once
+
+    Returns:
+        Tuple of (seconds from the first idle worker to the end of the
+        batch, worker-seconds spent idle in that time)
+    """
+    if not completions or workers < 2:
+        return 0.0, 0.0
+    ordered = sorted(completions)
+    end = ordered[-1]
+    idle_from = ordered[-min(workers, len(ordered)) :]
+    return end - idle_from[0], sum(end - finished for finished in idle_from)
+
+
+class StageTimer:
+    """
+    Lap timer that attributes elapsed time to pipeline stages.
+
+    Each lap() charges the time since the previous lap (or since creation)
+    to the named stage, so consecutive stages need no nested blocks.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the timer and start the first lap."""
+        self.stages: Dict[str, float] = {}
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """
+        Charge the time since the previous lap to a stage.
+
+        Args:
+            stage: Stage name, one of STAGES
+        """
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self._started
+
+
+def _summarise(values: List[float]) -> Dict[str, float]:
+    """Summarise samples as count, total, mean, percentiles and maximum."""
+    total = sum(values)
+    summary = {
+        "count": len(values),
+        "total": total,
+        "mean": total / len(values) if values else 0.0,
+    }
+    for percent in REPORT_PERCENTILES:
+        summary[f"p{percent}"] = _percentile(values, percent)
+    summary["max"] = max(values, default=0.0)
+    return summary
+
+
+class RunReport:
+    """
+    Aggregates per-file statistics of a batch run into a JSON report.
+
+    Only per-stage samples are kept, not whole per-file records, so the
+    report stays small for large batches.
+    """
+
+    def __init__(
+        self, settings: Optional[Dict[str, Any]] = None, started: Optional[float] = None
+    ) -> None:
+        """
+        Initialize an empty report.
+
+        Args:
+            settings: Conversion settings to record in the report
+            started: time.perf_counter() at the start of the run, from which
+                first_file_seconds is measured (default: now)
+        """
+        self.settings = settings or {}
+        self.started = time.perf_counter() if started is None else started
+        self.first_file_seconds: Optional[float] = None
+        self.converted = 0
+        self.failed = 0
+        self.skipped = 0
+        self.cache_hits = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.wall_seconds = 0.0
+        self.workers = 1
+        self.tail_seconds = 0.0
+        self.tail_idle_seconds = 0.0
+        self._latencies: List[float] = []
+        self._stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self._slowest: List[Tuple[float, str]] = []
+
+    def add(self, nef_path: Path, file_stats: Dict[str, Any]) -> None:
+        """
+        Record the statistics of one converted file.
+
+        Args:
+            nef_path: Source file
+            file_stats: Statistics returned by the conversion pipeline
+        """
+        if self.first_file_seconds is None:
+            self.first_file_seconds = time.perf_counter() - self.started
+        self.converted += 1
+        self.cache_hits += bool(file_stats.get("cached"))
+        self.bytes_read += file_stats.get("bytes_read", 0)
+        self.bytes_written += file_stats.get("bytes_written", 0)
+
+        seconds = file_stats.get("seconds", 0.0)
+        self._latencies.append(seconds)
+        for stage, duration in file_stats.get("stages", {}).items():
+            self._stages.setdefault(stage, []).append(duration)
+
+        entry = (seconds, str(nef_path))
+        if len(self._slowest) < SLOWEST_FILES:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    def add_failure(self) -> None:
+        """Record a file that failed to convert."""
+        self.failed += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Build the report.
+
+        Returns:
+            JSON-compatible report with per-stage latency percentiles
+        """
+        total = self.converted + self.failed + self.skipped
+        wall = self.wall_seconds
+        stage_totals = {
+            stage: sum(samples) for stage, samples in self._stages.items() if samples
+        }
+        busy = sum(stage_totals.values())
+
+        return {
+            "version": REPORT_VERSION,
+            "settings": self.settings,
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "workers": self.workers,
+            },
+            "files": {
+                "total": total,
+                "converted": self.converted,
+                "failed": self.failed,
+                "skipped": self.skipped,
+            },
+            "cache_hits": self.cache_hits,
+            "wall_seconds": wall,
+            "first_file_seconds": self.first_file_seconds,
+            "files_per_second": self.converted / wall if wall > 0 else 0.0,
+            "tail": {
+                "seconds": self.tail_seconds,
+                "idle_worker_seconds": self.tail_idle_seconds,
+            },
+            "bytes": {
+                "read": self.bytes_read,
+                "written": self.bytes_written,
+                "read_per_second": self.bytes_read / wall if wall > 0 else 0.0,
+                "written_per_second": self.bytes_written / wall if wall > 0 else 0.0,
+            },
+            "latency": _summarise(self._latencies),
+            "stages": {
+                stage: dict(
+                    _summarise(samples),
+                    share=stage_totals[stage] / busy if busy else 0.0,
+                )
+                for stage, samples in self._stages.items()
+                if samples
+            },
+            "slowest": [
+                {"path": path, "seconds": seconds}
+                for seconds, path in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+    def write(self, path: Path) -> None:
+        """
+        Write the report as JSON.
+
+        Args:
+            path: Destination file
+        """
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        logger.info(f"Wrote run report: {path}")
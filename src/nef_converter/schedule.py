@@ -0,0 +1,152 @@
+"""
+Work Ordering for NEF Converter
+
+Orders a batch by the estimated cost of each file, read cheaply from the
+raw file's TIFF header (the dimensions of its raw image) rather than
+by decoding it. Converting the most expensive files first (longest
+processing time first) keeps a few huge files, such as pixel-shift
+composites, from running alone at the end of a batch while the other
+workers idle; converting the cheapest first delivers the first results
+soonest.
+"""
+
+import logging
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+from .exif import IFD, TiffReader
+
+logger = logging.getLogger(__name__)
+
+# Work orders: "discovery" converts files as they are found, "largest"
+# most expensive first for throughput, "smallest" cheapest first for the
+# earliest results
+SCHEDULES = ("discovery", "largest", "smallest")
+
+# Tags describing the images of a TIFF-based raw file
+NEW_SUBFILE_TYPE = 0x00FE
+IMAGE_WIDTH = 0x0100
+IMAGE_LENGTH = 0x0101
+SAMPLES_PER_PIXEL = 0x0115
+SUB_IFDS = 0x014A
+
+# Most IFDs followed per file; bounds the work on damaged or looping chains
+MAX_IFDS = 32
+
+# Raw samples per file byte assumed when a file's dimensions cannot be read;
+# lossless-compressed 14-bit NEFs hold roughly one sample per byte
+FALLBACK_SAMPLES_PER_BYTE = 1.0
+
+
+def _largest_image(reader: TiffReader) -> Optional[int]:
+    """Find the most samples of a full-resolution image in the file's IFDs."""
+    largest: Optional[int] = None
+    queue = [reader.first_ifd]
+    seen: Set[int] = set()
+    while queue and len(seen) < MAX_IFDS:
+        offset = queue.pop()
+        if not offset or offset in seen:
+            continue
+        seen.add(offset)
+        try:
+            entries, next_ifd = reader.ifd(offset)
+        except (ValueError, struct.error):
+            continue
+        queue.append(next_ifd)
+        try:
+            if SUB_IFDS in entries:
+                queue.extend(reader.ints(entries[SUB_IFDS]))
+            # Skip thumbnails and previews, flagged as reduced-resolution
+            reduced = NEW_SUBFILE_TYPE in entries and (
+                reader.ints(entries[NEW_SUBFILE_TYPE])[0] & 1
+            )
+            if IMAGE_WIDTH in entries and IMAGE_LENGTH in entries and not reduced:
+                largest = max(largest or 0, _samples(reader, entries))
+        except (ValueError, IndexError, struct.error):
+            continue
+    return largest
+
+
+def _samples(reader: TiffReader, entries: IFD) -> int:
+    """Count the samples of the image an IFD describes."""
+    (width,) = reader.ints(entries[IMAGE_WIDTH])
+    (height,) = reader.ints(entries[IMAGE_LENGTH])
+    channels = 1
+    if SAMPLES_PER_PIXEL in entries:
+        (channels,) = reader.ints(entries[SAMPLES_PER_PIXEL])
+    return width * height * channels
+
+
+def raw_samples(path: Path) -> Optional[int]:
+    """
+    Read the number of samples in a file's raw image from its TIFF header.
+
+    The file is memory-mapped, so only the pages holding its IFDs are read;
+    nothing is decoded.
+
+    Args:
+        path: TIFF-based raw file (NEF, DNG)
+
+    Returns:
+        Samples of the raw image, or None if the header cannot be read
+    """
+    try:
+        with open(path, "rb") as handle:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _largest_image(TiffReader(data))  # type: ignore[arg-type]
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"Could not read the header of {path.name}: {e}")
+        return None
+
+
+def estimate_cost(path: Path) -> float:
+    """
+    Estimate the relative cost of converting a file.
+
+    Args:
+        path: TIFF-based raw file (NEF, DNG)
+
+    Returns:
+        Samples of the file's raw image, or an estimate from the file
+        size if its header cannot be read
+    """
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return 0.0
+    samples = raw_samples(path) if size >= 8 else None
+    if samples:
+        return float(samples)
+    return size * FALLBACK_SAMPLES_PER_BYTE
+
+
+def order_files(files: Iterable[Path], schedule: str) -> List[Path]:
+    """
+    Order files for conversion.
+
+    Files of equal cost keep their discovery order.
+
+    Args:
+        files: Files in discovery order
+        schedule: Name from SCHEDULES
+
+    Returns:
+        The files in conversion order
+
+    Raises:
+        ValueError: If the schedule is not known
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(
+            f"Unknown schedule: {schedule!r} "
+            f"(expected one of: {', '.join(SCHEDULES)})"
+        )
+    files = list(files)
+    if schedule == "discovery":
+        return files
+    costs = {path: estimate_cost(path) for path in files}
+    if schedule == "largest":
+        return sorted(files, key=lambda path: -costs[path])
+    return sorted(files, key=lambda path: costs[path])
@@ -0,0 +1,682 @@
+"""
+Conversion Server for NEF Converter
+
+A long-running ingest daemon: an asyncio front-end takes jobs over a small
+HTTP API on localhost or a Unix socket and hands them to a worker pool that
+is started and warmed once, so jobs do not pay for interpreter, import and
+pool start-up. Jobs carry a priority; interactive requests overtake queued
+bulk backfills.
+
+API (JSON unless noted):
+    POST /jobs                  {"path": "...", "output": "...", "priority": ...}
+    POST /jobs?name=&priority=  raw file as application/octet-stream
+    GET  /jobs/<id>             job status
+    GET  /jobs/<id>/result      converted file, once the job is done;
+                                ?rendition=N picks a rendition
+    GET  /health                queue and job counts
+
+Priorities are names from PRIORITIES or integers; lower runs first. The
+server only listens on a loopback interface or on a Unix socket accessible
+to its owner, and path jobs may only read and write below the roots it was
+started with.
+"""
+
+import asyncio
+import functools
+import ipaddress
+import itertools
+import json
+import logging
+import mimetypes
+import os
+import uuid
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from .converter import INCREMENTAL_DIR_NAME, FileStats, NEFConverter
+
+logger = logging.getLogger(__name__)
+
+# Named job priorities; lower values run first
+PRIORITIES = {"interactive": 0, "normal": 5, "bulk": 10}
+
+# Priority of jobs that do not give one
+DEFAULT_PRIORITY = "normal"
+
+# Largest accepted request body in bytes
+MAX_UPLOAD_BYTES = 512 * 2**20
+
+# Raw file bytes held by upload jobs that are queued or converting; new
+# uploads beyond this are answered 503 until earlier ones finish
+MAX_QUEUED_UPLOAD_BYTES = 2 * MAX_UPLOAD_BYTES
+
+# Finished jobs kept for status queries; older ones are forgotten first
+MAX_FINISHED_JOBS = 1000
+
+# Encoded upload results kept in memory, in bytes; beyond this the results
+# of the oldest finished jobs are released and fetching them answers 410
+MAX_RETAINED_RESULT_BYTES = 256 * 2**20
+
+# Bytes per write when streaming a result
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Largest request line or header line in bytes
+MAX_LINE_BYTES = 8192
+
+# Reason phrases of the status codes the server sends
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    410: "Gone",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """A request that is answered with an error status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            status: HTTP status code
+            message: Explanation sent to the client
+        """
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Job:
+    """
+    One conversion submitted to the server.
+
+    Path jobs convert a file on disk into output; upload jobs convert the
+    bytes in data in memory and keep the encoded renditions in results
+    until the server releases them.
+    """
+
+    id: str
+    priority: int
+    name: str
+    source: Optional[Path] = None
+    output: Optional[Path] = None
+    data: Optional[bytes] = None
+    state: str = "queued"
+    error: Optional[str] = None
+    stats: FileStats = field(default_factory=dict)
+    results: List[bytes] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+    released: bool = False
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the job status as a JSON-compatible dict."""
+        status: Dict[str, Any] = {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "priority": self.priority,
+        }
+        if self.error:
+            status["error"] = self.error
+        if self.state == "done":
+            status["seconds"] = self.stats.get("seconds")
+            status["profile"] = self.stats.get("profile")
+            if self.outputs:
+                status["outputs"] = [str(path) for path in self.outputs]
+            elif self.released:
+                status["released"] = True
+            else:
+                status["sizes"] = [len(result) for result in self.results]
+        return status
+
+
+def parse_priority(value: Union[str, int, None]) -> int:
+    """
+    Turn a priority name or number into a queue priority.
+
+    Args:
+        value: Name from PRIORITIES, an integer, or None for the default
+
+    Returns:
+        Priority value; lower runs first
+
+    Raises:
+        HTTPError: If the priority is not known
+    """
+    if value is None:
+        return PRIORITIES[DEFAULT_PRIORITY]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in PRIORITIES:
+        return PRIORITIES[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise HTTPError(
+            400,
+            f"Unknown priority: {value!r} "
+            f"(expected an integer or one of: {', '.join(PRIORITIES)})",
+        ) from None
+
+
+def default_output(source: Path) -> Path:
+    """Get the output path of a path job that does not give one."""
+    return source.parent / INCREMENTAL_DIR_NAME / f"{source.stem}.jpg"
+
+
+def is_loopback(host: str) -> bool:
+    """Check whether a host name or address is a loopback interface."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _noop() -> None:
+    """Do nothing; submitted to start pool workers ahead of the first job."""
+
+
+class ConversionServer:
+    """
+    Job server running conversions on a warm pool.
+
+    At most one job per worker is handed to the pool at a time; the rest
+    wait in a priority queue, so a new interactive job runs as soon as a
+    worker frees up, ahead of any queued bulk jobs.
+    """
+
+    def __init__(
+        self,
+        converter: NEFConverter,
+        workers: Optional[int] = None,
+        roots: Sequence[Union[str, Path]] = (),
+    ) -> None:
+        """
+        Initialize the server.
+
+        Args:
+            converter: Converter with the settings used for every job
+            workers: Number of pool workers (default: the converter's
+                max_workers, or one per CPU)
+            roots: Directories path jobs submitted over the API may read
+                from and write to; without any, only uploads are accepted
+        """
+        self.converter = converter
+        self.workers = workers or converter.max_workers or os.cpu_count() or 1
+        self.roots = [Path(root).resolve() for root in roots]
+        self.jobs: Dict[str, Job] = {}
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, Job]]"
+        self._sequence = itertools.count()
+        self._executor: Optional[Executor] = None
+        self._dispatchers: List["asyncio.Task[None]"] = []
+        self._servers: List[asyncio.AbstractServer] = []
+        self._finished: List[str] = []
+        self._retained_bytes = 0
+        self._upload_bytes = 0
+
+    async def start(
+        self,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        socket_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """
+        Start the worker pool and listen for requests.
+
+        Args:
+            host: Loopback interface for HTTP over TCP
+            port: TCP port (0 = any free port); ignored with socket_path
+            socket_path: Unix socket to listen on instead of TCP
+
+        Raises:
+            OSError: If the address is in use
+            ValueError: If host is not a loopback interface
+        """
+        if socket_path is None and not is_loopback(host):
+            raise ValueError(
+                f"Refusing to listen on {host!r}: the server only accepts "
+                "connections on a loopback interface or a Unix socket"
+            )
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.PriorityQueue()
+        self._executor = self.converter.create_executor(self.workers)
+
+        # Start every worker now; process workers warm up in their initializer
+        await asyncio.gather(
+            *[loop.run_in_executor(self._executor, _noop) for _ in range(self.workers)]
+        )
+        self._dispatchers = [
+            asyncio.ensure_future(self._dispatch()) for _ in range(self.workers)
+        ]
+
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(
+                self._handle, path=str(socket_path)
+            )
+            os.chmod(socket_path, 0o600)
+        else:
+            server = await asyncio.start_server(self._handle, host, port or 0)
+        self._servers.append(server)
+        logger.info(f"Serving on {self.address} with {self.workers} workers")
+
+    @property
+    def address(self) -> str:
+        """Address the server listens on, e.g. http://127.0.0.1:8765."""
+        if not self._servers:
+            return ""
+        sockname = self._servers[0].sockets[0].getsockname()
+        if isinstance(sockname, str):
+            return f"unix:{sockname}"
+        return f"http://{sockname[0]}:{sockname[1]}"
+
+    @property
+    def port(self) -> Optional[int]:
+        """TCP port the server listens on, if any."""
+        sockname = self._servers[0].sockets[0].getsockname()
+        return None if isinstance(sockname, str) else int(sockname[1])
+
+    async def close(self) -> None:
+        """Stop listening, cancel queued jobs and wait for running ones."""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._executor.shutdown
+            )
+            self._executor = None
+
+    def submit(
+        self,
+        source: Union[Path, bytes],
+        priority: Union[str, int, None] = None,
+        output: Optional[Path] = None,
+        name: Optional[str] = None,
+    ) -> Job:
+        """
+        Queue a conversion.
+
+        Args:
+            source: Raw file path, or raw file contents
+            priority: Name from PRIORITIES or an integer (default: normal)
+            output: Output path for path jobs (default: an "export" folder
+                next to the source)
+            name: File name of uploaded contents, for status and logs
+
+        Returns:
+            The queued job
+
+        Raises:
+            HTTPError: If the priority is not known, or the uploads already
+                queued hold MAX_QUEUED_UPLOAD_BYTES
+        """
+        job_priority = parse_priority(priority)
+        job_id = uuid.uuid4().hex
+        if isinstance(source, bytes):
+            if self._upload_bytes + len(source) > MAX_QUEUED_UPLOAD_BYTES:
+                raise HTTPError(
+                    503, "Too many uploads are waiting; retry once some finish"
+                )
+            self._upload_bytes += len(source)
+            job = Job(
+                job_id, job_priority, Path(name or "upload.nef").name, data=source
+            )
+        else:
+            source = Path(source)
+            if output is None:
+                output = default_output(source)
+            job = Job(job_id, job_priority, source.name, source=source, output=output)
+
+        self.jobs[job_id] = job
+        self._queue.put_nowait((job_priority, next(self._sequence), job))
+        logger.debug(f"Queued job {job_id} ({job.name}, priority {job_priority})")
+        return job
+
+    async def _dispatch(self) -> None:
+        """Hand queued jobs to the pool, one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self._queue.get()
+            job.state = "running"
+            try:
+                if job.data is not None:
+                    try:
+                        success, job.results, file_stats = await loop.run_in_executor(
+                            self._executor,
+                            NEFConverter._convert_memory_task,
+                            (self.converter, job.data, job.name),
+                        )
+                    finally:
+                        self._upload_bytes -= len(job.data)
+                        job.data = None
+                else:
+                    assert job.source is not None and job.output is not None
+                    await loop.run_in_executor(
+                        None,
+                        functools.partial(
+                            job.output.parent.mkdir, parents=True, exist_ok=True
+                        ),
+                    )
+                    success, _, file_stats = await loop.run_in_executor(
+                        self._executor,
+                        NEFConverter._convert_single_file,
+                        (self.converter, job.source, job.output),
+                    )
+                    job.outputs = [
+                        rendition.path_for(job.output)
+                        for rendition in self.converter.renditions
+                    ]
+            except Exception as e:
+                success, file_stats = False, {"error": str(e)}
+
+            job.stats = file_stats
+            job.state = "done" if success else "failed"
+            job.error = file_stats.get("error")
+            job.done.set()
+            self._retire(job)
+
+    def _upload_room(self) -> int:
+        """Get the bytes of upload a new job may bring."""
+        return min(MAX_UPLOAD_BYTES, MAX_QUEUED_UPLOAD_BYTES - self._upload_bytes)
+
+    def _retire(self, job: Job) -> None:
+        """
+        Remember a finished job within the limits.
+
+        Beyond MAX_FINISHED_JOBS the oldest jobs are forgotten; beyond
+        MAX_RETAINED_RESULT_BYTES the results of the oldest are released.
+        The newest job always keeps its results, so a client waiting for
+        them receives them.
+        """
+        self._finished.append(job.id)
+        self._retained_bytes += sum(len(result) for result in job.results)
+        while len(self._finished) > MAX_FINISHED_JOBS:
+            self._release(self.jobs.pop(self._finished.pop(0), None))
+        for job_id in self._finished[:-1]:
+            if self._retained_bytes <= MAX_RETAINED_RESULT_BYTES:
+                break
+            self._release(self.jobs.get(job_id))
+
+    def _release(self, job: Optional[Job]) -> None:
+        """Drop a finished job's encoded results from memory."""
+        if job is not None and job.results:
+            self._retained_bytes -= sum(len(result) for result in job.results)
+            job.results = []
+            job.released = True
+
+    def _confine(self, path: Path) -> Path:
+        """
+        Resolve a client-supplied path, which must lie below a root.
+
+        Raises:
+            HTTPError: If the path is outside every root
+        """
+        if not self.roots:
+            raise HTTPError(403, "Path jobs are disabled; upload the raw file instead")
+        resolved = path.resolve()
+        if not any(resolved.is_relative_to(root) for root in self.roots):
+            raise HTTPError(403, f"Path is outside the server's roots: {path}")
+        return resolved
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer one HTTP request and close the connection."""
+        try:
+            try:
+                method, target, headers, body = await _read_request(
+                    reader, self._upload_room()
+                )
+                await self._route(writer, method, target, headers, body)
+            except HTTPError as e:
+                await _send_json(writer, e.status, {"error": str(e)})
+            except Exception as e:
+                logger.error(f"Request failed: {e}")
+                await _send_json(writer, 500, {"error": str(e)})
+        except ConnectionError:
+            pass  # client went away
+        finally:
+            writer.close()
+
+    async def _route(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        target: str,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> None:
+        """Dispatch a request to its endpoint."""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            await _send_json(writer, 200, self.health())
+        elif parts == ["jobs"] and method == "POST":
+            job = self._submit_request(headers, query, body)
+            await _send_json(writer, 202, job.to_dict())
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            if method != "GET":
+                raise HTTPError(405, f"{method} is not supported here")
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise HTTPError(404, f"No such job: {parts[1]}")
+            if len(parts) == 2:
+                await _send_json(writer, 200, job.to_dict())
+            elif parts[2] == "result":
+                await self._send_result(writer, job, query)
+            else:
+                raise HTTPError(404, f"Not found: {url.path}")
+        else:
+            raise HTTPError(404, f"Not found: {url.path}")
+
+    def _submit_request(
+        self, headers: Dict[str, str], query: Dict[str, str], body: bytes
+    ) -> Job:
+        """Queue the job described by a POST /jobs request."""
+        if headers.get("content-type", "").startswith("application/json"):
+            try:
+                spec = json.loads(body)
+                path = Path(spec["path"])
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(400, 'Expected a JSON object with a "path"') from None
+            source = self._confine(path)
+            output = Path(spec["output"]) if spec.get("output") else None
+            output = self._confine(output or default_output(source))
+            return self.submit(source, spec.get("priority"), output)
+
+        if not body:
+            raise HTTPError(400, "Expected a raw file or a JSON job")
+        return self.submit(body, query.get("priority"), name=query.get("name"))
+
+    async def _send_result(
+        self, writer: asyncio.StreamWriter, job: Job, query: Dict[str, str]
+    ) -> None:
+        """Stream a finished job's output, waiting for the job to finish."""
+        await job.done.wait()
+        if job.state != "done":
+            raise HTTPError(409, f"Job failed: {job.error}")
+        if job.released:
+            raise HTTPError(410, "The result was released; submit the job again")
+
+        try:
+            index = int(query.get("rendition", 0))
+            rendition = self.converter.renditions[index]
+        except (ValueError, IndexError):
+            raise HTTPError(400, f"No such rendition: {query.get('rendition')}")
+        content_type = (
+            mimetypes.guess_type(f"result{rendition.extension}")[0]
+            or "application/octet-stream"
+        )
+
+        if job.results:
+            await _send(writer, 200, job.results[index], content_type)
+            return
+
+        path = job.outputs[index]
+        loop = asyncio.get_running_loop()
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            writer.write(_head(200, size, content_type))
+            while True:
+                chunk = await loop.run_in_executor(None, handle.read, STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+    def health(self) -> Dict[str, Any]:
+        """Get queue and job counts."""
+        states: Dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "upload_bytes": self._upload_bytes,
+            "jobs": states,
+        }
+
+
+async def _read_request(
+    reader: asyncio.StreamReader, room: int = MAX_UPLOAD_BYTES
+) -> Tuple[str, str, Dict[str, str], bytes]:
+    """
+    Read one HTTP/1.x request.
+
+    Args:
+        reader: Stream of the connection
+        room: Bytes of queued uploads the server can still take; a larger
+            upload is refused before it is read
+
+    Returns:
+        Tuple of (method, target, lower-cased headers, body)
+
+    Raises:
+        HTTPError: If the request is malformed or too large
+    """
+    line = await reader.readline()
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if len(line) > MAX_LINE_BYTES:
+            raise HTTPError(400, "Header line too long")
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if method == "POST" and "content-length" not in headers:
+        raise HTTPError(411, "Content-Length is required")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_UPLOAD_BYTES:
+        raise HTTPError(413, f"Request body exceeds {MAX_UPLOAD_BYTES} bytes")
+    is_json = headers.get("content-type", "").startswith("application/json")
+    if length > room and not is_json:
+        raise HTTPError(503, "Too many uploads are waiting; retry once some finish")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _head(status: int, length: int, content_type: str) -> bytes:
+    """Build a response status line and headers."""
+    return (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {length}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode("latin-1")
+
+
+async def _send(
+    writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str
+) -> None:
+    """Send a complete response."""
+    writer.write(_head(status, len(body), content_type) + body)
+    await writer.drain()
+
+
+async def _send_json(
+    writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]
+) -> None:
+    """Send a JSON response."""
+    await _send(writer, status, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+def serve(
+    converter: NEFConverter,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[Union[str, Path]] = None,
+    workers: Optional[int] = None,
+    roots: Sequence[Union[str, Path]] = (),
+) -> None:
+    """
+    Run a conversion server until interrupted.
+
+    Args:
+        converter: Converter with the settings used for every job
+        host: Loopback interface for HTTP over TCP
+        port: TCP port; ignored with socket_path
+        socket_path: Unix socket to listen on instead of TCP
+        workers: Number of pool workers (default: see ConversionServer)
+        roots: Directories path jobs may read from and write to
+
+    Raises:
+        ValueError: If host is not a loopback interface
+    """
+    server = ConversionServer(converter, workers, roots)
+
+    async def run() -> None:
+        await server.start(host, port, socket_path)
+        print(f"🛰️  Serving on {server.address}")
+        print(f"⚙️  Workers: {server.workers} (warm)")
+        if server.roots:
+            print(f"📁 Path jobs below: {', '.join(map(str, server.roots))}")
+        else:
+            print("📁 Path jobs disabled (no --root); uploads only")
+        print("🔄 Waiting for jobs... (Press Ctrl+C to stop)")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+            if socket_path is not None:
+                Path(socket_path).unlink(missing_ok=True)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n🛑 Server stopped")
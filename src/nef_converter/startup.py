@@ -0,0 +1,117 @@
+"""
+Start-up Profiling for NEF Converter
+
+Measures what a run pays before converting anything: the wall time of
+`nef2jpg --version` in a fresh interpreter and the cold import time of the
+heavy modules. Used by `--profile-startup`.
+"""
+
+import os
+import subprocess  # nosec: B404
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Fresh-interpreter runs of --version; the fastest counts, to ignore noise
+VERSION_RUNS = 3
+
+# Modules whose cumulative import time is reported
+PROFILED_MODULES = (
+    "numpy",
+    "rawpy",
+    "PIL.Image",
+    "tqdm",
+    "tkinter",
+    "nef_converter.converter",
+)
+
+# Directory containing the nef_converter package, for child interpreters
+PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _run_python(args: List[str]) -> "subprocess.CompletedProcess[str]":
+    """Run a fresh interpreter that can import nef_converter."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(PACKAGE_ROOT), env.get("PYTHONPATH")])
+    )
+    # nosec: B603 - runs this interpreter with fixed arguments
+    return subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def time_version_command(runs: int = VERSION_RUNS) -> float:
+    """
+    Time `nef2jpg --version` in fresh interpreters.
+
+    Args:
+        runs: Number of runs
+
+    Returns:
+        Fastest wall time in seconds, including interpreter start-up
+    """
+    code = "from nef_converter.cli import cli_main; cli_main()"
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run_python(["-c", code, "--version"])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def import_times(
+    modules: Sequence[str] = PROFILED_MODULES,
+    entry: str = "nef_converter.converter",
+) -> Dict[str, float]:
+    """
+    Measure cold import times with `python -X importtime`.
+
+    Args:
+        modules: Modules to report
+        entry: Module imported by the fresh interpreter
+
+    Returns:
+        Cumulative import seconds of each module in modules that the entry
+        module imported; modules it did not import are left out
+    """
+    output = _run_python(["-X", "importtime", "-c", f"import {entry}"]).stderr
+    times: Dict[str, float] = {}
+    for line in output.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3:
+            continue
+        name = fields[2].strip()
+        if name in modules and name not in times:
+            try:
+                times[name] = int(fields[1]) / 1e6
+            except ValueError:
+                continue
+    return times
+
+
+def format_startup_profile(
+    ready_seconds: float, first_file_seconds: Optional[float]
+) -> List[str]:
+    """
+    Measure and describe start-up costs for printing.
+
+    Args:
+        ready_seconds: Seconds from CLI entry until arguments were parsed
+        first_file_seconds: Seconds from CLI entry until the first file was
+            converted (None if no file was converted)
+
+    Returns:
+        Lines of the profile
+    """
+    lines = [
+        f"nef2jpg --version: {time_version_command():.3f}s (fresh interpreter)",
+        f"CLI ready: {ready_seconds:.3f}s",
+    ]
+    if first_file_seconds is not None:
+        lines.append(f"First file converted: {first_file_seconds:.3f}s")
+    for module, seconds in import_times().items():
+        lines.append(f"import {module}: {seconds:.3f}s")
+    return lines
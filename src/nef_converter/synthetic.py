@@ -0,0 +1,202 @@
+"""
+Synthetic Raw Files for NEF Converter
+
+Generates small, valid DNG files that LibRaw decodes like camera raws.
+They stand in for real NEF files in benchmarks and self-tests, so those
+run offline with realistic array sizes.
+"""
+
+import io
+import struct
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+from PIL import Image
+
+from .tiff import ASCII, BYTE, LONG, RATIONAL, SHORT, SRATIONAL, Tag, build_ifd
+
+# 14-bit sensor data, like current Nikon bodies
+WHITE_LEVEL = 16383
+
+# Long edge of the uncompressed RGB thumbnail in IFD0, as in NEF files
+THUMBNAIL_SIZE = 160
+
+# Camera-to-XYZ matrix (D65), scaled by 10000 as signed rationals
+_COLOR_MATRIX = (8201, -2193, -803, -4813, 12572, 2373, -1034, 2200, 6516)
+
+
+def _scene(width: int, height: int, seed: int) -> np.ndarray:
+    """Render a smooth colour scene with sensor-like noise, shape (h, w, 3)."""
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+    phase = rng.uniform(0, np.pi)
+    channels = [
+        0.15 + 0.7 * x * (1 - 0.5 * y),
+        0.2 + 0.6 * (0.5 + 0.5 * np.sin(6 * x + 4 * y + phase)),
+        0.1 + 0.7 * y * (1 - 0.5 * x),
+    ]
+    scene = np.stack(np.broadcast_arrays(*channels), axis=-1)
+    scene += rng.normal(0.0, 0.01, size=scene.shape).astype(np.float32)
+    return np.clip(scene, 0.0, 1.0)
+
+
+def make_synthetic_raw(
+    width: int = 600,
+    height: int = 400,
+    seed: int = 0,
+    preview: bool = True,
+    model: str = "Synthetic",
+) -> bytes:
+    """
+    Build an uncompressed 14-bit RGGB DNG file in memory.
+
+    Args:
+        width: Sensor width in pixels (rounded down to an even number)
+        height: Sensor height in pixels (rounded down to an even number)
+        seed: Seed for the scene and noise, so files are reproducible
+        preview: Embed a full-size JPEG preview like cameras do
+        model: Camera model recorded in the metadata
+
+    Returns:
+        Complete DNG file contents
+    """
+    width, height = width - width % 2, height - height % 2
+    scene = _scene(width, height, seed)
+
+    # Mosaic the scene through an RGGB colour filter array
+    mosaic = np.empty((height, width), dtype=np.uint16)
+    levels = scene * WHITE_LEVEL
+    mosaic[0::2, 0::2] = levels[0::2, 0::2, 0]
+    mosaic[0::2, 1::2] = levels[0::2, 1::2, 1]
+    mosaic[1::2, 0::2] = levels[1::2, 0::2, 1]
+    mosaic[1::2, 1::2] = levels[1::2, 1::2, 2]
+    raw_data = mosaic.astype("<u2").tobytes()
+
+    srgb = (np.power(scene, 1 / 2.2) * 255).astype(np.uint8)
+    thumb_image = Image.fromarray(srgb)
+    thumb_image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    thumb_data = thumb_image.tobytes()
+
+    preview_data = b""
+    if preview:
+        buffer = io.BytesIO()
+        Image.fromarray(srgb).save(buffer, "JPEG", quality=90)
+        preview_data = buffer.getvalue()
+
+    # Like a NEF: IFD0 holds a small RGB thumbnail and the metadata, with
+    # the raw data and the full-size JPEG preview in SubIFDs
+    ifd0: List[Tag] = [
+        (0x00FE, LONG, [1]),  # NewSubFileType: reduced-resolution image
+        (0x0100, LONG, [thumb_image.width]),
+        (0x0101, LONG, [thumb_image.height]),
+        (0x0102, SHORT, [8, 8, 8]),  # BitsPerSample
+        (0x0103, SHORT, [1]),  # Compression: none
+        (0x0106, SHORT, [2]),  # PhotometricInterpretation: RGB
+        (0x010F, ASCII, "NIKON CORPORATION"),  # Make
+        (0x0110, ASCII, model),  # Model
+        (0x0111, LONG, ["thumb"]),  # StripOffsets
+        (0x0112, SHORT, [1]),  # Orientation
+        (0x0115, SHORT, [3]),  # SamplesPerPixel
+        (0x0116, LONG, [thumb_image.height]),  # RowsPerStrip
+        (0x0117, LONG, [len(thumb_data)]),  # StripByteCounts
+        (0x011C, SHORT, [1]),  # PlanarConfiguration
+        (0x0132, ASCII, "2024:06:01 12:00:00"),  # DateTime
+        (0x014A, LONG, ["raw_ifd", "preview_ifd"] if preview else ["raw_ifd"]),
+        (0x8769, LONG, ["exif_ifd"]),  # ExifIFD
+        (0xC612, BYTE, [1, 4, 0, 0]),  # DNGVersion
+        (0xC614, ASCII, f"Nikon {model}"),  # UniqueCameraModel
+        (0xC621, SRATIONAL, [(v, 10000) for v in _COLOR_MATRIX]),  # ColorMatrix1
+        (0xC628, RATIONAL, [(1, 1), (1, 1), (1, 1)]),  # AsShotNeutral
+        (0xC65A, SHORT, [21]),  # CalibrationIlluminant1: D65
+    ]
+    exif_ifd: List[Tag] = [
+        (0x829A, RATIONAL, [(1, 250)]),  # ExposureTime
+        (0x829D, RATIONAL, [(56, 10)]),  # FNumber
+        (0x8827, SHORT, [400]),  # ISOSpeedRatings
+        (0x9003, ASCII, f"2024:06:01 12:00:{seed % 60:02d}"),  # DateTimeOriginal
+        (0x920A, RATIONAL, [(50, 1)]),  # FocalLength
+    ]
+    raw_ifd: List[Tag] = [
+        (0x00FE, LONG, [0]),  # NewSubFileType: main image
+        (0x0100, LONG, [width]),  # ImageWidth
+        (0x0101, LONG, [height]),  # ImageLength
+        (0x0102, SHORT, [16]),
+        (0x0103, SHORT, [1]),
+        (0x0106, SHORT, [32803]),  # PhotometricInterpretation: CFA
+        (0x0111, LONG, ["raw"]),
+        (0x0115, SHORT, [1]),
+        (0x0116, LONG, [height]),
+        (0x0117, LONG, [len(raw_data)]),
+        (0x011C, SHORT, [1]),
+        (0x828D, SHORT, [2, 2]),  # CFARepeatPatternDim
+        (0x828E, BYTE, [0, 1, 1, 2]),  # CFAPattern: RGGB
+        (0xC61D, LONG, [WHITE_LEVEL]),  # WhiteLevel
+    ]
+    preview_ifd: List[Tag] = [
+        (0x00FE, LONG, [1]),
+        (0x0100, LONG, [width]),
+        (0x0101, LONG, [height]),
+        (0x0102, SHORT, [8, 8, 8]),
+        (0x0103, SHORT, [7]),  # Compression: JPEG
+        (0x0106, SHORT, [6]),  # PhotometricInterpretation: YCbCr
+        (0x0111, LONG, ["preview"]),
+        (0x0115, SHORT, [3]),
+        (0x0116, LONG, [height]),
+        (0x0117, LONG, [len(preview_data)]),
+    ]
+
+    ifds = {"ifd0": ifd0, "exif_ifd": exif_ifd, "raw_ifd": raw_ifd}
+    if preview:
+        ifds["preview_ifd"] = preview_ifd
+    blobs = {"thumb": thumb_data, "raw": raw_data, "preview": preview_data}
+
+    # Offsets do not change the size of an IFD, so lay out with placeholders
+    # first, then resolve the symbolic references to real offsets
+    offsets = {}
+    position = 8
+    for name, tags in ifds.items():
+        offsets[name] = position
+        position += len(build_ifd(_resolve(tags, {}), position))
+    for name, blob in blobs.items():
+        offsets[name] = position
+        position += len(blob)
+
+    parts = [b"II*\0" + struct.pack("<I", offsets["ifd0"])]
+    parts += [
+        build_ifd(_resolve(tags, offsets), offsets[name]) for name, tags in ifds.items()
+    ]
+    parts += list(blobs.values())
+    return b"".join(parts)
+
+
+def _resolve(tags: List[Tag], offsets: Dict[str, int]) -> List[Tag]:
+    """Replace symbolic offset references in LONG tags with real offsets."""
+    return [
+        (
+            tag,
+            field_type,
+            (
+                [offsets.get(v, 0) if isinstance(v, str) else v for v in value]  # type: ignore[union-attr]
+                if field_type == LONG
+                else value
+            ),
+        )
+        for tag, field_type, value in tags
+    ]
+
+
+def write_synthetic_raw(path: Path, **kwargs: Union[int, bool, str]) -> Path:
+    """
+    Write a synthetic raw file to disk.
+
+    Args:
+        path: Destination, typically with a .nef extension
+        **kwargs: Options passed to make_synthetic_raw()
+
+    Returns:
+        The written path
+    """
+    path.write_bytes(make_synthetic_raw(**kwargs))  # type: ignore[arg-type]
+    return path
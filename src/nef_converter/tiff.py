@@ -0,0 +1,167 @@
+"""
+TIFF Structures for NEF Converter
+
+Minimal little-endian TIFF serialisation shared by the synthetic raw
+generator and the TIFF encoder. Unlike Pillow's libtiff-based writer, it
+writes 16-bit RGB and EXIF sub-IFDs.
+"""
+
+import struct
+import zlib
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from .exif import FIELD_SIZES, tiff_metadata
+
+# TIFF field types
+BYTE, ASCII, SHORT, LONG, RATIONAL, SRATIONAL = 1, 2, 3, 4, 5, 10
+
+# Compression tag values
+COMPRESSION_NONE = 1
+COMPRESSION_DEFLATE = 8
+
+# Target size of one uncompressed strip; strips are compressed independently
+STRIP_BYTES = 1024 * 1024
+
+# LONG values may name an IFD or data blob whose offset is filled in later
+TagValue = Union[bytes, str, List[int], List[str], List[Tuple[int, int]]]
+Tag = Tuple[int, int, TagValue]
+
+
+def pack_values(field_type: int, value: TagValue) -> bytes:
+    """Serialise a tag value in little-endian TIFF layout."""
+    if isinstance(value, bytes):
+        return value  # already packed, e.g. EXIF values copied from a raw file
+    if field_type == ASCII:
+        assert isinstance(value, str)
+        return value.encode("ascii") + b"\0"
+    if field_type == BYTE:
+        return bytes(value)  # type: ignore[arg-type]
+    if field_type == SHORT:
+        return struct.pack(f"<{len(value)}H", *value)
+    if field_type == LONG:
+        return struct.pack(f"<{len(value)}I", *value)
+    fmt = "<ii" if field_type == SRATIONAL else "<II"
+    return b"".join(struct.pack(fmt, *pair) for pair in value)  # type: ignore[misc]
+
+
+def build_ifd(tags: List[Tag], offset: int, next_ifd: int = 0) -> bytes:
+    """
+    Serialise an IFD whose out-of-line values follow the entry table.
+
+    Args:
+        tags: (tag, type, value) entries
+        offset: File offset at which the IFD will be written
+        next_ifd: Offset of the next IFD (0 = none)
+
+    Returns:
+        Encoded IFD including its value area
+    """
+    tags = sorted(tags, key=lambda tag: tag[0])
+    table_size = 2 + len(tags) * 12 + 4
+    entries = [struct.pack("<H", len(tags))]
+    values = b""
+
+    for tag, field_type, value in tags:
+        data = pack_values(field_type, value)
+        count = len(data) // FIELD_SIZES[field_type]
+        if len(data) <= 4:
+            field = data.ljust(4, b"\0")
+        else:
+            field = struct.pack("<I", offset + table_size + len(values))
+            values += data + b"\0" * (len(data) % 2)
+        entries.append(struct.pack("<HHI", tag, field_type, count) + field)
+
+    entries.append(struct.pack("<I", next_ifd))
+    return b"".join(entries) + values
+
+
+def write_rgb_tiff(
+    rgb: np.ndarray,
+    compression: str = "deflate",
+    level: int = 6,
+    exif_data: Optional[bytes] = None,
+) -> bytes:
+    """
+    Encode an 8- or 16-bit RGB array as a baseline TIFF file.
+
+    Deflate compression uses horizontal differencing (TIFF predictor 2),
+    which roughly halves the size of photographic 16-bit data.
+
+    Args:
+        rgb: Array of shape (height, width, 3) with dtype uint8 or uint16
+        compression: "none" or "deflate"
+        level: zlib compression level for deflate (1-9)
+        exif_data: EXIF APP1 payload whose IFD0 tags and sub-IFDs are
+            embedded in the file
+
+    Returns:
+        Complete TIFF file contents
+
+    Raises:
+        ValueError: If the array or compression is not supported
+    """
+    if rgb.ndim != 3 or rgb.shape[2] != 3 or rgb.dtype not in (np.uint8, np.uint16):
+        raise ValueError("Expected an RGB array of uint8 or uint16")
+    if compression not in ("none", "deflate"):
+        raise ValueError(f"Unsupported TIFF compression: {compression!r}")
+
+    height, width = rgb.shape[:2]
+    bits = rgb.dtype.itemsize * 8
+    pixels = rgb.astype(f"<u{rgb.dtype.itemsize}", copy=False)
+    if compression == "deflate":
+        # Store each sample as the difference to its left neighbour; unsigned
+        # arithmetic wraps as the predictor specifies
+        pixels = pixels.copy()
+        pixels[:, 1:] -= rgb[:, :-1]
+
+    row_bytes = width * 3 * rgb.dtype.itemsize
+    rows_per_strip = max(1, STRIP_BYTES // row_bytes)
+    strips = []
+    for top in range(0, height, rows_per_strip):
+        strip = np.ascontiguousarray(pixels[top : top + rows_per_strip]).tobytes()
+        if compression == "deflate":
+            strip = zlib.compress(strip, level)
+        strips.append(strip)
+
+    # EXIF sub-IFDs go between the header and the main IFD, so their offsets
+    # are known before the main IFD is laid out
+    metadata: List[Tag] = []
+    block = b""
+    if exif_data:
+        entries, block = tiff_metadata(exif_data, 8)
+        metadata = [(tag, kind, raw) for tag, (kind, _, raw) in entries.items()]
+    ifd_offset = 8 + len(block)
+
+    def tags(offsets: List[int]) -> List[Tag]:
+        return metadata + [
+            (0x00FE, LONG, [0]),  # NewSubFileType: full-resolution image
+            (0x0100, LONG, [width]),
+            (0x0101, LONG, [height]),
+            (0x0102, SHORT, [bits] * 3),  # BitsPerSample
+            (
+                0x0103,
+                SHORT,
+                [COMPRESSION_DEFLATE if compression == "deflate" else COMPRESSION_NONE],
+            ),
+            (0x0106, SHORT, [2]),  # PhotometricInterpretation: RGB
+            (0x0111, LONG, offsets),  # StripOffsets
+            (0x0115, SHORT, [3]),  # SamplesPerPixel
+            (0x0116, LONG, [rows_per_strip]),
+            (0x0117, LONG, [len(strip) for strip in strips]),  # StripByteCounts
+            (0x011C, SHORT, [1]),  # PlanarConfiguration: interleaved
+            (0x013D, SHORT, [2 if compression == "deflate" else 1]),  # Predictor
+            (0x0153, SHORT, [1] * 3),  # SampleFormat: unsigned integer
+        ]
+
+    # The IFD size does not depend on the offsets it holds
+    ifd_size = len(build_ifd(tags([0] * len(strips)), ifd_offset))
+    offsets = []
+    position = ifd_offset + ifd_size
+    for strip in strips:
+        offsets.append(position)
+        position += len(strip)
+
+    header = b"II*\0" + struct.pack("<I", ifd_offset)
+    return b"".join([header, block, build_ifd(tags(offsets), ifd_offset)] + strips)
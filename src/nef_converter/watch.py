@@ -5,104 +5,388 @@ Monitors a directory for new NEF files and converts them automatically.
 """
 
 import logging
+import os
+import threading
 import time
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Set
+from typing import Dict, Optional, Set, Tuple
 
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
-from .converter import NEFConverter
+from .converter import IN_FLIGHT_PER_WORKER, FileStats, NEFConverter
 
 logger = logging.getLogger(__name__)
 
+# Seconds between size/mtime checks of files that are still being written
+SETTLE_INTERVAL = 0.25
+
+# Consecutive unchanged checks before a file counts as fully written
+SETTLE_CHECKS = 2
+
+# Seconds to wait for a file to stop changing before giving up on it
+SETTLE_TIMEOUT = 600.0
+
+# Backoff in seconds before each retry of a file that failed as truncated
+RETRY_DELAYS = (0.5, 1.0, 2.0, 4.0)
+
+# Seconds between cache evictions while watching
+CACHE_EVICT_INTERVAL = 60.0
+
+# Error fragments that indicate the file was read before it was complete.
+# Only truncation and short-read messages: a genuinely corrupt file would
+# otherwise wait through every retry before failing. LibRaw raises
+# LibRawIOError("Input/output error") for a raw cut short; it prints its
+# "Unexpected end of file" only to stderr
+TRUNCATION_HINTS = (
+    "truncated",
+    "unexpected end",
+    "unexpected eof",
+    "premature end",
+    "input/output",
+)
+
+
+@dataclass
+class _PendingFile:
+    """A file that is waiting to be fully written before conversion."""
+
+    size: int = -1
+    mtime_ns: int = -1
+    stable_checks: int = 0
+    attempt: int = 0
+    not_before: float = 0.0
+    deadline: float = 0.0
+
+
+def _is_truncation_error(message: str) -> bool:
+    """Check whether a conversion error looks like a partially written file."""
+    message = message.lower()
+    return any(hint in message for hint in TRUNCATION_HINTS)
+
 
 class NEFWatchHandler(FileSystemEventHandler):
     """Handler for monitoring NEF file creation events."""
 
-    def __init__(self, converter: NEFConverter, output_dir: Path) -> None:
+    def __init__(
+        self,
+        converter: NEFConverter,
+        output_dir: Path,
+        executor: Optional[Executor] = None,
+        max_in_flight: int = 1,
+    ) -> None:
         """
         Initialize the watch handler.
 
         Args:
             converter: NEFConverter instance to use for conversions
             output_dir: Directory to save converted files
+            executor: Pool to submit conversions to (None = convert inline)
+            max_in_flight: Maximum number of submitted but unfinished
+                conversions; further events block until a slot frees up
         """
         self.converter = converter
         self.output_dir = output_dir
+        self.executor = executor
         self.processed_files: Set[str] = set()
+        self._pending: Dict[str, _PendingFile] = {}
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_in_flight))
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
         super().__init__()
 
+    def start(self) -> None:
+        """Start polling files that are still being written."""
+        self._stop.clear()
+        self._poller = threading.Thread(
+            target=self._poll_loop, name="nef-watch-settle", daemon=True
+        )
+        self._poller.start()
+
+    def stop(self) -> None:
+        """Stop polling; files that are still pending are dropped."""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
     def on_created(self, event: FileSystemEvent) -> None:
         """
         Handle file creation events.
 
+        The file is not converted yet: it is polled until its size and
+        modification time settle, unless a close or move event shows earlier
+        that it is complete.
+
         Args:
             event: File system event
         """
-        if event.is_directory:
+        if event.is_directory or not self._is_nef(event.src_path):
             return
 
         file_path = Path(event.src_path)
+        with self._lock:
+            if self._is_known(file_path):
+                return
+            self._pending[str(file_path)] = _PendingFile(
+                deadline=time.monotonic() + SETTLE_TIMEOUT
+            )
+
+        logger.info(f"New NEF file detected: {file_path.name}")
 
-        # Check if it's a NEF file
-        if file_path.suffix.lower() not in [".nef"]:
+    def on_closed(self, event: FileSystemEvent) -> None:
+        """
+        Handle files closed after writing; they are complete on local disks.
+
+        Args:
+            event: File system event
+        """
+        if event.is_directory or not self._is_nef(event.src_path):
             return
+        self._ready(Path(event.src_path))
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        """
+        Handle files renamed into place, the usual pattern for atomic copies.
 
-        # Avoid processing same file multiple times
-        if str(file_path) in self.processed_files:
+        Args:
+            event: File system event
+        """
+        if event.is_directory:
             return
 
-        logger.info(f"New NEF file detected: {file_path.name}")
+        with self._lock:
+            self._pending.pop(str(event.src_path), None)
 
-        # Wait a moment to ensure file is fully written
-        time.sleep(1)
+        if self._is_nef(event.dest_path):
+            self._ready(Path(event.dest_path))
 
-        try:
-            output_path = self.output_dir / f"{file_path.stem}.jpg"
-            success = self.converter.convert_nef_to_jpg(file_path, output_path)
+    def poll_pending(self) -> None:
+        """Check pending files once and submit those that have settled."""
+        now = time.monotonic()
+        ready = []
 
-            if success:
-                self.processed_files.add(str(file_path))
-                print(f"✅ Converted: {file_path.name} → {output_path.name}")
-            else:
-                print(f"❌ Failed to convert: {file_path.name}")
+        with self._lock:
+            for key, pending in list(self._pending.items()):
+                if now < pending.not_before:
+                    continue
+
+                try:
+                    stat = os.stat(key)
+                except FileNotFoundError:
+                    del self._pending[key]
+                    continue
+
+                if (stat.st_size, stat.st_mtime_ns) == (pending.size, pending.mtime_ns):
+                    pending.stable_checks += 1
+                else:
+                    pending.size, pending.mtime_ns = stat.st_size, stat.st_mtime_ns
+                    pending.stable_checks = 0
 
+                if pending.stable_checks >= SETTLE_CHECKS and pending.size > 0:
+                    ready.append(key)
+                elif now > pending.deadline:
+                    del self._pending[key]
+                    logger.warning(f"Gave up waiting for {key} to finish writing")
+
+        for key in ready:
+            self._ready(Path(key))
+
+    def _poll_loop(self) -> None:
+        """Poll pending files until stopped."""
+        while not self._stop.wait(SETTLE_INTERVAL):
+            try:
+                self.poll_pending()
+            except Exception as e:
+                logger.error(f"Error while polling pending files: {e}")
+
+    @staticmethod
+    def _is_nef(path: str) -> bool:
+        """Check whether a path has a NEF extension."""
+        return Path(path).suffix.lower() in [".nef"]
+
+    def _is_known(self, file_path: Path) -> bool:
+        """Check whether a file is pending, converting or already done."""
+        key = str(file_path)
+        return (
+            key in self.processed_files
+            or key in self._in_flight
+            or key in self._pending
+        )
+
+    def _ready(self, file_path: Path) -> None:
+        """Submit a file that is known to be fully written."""
+        with self._lock:
+            pending = self._pending.pop(str(file_path), None)
+            if str(file_path) in self.processed_files | self._in_flight:
+                return
+            # Claim the file before waiting for a slot, so the observer and
+            # poller threads cannot both submit it
+            self._in_flight.add(str(file_path))
+        self._submit(file_path, pending.attempt if pending else 0)
+
+    def _submit(self, file_path: Path, attempt: int = 0) -> None:
+        """
+        Queue a file for conversion, blocking while the queue is full.
+
+        The caller has already marked the file as in flight.
+
+        Args:
+            file_path: NEF file to convert
+            attempt: Number of earlier attempts that failed as truncated
+        """
+        output_path = self.output_dir / f"{file_path.stem}.jpg"
+        task = (self.converter, file_path, output_path)
+
+        if self.executor is None:
+            try:
+                result = NEFConverter._convert_single_file(task)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(str(file_path))
+            self._finish(result, file_path, output_path, attempt)
+            return
+
+        # Backpressure: the observer thread waits here while the pool is busy
+        try:
+            self._slots.acquire()
+        except BaseException:
+            with self._lock:
+                self._in_flight.discard(str(file_path))
+            raise
+
+        try:
+            future = self.executor.submit(NEFConverter._convert_single_file, task)
         except Exception as e:
-            logger.error(f"Error converting {file_path}: {e}")
+            self._release(file_path)
+            logger.error(f"Could not queue {file_path}: {e}")
             print(f"❌ Error converting {file_path.name}: {e}")
+            return
+
+        future.add_done_callback(
+            lambda done: self._on_done(done, file_path, output_path, attempt)
+        )
+
+    def _on_done(
+        self,
+        future: "Future[Tuple[bool, Path, FileStats]]",
+        file_path: Path,
+        output_path: Path,
+        attempt: int,
+    ) -> None:
+        """Report a finished pool conversion and free its queue slot."""
+        try:
+            result = future.result()
+        except Exception as e:
+            result = (False, file_path, {"error": str(e)})
+        finally:
+            self._release(file_path)
+        self._finish(result, file_path, output_path, attempt)
+
+    def _release(self, file_path: Path) -> None:
+        """Mark a file as no longer in flight and free its queue slot."""
+        with self._lock:
+            self._in_flight.discard(str(file_path))
+        self._slots.release()
+
+    def _finish(
+        self,
+        result: Tuple[bool, Path, FileStats],
+        file_path: Path,
+        output_path: Path,
+        attempt: int,
+    ) -> None:
+        """Record the outcome of a conversion, retrying truncated reads."""
+        success, _, file_stats = result
+        if success:
+            with self._lock:
+                self.processed_files.add(str(file_path))
+            written = self.converter.renditions[0].path_for(output_path)
+            source = " (from cache)" if file_stats.get("cached") else ""
+            print(f"✅ Converted: {file_path.name} → {written.name}{source}")
+            return
+
+        error = str(file_stats.get("error", ""))
+        if _is_truncation_error(error) and attempt < len(RETRY_DELAYS):
+            delay = RETRY_DELAYS[attempt]
+            logger.info(
+                f"{file_path.name} looks incomplete ({error}), retrying in {delay}s"
+            )
+            with self._lock:
+                self._pending[str(file_path)] = _PendingFile(
+                    attempt=attempt + 1,
+                    not_before=time.monotonic() + delay,
+                    deadline=time.monotonic() + SETTLE_TIMEOUT,
+                )
+            return
+
+        print(f"❌ Failed to convert: {file_path.name}")
+        if error:
+            print(f"💡 Error: {error}")
 
 
-def watch_directory(directory: str, converter: NEFConverter, output_dir: Path) -> None:
+def watch_directory(
+    directory: str,
+    converter: NEFConverter,
+    output_dir: Path,
+    max_in_flight: Optional[int] = None,
+) -> None:
     """
     Watch a directory for new NEF files and convert them automatically.
 
+    Conversions run in a pool (threads or processes, per the converter's
+    executor setting) that lives as long as the watch, so bursts of new
+    files are converted in parallel.
+
     Args:
         directory: Directory to watch
         converter: NEFConverter instance
         output_dir: Output directory for converted files
+        max_in_flight: Maximum number of queued conversions before new files
+            wait for a free slot (default: the converter's max_in_flight,
+            or two per worker)
     """
     watch_path = Path(directory)
 
     if not watch_path.exists() or not watch_path.is_dir():
         raise ValueError(f"Invalid watch directory: {directory}")
 
-    event_handler = NEFWatchHandler(converter, output_dir)
-    observer = Observer()
-    observer.schedule(event_handler, str(watch_path), recursive=False)
+    workers = converter.max_workers or os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = converter.max_in_flight or workers * IN_FLIGHT_PER_WORKER
+
+    with converter.create_executor(workers) as executor:
+        event_handler = NEFWatchHandler(converter, output_dir, executor, max_in_flight)
+        observer = Observer()
+        observer.schedule(event_handler, str(watch_path), recursive=False)
 
-    observer.start()
-    print(f"👁️  Watching: {watch_path}")
-    print(f"📁 Output: {output_dir}")
-    print("🔄 Waiting for new NEF files... (Press Ctrl+C to stop)")
-    print()
+        event_handler.start()
+        observer.start()
+        print(f"👁️  Watching: {watch_path}")
+        print(f"📁 Output: {output_dir}")
+        print(f"⚙️  Workers: {workers}")
+        print("🔄 Waiting for new NEF files... (Press Ctrl+C to stop)")
+        print()
+
+        next_eviction = time.monotonic() + CACHE_EVICT_INTERVAL
+        try:
+            while True:
+                time.sleep(1)
+                if converter.cache is not None and time.monotonic() > next_eviction:
+                    converter.cache.evict()
+                    next_eviction = time.monotonic() + CACHE_EVICT_INTERVAL
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping watch mode...")
+            observer.stop()
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\n🛑 Stopping watch mode...")
-        observer.stop()
+        observer.join()
+        event_handler.stop()
+        print("⏳ Finishing queued conversions...")
 
-    observer.join()
+    if converter.cache is not None:
+        converter.cache.evict()
     print("✅ Watch mode stopped")
@@ -0,0 +1,128 @@
+"""
+Tests for the adjustment stage
+
+Covers downscaling, tone curves, sharpening, dithering and banded processing.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.nef_converter import adjustments as module
+from src.nef_converter.adjustments import Adjustments, apply_adjustments, tone_lut
+
+
+def _gradient(height=64, width=96):
+    """Build a 16-bit horizontal gradient with a sharp vertical edge."""
+    values = np.linspace(5000, 60000, width, dtype=np.float64)
+    rgb = np.repeat(values[None, :, None], height, axis=0).repeat(3, axis=2)
+    rgb[:, width // 2 :, 1] = 20000
+    return rgb.astype(np.uint16)
+
+
+class TestAdjustments:
+    """Test cases for the Adjustments class."""
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"downscale": 0},
+            {"exposure": 11},
+            {"contrast": -1},
+            {"contrast": 1.5},
+            {"sharpen": -0.5},
+            {"sharpen_radius": 0},
+            {"sharpen_radius": 20},
+        ],
+    )
+    def test_rejects_out_of_range_values(self, kwargs):
+        """Test that invalid values raise ValueError."""
+        with pytest.raises(ValueError):
+            Adjustments(**kwargs)
+
+    def test_active(self):
+        """Test that only adjustments changing the image are active."""
+        assert not Adjustments().active
+        assert not Adjustments(sharpen_radius=2.0).active
+        assert Adjustments(dither=True).active
+        assert Adjustments(downscale=2).active
+
+
+class TestToneLut:
+    """Test cases for tone_lut()."""
+
+    def test_exposure_doubles_and_clips(self):
+        """Test that one stop doubles values and clips highlights."""
+        lut = tone_lut(Adjustments(exposure=1.0), 256)
+        assert lut[64] == pytest.approx(128 / 255)
+        assert lut[200] == 1.0
+
+    def test_contrast_keeps_end_points(self):
+        """Test that contrast steepens mid-tones around fixed black and white."""
+        lut = tone_lut(Adjustments(contrast=0.5), 65536)
+        assert (lut[0], lut[-1]) == (0.0, 1.0)
+        assert lut[16384] < 0.25 and lut[49151] > 0.75
+        assert np.all(np.diff(lut) >= 0)
+
+
+class TestApplyAdjustments:
+    """Test cases for apply_adjustments()."""
+
+    def test_identity(self):
+        """Test that no adjustments keep 16 bits and round to 8 bits."""
+        rgb = _gradient()
+        assert np.array_equal(apply_adjustments(rgb, Adjustments(), bits=16), rgb)
+        expected = np.rint(rgb / 257).astype(np.uint8)
+        assert np.array_equal(apply_adjustments(rgb, Adjustments()), expected)
+
+    def test_downscale_averages_blocks(self):
+        """Test area averaging and dropping of partial blocks."""
+        rgb = np.zeros((5, 7, 3), dtype=np.uint8)
+        rgb[0, 0] = 255
+        rgb[0:2, 2:4] = 100
+
+        result = apply_adjustments(rgb, Adjustments(downscale=2))
+
+        assert result.shape == (2, 3, 3)
+        assert result[0, 0, 0] == 64  # 255 / 4, rounded
+        assert result[0, 1, 0] == 100
+
+    def test_sharpen_steepens_edges_only(self):
+        """Test that unsharp masking leaves flat areas and boosts edges."""
+        rgb = np.full((32, 32, 3), 60, dtype=np.uint8)
+        rgb[:, 16:] = 180
+
+        result = apply_adjustments(rgb, Adjustments(sharpen=1.0)).astype(int)
+
+        assert result[0, 0, 0] == 60 and result[-1, -1, 0] == 180
+        assert result[10, 15, 0] < 60 and result[10, 16, 0] > 180
+
+    def test_dither_preserves_mean(self):
+        """Test that dithering keeps the level between two 8-bit steps."""
+        flat = np.full((32, 32, 3), round(100.25 * 257), dtype=np.uint16)
+
+        dithered = apply_adjustments(flat, Adjustments(dither=True))
+        rounded = apply_adjustments(flat, Adjustments())
+
+        assert dithered.mean() == pytest.approx(100.25, abs=0.01)
+        assert set(np.unique(dithered)) == {100, 101}
+        assert rounded.mean() == 100
+
+    def test_bands_join_seamlessly(self):
+        """Test that banded processing matches processing in one piece."""
+        rgb = _gradient(height=101)
+        adjustments = Adjustments(
+            downscale=2, exposure=0.3, contrast=0.2, sharpen=0.8, dither=True
+        )
+        with patch.object(module, "ADJUST_TILE_ROWS", 7):
+            banded = apply_adjustments(rgb, adjustments)
+        whole = apply_adjustments(rgb, adjustments)
+
+        assert banded.shape == (50, 48, 3)
+        assert np.array_equal(banded, whole)
+
+    def test_rejects_too_small_images(self):
+        """Test that an image smaller than the factor raises ValueError."""
+        with pytest.raises(ValueError):
+            apply_adjustments(np.zeros((1, 8, 3), np.uint8), Adjustments(downscale=2))
@@ -0,0 +1,109 @@
+"""
+Tests for the conversion cache
+
+Covers keys, placement of cached files and LRU eviction.
+"""
+
+import os
+import stat
+import time
+
+import pytest
+
+from src.nef_converter.cache import ConversionCache, cache_key, remove_file
+
+
+def _outputs(tmp_path, name, contents):
+    """Write output files for one conversion and return their paths."""
+    paths = []
+    for index, data in enumerate(contents):
+        path = tmp_path / f"{name}_{index}.jpg"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+class TestConversionCache:
+    """Test cases for the ConversionCache class."""
+
+    def test_key_depends_on_source_and_settings(self):
+        """Test that keys change with content or settings only."""
+        key = cache_key("ab" * 32, {"quality": 95, "mode": "full"})
+
+        assert key == cache_key("ab" * 32, {"mode": "full", "quality": 95})
+        assert key != cache_key("cd" * 32, {"quality": 95, "mode": "full"})
+        assert key != cache_key("ab" * 32, {"quality": 90, "mode": "full"})
+
+    @pytest.mark.parametrize("link", ["auto", "hardlink", "copy"])
+    def test_store_and_fetch(self, tmp_path, link):
+        """Test a round trip of several rendition files."""
+        cache = ConversionCache(tmp_path / "cache", link=link)
+        key = cache_key("00" * 32, {})
+        cache.store(key, _outputs(tmp_path, "src", [b"full", b"thumb"]))
+
+        targets = [tmp_path / "out.jpg", tmp_path / "out_t.jpg"]
+        targets[0].write_bytes(b"stale")
+        assert cache.fetch(key, targets) is True
+
+        assert [path.read_bytes() for path in targets] == [b"full", b"thumb"]
+        assert cache.size() == len(b"full") + len(b"thumb")
+
+    def test_cached_files_are_read_only(self, tmp_path):
+        """Test that stored files cannot be edited in place."""
+        cache = ConversionCache(tmp_path / "cache", link="copy")
+        key = cache_key("00" * 32, {})
+        cache.store(key, _outputs(tmp_path, "src", [b"data"]))
+
+        cached = next((tmp_path / "cache" / "objects").glob("*/*/0"))
+        assert not os.stat(cached).st_mode & stat.S_IWUSR
+
+        remove_file(cached)
+        remove_file(cached)  # missing files are ignored
+        assert not cached.exists()
+
+    def test_missing_or_incomplete_entry_misses(self, tmp_path):
+        """Test that unknown keys and partial entries are misses."""
+        cache = ConversionCache(tmp_path / "cache")
+        key = cache_key("00" * 32, {})
+        target = tmp_path / "out.jpg"
+
+        assert cache.fetch(key, [target]) is False
+        cache.store(key, _outputs(tmp_path, "src", [b"one"]))
+        assert cache.fetch(key, [target, tmp_path / "out_t.jpg"]) is False
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that eviction keeps the most recently used entries."""
+        cache = ConversionCache(tmp_path / "cache", max_bytes=250, link="copy")
+        keys = [cache_key(f"{index:064x}", {}) for index in range(3)]
+        for index, key in enumerate(keys):
+            cache.store(key, _outputs(tmp_path, f"src{index}", [b"x" * 100]))
+            entry = tmp_path / "cache" / "objects" / key[:2] / key
+            os.utime(entry, (time.time() - 100 + index, time.time() - 100 + index))
+
+        # Using the oldest entry makes the second one the least recent
+        assert cache.fetch(keys[0], [tmp_path / "hit.jpg"])
+        assert cache.evict() == 1
+
+        assert cache.fetch(keys[0], [tmp_path / "a.jpg"])
+        assert not cache.fetch(keys[1], [tmp_path / "b.jpg"])
+        assert cache.fetch(keys[2], [tmp_path / "c.jpg"])
+        assert cache.size() == 200
+
+    def test_evict_removes_stale_staging(self, tmp_path):
+        """Test that leftovers of interrupted stores are cleaned up."""
+        cache = ConversionCache(tmp_path / "cache")
+        stale = tmp_path / "cache" / "staging" / "abc.1.2"
+        stale.mkdir()
+        (stale / "0").write_bytes(b"partial")
+        os.utime(stale, (0, 0))
+
+        cache.evict()
+
+        assert not stale.exists()
+
+    def test_invalid_settings_are_rejected(self, tmp_path):
+        """Test validation of the link mode and size."""
+        with pytest.raises(ValueError, match="link mode"):
+            ConversionCache(tmp_path / "cache", link="symlink")
+        with pytest.raises(ValueError, match="positive"):
+            ConversionCache(tmp_path / "cache", max_bytes=0)
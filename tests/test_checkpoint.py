@@ -0,0 +1,111 @@
+"""
+Tests for checkpointing
+
+Covers atomic output writes and the checkpoint journal used by --resume.
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.nef_converter.checkpoint import (
+    CHECKPOINT_NAME,
+    CheckpointJournal,
+    find_resumable,
+    remove_partial_files,
+    write_atomic,
+)
+
+SETTINGS = {"quality": 95, "mode": "full"}
+
+
+def _journal_with_entry(tmp_path, source):
+    """Write a journal recording one finished source and close it."""
+    (tmp_path / "a.jpg").write_bytes(b"jpeg")
+    journal = CheckpointJournal(tmp_path / CHECKPOINT_NAME, SETTINGS).open()
+    journal.record("a.nef", source.stat(), None, ["a.jpg"])
+    journal.close()
+
+
+class TestWriteAtomic:
+    """Test cases for atomic output writes."""
+
+    def test_replaces_existing_file(self, tmp_path):
+        """Test that the output is replaced and no temporary file remains."""
+        output = tmp_path / "a.jpg"
+        output.write_bytes(b"old")
+
+        write_atomic(output, b"new")
+
+        assert output.read_bytes() == b"new"
+        assert list(tmp_path.iterdir()) == [output]
+
+    def test_failed_write_keeps_previous_output(self, tmp_path):
+        """Test that an interrupted write leaves the old file intact."""
+        output = tmp_path / "a.jpg"
+        output.write_bytes(b"old")
+
+        with patch("os.fsync", side_effect=KeyboardInterrupt):
+            with pytest.raises(KeyboardInterrupt):
+                write_atomic(output, b"new")
+
+        assert output.read_bytes() == b"old"
+        assert list(tmp_path.iterdir()) == [output]
+
+    def test_remove_partial_files(self, tmp_path):
+        """Test that leftovers of a killed run are removed recursively."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / ".a.jpg.1.2.partial").write_bytes(b"")
+        (tmp_path / "a.jpg").write_bytes(b"jpeg")
+
+        assert remove_partial_files(tmp_path) == 1
+        assert [p.name for p in tmp_path.rglob("*.*")] == ["a.jpg"]
+
+
+class TestCheckpointJournal:
+    """Test cases for the CheckpointJournal class."""
+
+    def test_resume_keeps_finished_files(self, tmp_path):
+        """Test that a resumed journal knows finished, unchanged sources."""
+        source = tmp_path / "a.nef"
+        source.write_bytes(b"raw data")
+        _journal_with_entry(tmp_path, source)
+
+        journal = CheckpointJournal(tmp_path / CHECKPOINT_NAME, SETTINGS)
+        journal.open(resume=True)
+        assert journal.is_done("a.nef", source)
+        assert not journal.is_done("b.nef", source)
+
+        source.write_bytes(b"new data!")
+        assert not journal.is_done("a.nef", source)
+        journal.close()
+
+    def test_torn_line_and_other_settings(self, tmp_path):
+        """Test that a torn last line is skipped and other settings reset."""
+        source = tmp_path / "a.nef"
+        source.write_bytes(b"raw data")
+        _journal_with_entry(tmp_path, source)
+        with open(tmp_path / CHECKPOINT_NAME, "a") as handle:
+            handle.write('{"key": "b.nef", "si')
+
+        journal = CheckpointJournal(tmp_path / CHECKPOINT_NAME, SETTINGS)
+        assert list(journal.open(resume=True).entries) == ["a.nef"]
+        journal.close()
+
+        other = CheckpointJournal(tmp_path / CHECKPOINT_NAME, {"quality": 50})
+        assert other.open(resume=True).entries == {}
+        other.close(complete=True)
+        assert not (tmp_path / CHECKPOINT_NAME).exists()
+
+    def test_find_resumable_picks_newest_journal(self, tmp_path):
+        """Test that the newest interrupted export directory is found."""
+        assert find_resumable(tmp_path) is None
+        for index, name in enumerate(("export_old", "export_new", "export_done")):
+            (tmp_path / name).mkdir()
+            if name != "export_done":
+                journal = tmp_path / name / CHECKPOINT_NAME
+                journal.write_text("{}\n")
+                os.utime(journal, (index, index))
+
+        assert find_resumable(tmp_path) == tmp_path / "export_new"
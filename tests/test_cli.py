@@ -0,0 +1,98 @@
+"""
+Tests for the NEF Converter command line interface
+
+Covers argument parsing helpers and the parser itself.
+"""
+
+import argparse
+
+import pytest
+
+from src.nef_converter.cli import (
+    create_parser,
+    parse_address,
+    parse_rendition,
+    parse_size,
+)
+from src.nef_converter.renditions import Rendition
+
+
+class TestParseSize:
+    """Test cases for the parse_size helper."""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("1024", 1024),
+            ("512M", 512 * 2**20),
+            ("8g", 8 * 2**30),
+            ("1.5GB", 3 * 2**29),
+        ],
+    )
+    def test_valid_sizes(self, value, expected):
+        """Test sizes with and without binary unit suffixes."""
+        assert parse_size(value) == expected
+
+    @pytest.mark.parametrize("value", ["lots", "-1G", "0"])
+    def test_invalid_sizes(self, value):
+        """Test that malformed or non-positive sizes are rejected."""
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_size(value)
+
+
+class TestParseRendition:
+    """Test cases for the parse_rendition helper."""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("full", Rendition(quality=90)),
+            ("2048:85:_web", Rendition(2048, 85, "JPEG", "_web")),
+            ("400::_thumb:webp", Rendition(400, 90, "WEBP", "_thumb")),
+            ("400::_thumb:jpg", Rendition(400, 90, "JPEG", "_thumb")),
+        ],
+    )
+    def test_valid_renditions(self, value, expected):
+        """Test renditions with defaults filled from the given quality."""
+        assert parse_rendition(value, quality=90) == expected
+
+    @pytest.mark.parametrize(
+        "value", ["big", "2048:high", "400:80:_t:gif", "1:2:3:4:5"]
+    )
+    def test_invalid_renditions(self, value):
+        """Test that malformed renditions are rejected."""
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_rendition(value)
+
+
+class TestParseAddress:
+    """Test cases for the parse_address helper."""
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("nas:9000", ("nas", 9000)),
+            ("10.0.0.5", ("10.0.0.5", 8766)),
+            (":9000", ("127.0.0.1", 9000)),
+            ("[::1]:9000", ("::1", 9000)),
+        ],
+    )
+    def test_valid_addresses(self, value, expected):
+        """Test addresses with default host and port."""
+        assert parse_address(value) == expected
+
+    @pytest.mark.parametrize("value", ["nas:port", "nas:0", "nas:70000"])
+    def test_invalid_addresses(self, value):
+        """Test that malformed ports are rejected."""
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_address(value)
+
+
+class TestCreateParser:
+    """Test cases for the command line parser."""
+
+    @pytest.mark.parametrize("value", ["jpg", "JPG", "jpeg"])
+    def test_format_accepts_jpg(self, value):
+        """Test that -f takes format aliases in any case."""
+        args = create_parser().parse_args(["-f", value])
+        assert Rendition(format=args.format).format == "JPEG"
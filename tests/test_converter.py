@@ -4,12 +4,59 @@ Tests for NEF Converter
 Basic test structure for the NEF converter functionality.
 """
 
+import io
+import mmap
+import threading
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
+import rawpy
+from PIL import Image
 
-from src.nef_converter.converter import NEFConverter
+from src.nef_converter.adjustments import Adjustments
+from src.nef_converter.converter import (
+    FALLBACK_BYTES_PER_FILE_BYTE,
+    MEMORY_OVERHEAD,
+    PEAK_BYTES_PER_PIXEL,
+    POSTPROCESS_PROFILES,
+    NEFConverter,
+    _array_to_image,
+    _insert_exif_segment,
+)
+from src.nef_converter.exif import read_exif
+from src.nef_converter.manifest import file_sha256
+from src.nef_converter.renditions import Rendition
+from src.nef_converter.synthetic import make_synthetic_raw, write_synthetic_raw
+
+
+def _jpeg_bytes(size=(64, 48)):
+    """Encode a small solid-colour JPEG."""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (120, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def nef_file(tmp_path):
+    """A placeholder NEF file; decoding is mocked in the tests using it."""
+    path = tmp_path / "test.nef"
+    path.write_bytes(b"II*\x00" + bytes(60))
+    return path
+
+
+def _mock_raw_with_preview(mock_rawpy, preview, sensor_size=(64, 48)):
+    """Configure a mocked rawpy module whose image carries a JPEG preview."""
+    mock_rawpy.LibRawNoThumbnailError = type("NoThumb", (Exception,), {})
+    mock_rawpy.LibRawUnsupportedThumbnailError = type("BadThumb", (Exception,), {})
+    mock_raw = MagicMock()
+    mock_raw.sizes.width, mock_raw.sizes.height = sensor_size
+    mock_raw.extract_thumb.return_value.format = mock_rawpy.ThumbFormat.JPEG
+    mock_raw.extract_thumb.return_value.data = preview
+    mock_rawpy.imread.return_value.__enter__.return_value = mock_raw
+    return mock_raw
 
 
 class TestNEFConverter:
@@ -35,26 +82,70 @@ class TestNEFConverter:
         with pytest.raises(ValueError, match="Directory does not exist"):
             converter.get_nef_files(nonexistent_path)
 
+    def test_iter_nef_files_recursive(self, tmp_path):
+        """Test recursive, case-insensitive discovery with exclusions."""
+        (tmp_path / "2024" / "06").mkdir(parents=True)
+        (tmp_path / "export_1").mkdir()
+        for name in ("a.NEF", "2024/b.nef", "2024/06/c.Nef", "export_1/d.nef"):
+            (tmp_path / name).write_bytes(b"")
+        (tmp_path / "notes.txt").write_bytes(b"")
+
+        converter = NEFConverter()
+        found = converter.iter_nef_files(
+            tmp_path, recursive=True, exclude=[tmp_path / "export_1"]
+        )
+
+        assert sorted(p.relative_to(tmp_path).as_posix() for p in found) == [
+            "2024/06/c.Nef",
+            "2024/b.nef",
+            "a.NEF",
+        ]
+        assert [p.name for p in converter.get_nef_files(tmp_path)] == ["a.NEF"]
+
+    @patch.object(NEFConverter, "_open_directory")
+    def test_recursive_batch_mirrors_structure(self, _open, tmp_path):
+        """Test that recursive batches mirror the input folders in the output."""
+        (tmp_path / "in" / "day1").mkdir(parents=True)
+        (tmp_path / "in" / "day1" / "a.nef").write_bytes(b"raw")
+
+        def fake_convert(self, nef_path, output_path):
+            output_path.write_bytes(b"jpeg")
+            return {"bytes_read": 3, "seconds": 0.1}
+
+        with patch.object(NEFConverter, "_convert", fake_convert):
+            successful, total, _ = NEFConverter().convert_batch(
+                str(tmp_path / "in"),
+                parallel=False,
+                output_directory=str(tmp_path / "out"),
+                recursive=True,
+            )
+
+        assert (successful, total) == (1, 1)
+        assert (tmp_path / "out" / "day1" / "a.jpg").exists()
+
     @patch("src.nef_converter.converter.Image")
     @patch("src.nef_converter.converter.rawpy")
-    def test_convert_nef_to_jpg_success(self, mock_rawpy, mock_image):
+    def test_convert_nef_to_jpg_success(
+        self, mock_rawpy, mock_image, tmp_path, nef_file
+    ):
         """Test successful NEF to JPG conversion."""
         # Setup mocks
         mock_raw = MagicMock()
-        mock_rgb_data = MagicMock()
-        mock_raw.postprocess.return_value = mock_rgb_data
+        mock_raw.postprocess.return_value = np.zeros((4, 6, 3), dtype=np.uint8)
         mock_rawpy.imread.return_value.__enter__.return_value = mock_raw
 
-        mock_img = MagicMock()
-        mock_image.fromarray.return_value = mock_img
+        mock_img = MagicMock(size=(6, 4))
+        mock_image.frombuffer.return_value = mock_img
 
         converter = NEFConverter(quality=95, preserve_exif=False)
-        result = converter.convert_nef_to_jpg(Path("test.nef"), Path("test.jpg"))
+        result = converter.convert_nef_to_jpg(nef_file, tmp_path / "test.jpg")
 
         assert result is True
-        mock_rawpy.imread.assert_called_once_with("test.nef")
+        # LibRaw reads the file itself; no copy of it is held while decoding
+        mock_rawpy.imread.assert_called_once_with(str(nef_file))
         mock_raw.postprocess.assert_called_once()
-        mock_image.fromarray.assert_called_once()
+        mock_image.frombuffer.assert_called_once()
+        assert mock_image.frombuffer.call_args.args[:2] == ("RGB", (6, 4))
         mock_img.save.assert_called_once()
 
     @patch("src.nef_converter.converter.rawpy")
@@ -68,6 +159,546 @@ class TestNEFConverter:
 
         assert result is False
 
+    def test_init_rejects_unknown_mode(self):
+        """Test that an unknown conversion mode is rejected."""
+        with pytest.raises(ValueError, match="Unknown conversion mode"):
+            NEFConverter(mode="sketch")
+
+    def test_init_rejects_unknown_profile(self):
+        """Test that an unknown processing profile is rejected."""
+        with pytest.raises(ValueError, match="Unknown processing profile"):
+            NEFConverter(profile="turbo")
+
+    @pytest.mark.parametrize("profile", list(POSTPROCESS_PROFILES))
+    def test_profile_sets_postprocess_params(self, profile, tmp_path, nef_file):
+        """Test that each profile maps onto rawpy postprocess() arguments."""
+        with patch("src.nef_converter.converter.rawpy.imread") as imread:
+            mock_raw = imread.return_value.__enter__.return_value
+            mock_raw.postprocess.return_value = np.zeros((4, 6, 3), dtype=np.uint8)
+
+            converter = NEFConverter(preserve_exif=False, profile=profile)
+            file_stats = converter._convert(nef_file, tmp_path / "test.jpg")
+
+        params = mock_raw.postprocess.call_args.kwargs
+        assert isinstance(params["demosaic_algorithm"], rawpy.DemosaicAlgorithm)
+        assert params.get("half_size", False) == (profile == "fast")
+        assert file_stats["profile"] == profile
+
+    def test_init_rejects_colliding_renditions(self):
+        """Test that two renditions may not write the same file."""
+        with pytest.raises(ValueError, match="differ in suffix or format"):
+            NEFConverter(renditions=[Rendition(), Rendition(max_size=400)])
+
+    def test_init_validates_encoder_options(self):
+        """Test that encoder options and 16-bit resizes are checked up front."""
+        with pytest.raises(ValueError, match="Unknown JPEG option"):
+            NEFConverter(encoder_options={"jpeg": {"speed": 9}})
+        with pytest.raises(ValueError, match="written at full size"):
+            NEFConverter(output_format="TIFF", max_size=1024)
+
+        converter = NEFConverter(
+            output_format="PNG", encoder_options={"png": {"compress_level": 9}}
+        )
+        assert converter.settings()["encoder_options"] == {"PNG": {"compress_level": 9}}
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_renditions_share_one_decode(self, mock_rawpy, tmp_path, nef_file):
+        """Test that renditions come from one decode, each from the last level."""
+        mock_raw = MagicMock()
+        mock_raw.postprocess.return_value = np.zeros((400, 600, 3), dtype=np.uint8)
+        mock_rawpy.imread.return_value.__enter__.return_value = mock_raw
+        renditions = [
+            Rendition(max_size=60, quality=70, suffix="_thumb"),
+            Rendition(),
+            Rendition(max_size=300, suffix="_web", format="PNG"),
+        ]
+
+        resized = []
+        original_resize = Image.Image.resize
+
+        def spy_resize(img, size, *args, **kwargs):
+            resized.append((img.size, size))
+            return original_resize(img, size, *args, **kwargs)
+
+        converter = NEFConverter(preserve_exif=False, renditions=renditions)
+        with patch.object(Image.Image, "resize", spy_resize):
+            converter._convert(nef_file, tmp_path / "test.jpg")
+
+        mock_raw.postprocess.assert_called_once()
+        assert resized == [((600, 400), (300, 200)), ((300, 200), (60, 40))]
+        sizes = {}
+        for name in ["test.jpg", "test_web.png", "test_thumb.jpg"]:
+            with Image.open(tmp_path / name) as img:
+                sizes[name] = img.size
+        assert sizes == {
+            "test.jpg": (600, 400),
+            "test_web.png": (300, 200),
+            "test_thumb.jpg": (60, 40),
+        }
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_preview_renditions_reuse_preview(self, mock_rawpy, tmp_path, nef_file):
+        """Test that a full-size JPEG rendition is copied from the preview."""
+        preview = _jpeg_bytes()
+        _mock_raw_with_preview(mock_rawpy, preview)
+        renditions = [Rendition(), Rendition(max_size=16, suffix="_thumb")]
+
+        converter = NEFConverter(
+            preserve_exif=False, mode="preview", renditions=renditions
+        )
+        converter._convert(nef_file, tmp_path / "test.jpg")
+
+        assert (tmp_path / "test.jpg").read_bytes() == preview
+        with Image.open(tmp_path / "test_thumb.jpg") as img:
+            assert img.size == (16, 12)
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_preview_mode_skips_demosaic(self, mock_rawpy, tmp_path, nef_file):
+        """Test that a full-size preview is written without decoding."""
+        preview = _jpeg_bytes()
+        mock_raw = _mock_raw_with_preview(mock_rawpy, preview)
+
+        converter = NEFConverter(preserve_exif=False, mode="preview")
+        output = tmp_path / "test.jpg"
+        assert converter.convert_nef_to_jpg(nef_file, output) is True
+
+        mock_raw.postprocess.assert_not_called()
+        assert output.read_bytes() == preview
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_preview_mode_falls_back_for_small_preview(
+        self, mock_rawpy, tmp_path, nef_file
+    ):
+        """Test that a preview smaller than the sensor triggers a full decode."""
+        mock_raw = _mock_raw_with_preview(
+            mock_rawpy, _jpeg_bytes((16, 12)), sensor_size=(640, 480)
+        )
+        mock_raw.postprocess.return_value = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        converter = NEFConverter(preserve_exif=False, mode="preview")
+        output = tmp_path / "test.jpg"
+        assert converter.convert_nef_to_jpg(nef_file, output) is True
+
+        mock_raw.postprocess.assert_called_once()
+        with Image.open(output) as img:
+            assert img.size == (640, 480)
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_mapped_file_feeds_exif_and_libraw_decodes_the_path(
+        self, mock_rawpy, tmp_path, nef_file
+    ):
+        """Test that EXIF comes from a mapping and no copy is held to decode."""
+        mock_raw = _mock_raw_with_preview(mock_rawpy, _jpeg_bytes())
+        mock_raw.postprocess.return_value = np.zeros((48, 64, 3), dtype=np.uint8)
+        seen = []
+
+        def recording_read_exif(data, *args):
+            seen.append((type(data), bytes(data[:])))
+            return read_exif(data, *args)
+
+        converter = NEFConverter(preserve_exif=True)
+        with (
+            patch.object(Path, "read_bytes") as read_bytes,
+            patch("src.nef_converter.converter.read_exif", recording_read_exif),
+        ):
+            file_stats = converter._convert(nef_file, tmp_path / "test.jpg")
+
+        read_bytes.assert_not_called()
+        assert seen == [(mmap.mmap, nef_file.read_bytes())]
+        mock_rawpy.imread.assert_called_once_with(str(nef_file))
+        assert file_stats["bytes_read"] == nef_file.stat().st_size
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_convert_reports_stage_timings(self, mock_rawpy, tmp_path, nef_file):
+        """Test that each pipeline stage is timed and output bytes counted."""
+        mock_raw = _mock_raw_with_preview(mock_rawpy, _jpeg_bytes())
+        mock_raw.postprocess.return_value = np.zeros((48, 64, 3), dtype=np.uint8)
+        output = tmp_path / "test.jpg"
+
+        file_stats = NEFConverter(incremental=True)._convert(nef_file, output)
+
+        assert list(file_stats["stages"]) == [
+            "read",
+            "hash",
+            "exif",
+            "decode",
+            "encode",
+            "write",
+        ]
+        assert sum(file_stats["stages"].values()) == pytest.approx(
+            file_stats["seconds"], abs=0.01
+        )
+        assert file_stats["bytes_written"] == output.stat().st_size
+
+    @patch.object(NEFConverter, "_open_directory")
+    def test_incremental_batch_skips_unchanged_files(self, _open, tmp_path):
+        """Test that a re-run only converts new or changed files."""
+        for name in ("a.nef", "b.nef"):
+            (tmp_path / name).write_bytes(name.encode())
+        converted = []
+
+        def fake_convert(self, nef_path, output_path):
+            converted.append(nef_path.name)
+            output_path.write_bytes(b"jpeg")
+            return {
+                "bytes_read": 5,
+                "seconds": 0.1,
+                "sha256": file_sha256(nef_path),
+            }
+
+        converter = NEFConverter(incremental=True)
+        with patch.object(NEFConverter, "_convert", fake_convert):
+            assert converter.convert_batch(str(tmp_path), parallel=False)[:2] == (2, 2)
+            assert sorted(converted) == ["a.nef", "b.nef"]
+
+            converted.clear()
+            (tmp_path / "c.nef").write_bytes(b"c.nef")
+            successful, total, stats = converter.convert_batch(
+                str(tmp_path), parallel=False
+            )
+
+        assert (successful, total, stats["skipped"]) == (3, 3, 2)
+        assert converted == ["c.nef"]
+        assert (tmp_path / "export" / "c.jpg").exists()
+
+    @patch.object(NEFConverter, "_open_directory")
+    def test_resume_skips_files_finished_before_interruption(self, _open, tmp_path):
+        """Test that --resume continues an interrupted run in its directory."""
+        for name in ("a.nef", "b.nef", "c.nef"):
+            (tmp_path / name).write_bytes(name.encode())
+        converted = []
+
+        def fake_convert(self, nef_path, output_path):
+            if len(converted) == 2:
+                converted.append("interrupted")
+                raise KeyboardInterrupt
+            converted.append(nef_path.name)
+            output_path.write_bytes(b"jpeg")
+            return {"bytes_read": 5, "seconds": 0.1}
+
+        converter = NEFConverter()
+        with patch.object(NEFConverter, "_convert", fake_convert):
+            with pytest.raises(KeyboardInterrupt):
+                converter.convert_batch(str(tmp_path), parallel=False)
+            (output_dir,) = tmp_path.glob("export_*")
+            (output_dir / ".c.jpg.1.2.partial").write_bytes(b"jp")
+
+            successful, total, stats = converter.convert_batch(
+                str(tmp_path), parallel=False, resume=True
+            )
+
+        assert (successful, total, stats["resumed"]) == (3, 3, 2)
+        assert converted[2] == "interrupted"
+        assert sorted(converted[:2] + converted[3:]) == ["a.nef", "b.nef", "c.nef"]
+        assert sorted(p.name for p in output_dir.iterdir()) == [
+            "a.jpg",
+            "b.jpg",
+            "c.jpg",
+        ]
+
+    @patch.object(NEFConverter, "_open_directory")
+    def test_largest_schedule_converts_big_files_first(self, _open, tmp_path):
+        """Test the largest-first schedule and the tail statistics."""
+        for name, size in (("a", 200), ("b", 500), ("c", 300)):
+            write_synthetic_raw(tmp_path / f"{name}.nef", width=size, height=size)
+        converted = []
+
+        def fake_convert(self, nef_path, output_path):
+            converted.append(nef_path.name)
+            return {"bytes_read": 5, "seconds": 0.1}
+
+        converter = NEFConverter(schedule="largest")
+        with patch.object(NEFConverter, "_convert", fake_convert):
+            successful, total, stats = converter.convert_batch(
+                str(tmp_path), parallel=False
+            )
+
+        assert (successful, total) == (3, 3)
+        assert converted == ["b.nef", "c.nef", "a.nef"]
+        assert (stats["tail_seconds"], stats["tail_idle_seconds"]) == (0.0, 0.0)
+
+    def test_rejects_unknown_schedule(self):
+        """Test that an unknown schedule raises ValueError."""
+        with pytest.raises(ValueError, match="Unknown schedule"):
+            NEFConverter(schedule="random")
+
+    @patch.object(NEFConverter, "_open_directory")
+    def test_dedupe_skips_card_copies(self, _open, tmp_path):
+        """Test that identical copies in several folders are converted once."""
+        for folder in ("card", "backup"):
+            (tmp_path / folder).mkdir()
+            write_synthetic_raw(tmp_path / folder / "frame.nef", width=300, height=200)
+        write_synthetic_raw(tmp_path / "card" / "other.nef", seed=7)
+        converted = []
+
+        def fake_convert(self, nef_path, output_path):
+            converted.append(nef_path)
+            output_path.write_bytes(b"jpeg")
+            return {"bytes_read": 5, "seconds": 0.1}
+
+        converter = NEFConverter(dedupe="duplicates")
+        with patch.object(NEFConverter, "_convert", fake_convert):
+            successful, total, stats = converter.convert_batch(
+                str(tmp_path),
+                parallel=False,
+                recursive=True,
+                output_directory=str(tmp_path / "out"),
+            )
+
+        assert (successful, total, stats["duplicates"]) == (3, 3, 1)
+        assert sorted(path.name for path in converted) == ["frame.nef", "other.nef"]
+        # The index goes with the outputs, never among the photos
+        assert (tmp_path / "out" / ".nef_fingerprints.sqlite").exists()
+        assert not list((tmp_path / "card").glob("*.sqlite"))
+        assert not (tmp_path / ".nef_fingerprints.sqlite").exists()
+
+        cached = NEFConverter(dedupe="duplicates", cache_dir=tmp_path / "cache")
+        with patch.object(NEFConverter, "_convert", fake_convert):
+            cached.convert_batch(str(tmp_path / "card"), parallel=False)
+        assert (tmp_path / "cache" / ".nef_fingerprints.sqlite").exists()
+
+    def test_parallel_submission_is_windowed(self, tmp_path):
+        """Test that no more than max_in_flight tasks are pulled ahead."""
+        release = threading.Event()
+        pulled = []
+
+        def tasks():
+            for index in range(10):
+                pulled.append(index)
+                yield None, tmp_path / f"{index}.nef", tmp_path / f"{index}.jpg"
+
+        def fake_convert(args):
+            release.wait(5)
+            return True, args[1], {}
+
+        converter = NEFConverter(max_workers=2, max_in_flight=3, executor="thread")
+        results = []
+        with patch.object(
+            NEFConverter, "_convert_single_file", staticmethod(fake_convert)
+        ):
+            consumer = threading.Thread(
+                target=lambda: results.extend(converter._iter_results(tasks(), True))
+            )
+            consumer.start()
+            consumer.join(0.2)
+            # Three tasks in flight plus the one waiting for a free slot
+            assert len(pulled) == 4
+
+            release.set()
+            consumer.join(5)
+
+        assert len(results) == 10
+
+    def test_memory_budget_caps_concurrency(self, tmp_path):
+        """Test that files are held back until their memory estimate fits."""
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def fake_convert(args):
+            with lock:
+                running.append(args[1])
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(args[1])
+            return True, args[1], {}
+
+        tasks = [(None, tmp_path / f"{i}.nef", tmp_path / f"{i}.jpg") for i in range(6)]
+        converter = NEFConverter(max_workers=4, max_memory=250, executor="thread")
+        with (
+            patch.object(
+                NEFConverter, "_convert_single_file", staticmethod(fake_convert)
+            ),
+            patch.object(NEFConverter, "estimate_memory", return_value=100),
+        ):
+            results = list(converter._iter_results(tasks, True))
+
+        assert len(results) == 6
+        assert max(peak) == 2
+
+    @patch("src.nef_converter.converter.rawpy")
+    def test_estimate_memory_from_raw_header(self, mock_rawpy, tmp_path):
+        """Test that the estimate scales with the raw dimensions."""
+        small = write_synthetic_raw(tmp_path / "small.nef", width=400, height=300)
+        large = write_synthetic_raw(tmp_path / "large.nef", width=800, height=600)
+        converter = NEFConverter()
+
+        estimate = converter.estimate_memory(small)
+
+        # The header is parsed without opening the file in LibRaw
+        mock_rawpy.imread.assert_not_called()
+        assert estimate == int(400 * 300 * (2 + PEAK_BYTES_PER_PIXEL) * MEMORY_OVERHEAD)
+        assert converter.estimate_memory(large) == pytest.approx(4 * estimate, 1e-6)
+
+    def test_estimate_memory_falls_back_to_file_size(self, tmp_path):
+        """Test files whose header cannot be read."""
+        path = tmp_path / "a.nef"
+        path.write_bytes(b"\x00" * 5000)
+        assert (
+            NEFConverter().estimate_memory(path) == 5000 * FALLBACK_BYTES_PER_FILE_BYTE
+        )
+
+    def test_array_to_image_handles_strided_arrays(self):
+        """Test the hand-off for contiguous and strided decoder output."""
+        rgb = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+
+        for array in (rgb, rgb[:, ::-1]):
+            img = _array_to_image(array)
+            assert img.size == (6, 4)
+            assert np.array_equal(np.asarray(img), array)
+
+    def test_insert_exif_segment(self):
+        """Test that EXIF is spliced into a JPEG without re-encoding."""
+        exif = Image.Exif()
+        exif[0x010F] = "NIKON CORPORATION"
+
+        jpeg = _insert_exif_segment(_jpeg_bytes(), exif.tobytes())
+
+        with Image.open(io.BytesIO(jpeg)) as img:
+            assert img.getexif()[0x010F] == "NIKON CORPORATION"
+
+
+@pytest.mark.integration
+class TestSyntheticRawConversion:
+    """End-to-end conversions of synthetic raw files with the real rawpy."""
+
+    @pytest.mark.parametrize("mode", ["full", "preview"])
+    def test_convert_synthetic_raw(self, tmp_path, mode):
+        """Test that a synthetic raw converts with its EXIF preserved."""
+        source = write_synthetic_raw(tmp_path / "frame.nef", width=300, height=200)
+        output = tmp_path / "frame.jpg"
+
+        converter = NEFConverter(mode=mode)
+        assert converter.convert_nef_to_jpg(source, output) is True
+
+        with Image.open(output) as img:
+            assert img.format == "JPEG"
+            assert img.size == (300, 200)
+            assert img.getexif()[0x010F] == "NIKON CORPORATION"
+
+    def test_tiff_keeps_16_bit_decode(self, tmp_path):
+        """Test that 16-bit TIFF output comes from a 16-bit decode."""
+        source = write_synthetic_raw(tmp_path / "frame.nef", width=300, height=200)
+        renditions = [Rendition(format="TIFF"), Rendition(max_size=100)]
+
+        converter = NEFConverter(renditions=renditions)
+        assert converter.convert_nef_to_jpg(source, tmp_path / "frame.jpg") is True
+
+        with Image.open(tmp_path / "frame.tif") as img:
+            assert img.size == (300, 200)
+            assert img.tag_v2[0x0102] == (16, 16, 16)
+        with Image.open(tmp_path / "frame.jpg") as img:
+            assert img.size == (100, 67)
+            assert img.getexif()[0x010F] == "NIKON CORPORATION"
+
+    def test_fast_profile_decodes_half_size(self, tmp_path):
+        """Test that the fast profile halves each edge of the output."""
+        source = write_synthetic_raw(tmp_path / "frame.nef", width=300, height=200)
+        output = tmp_path / "frame.jpg"
+
+        converter = NEFConverter(profile="fast")
+        assert converter.convert_nef_to_jpg(source, output) is True
+
+        with Image.open(output) as img:
+            assert img.size == (150, 100)
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
+
+    def test_cache_serves_identical_files(self, tmp_path):
+        """Test that a copy of a converted raw is served from the cache."""
+        for folder in ("card", "backup"):
+            (tmp_path / folder).mkdir()
+            write_synthetic_raw(tmp_path / folder / "frame.nef", width=300, height=200)
+        converter = NEFConverter(cache_dir=tmp_path / "cache", cache_link="copy")
+
+        first = converter._convert(tmp_path / "card/frame.nef", tmp_path / "a.jpg")
+        second = converter._convert(tmp_path / "backup/frame.nef", tmp_path / "b.jpg")
+
+        assert "cached" not in first
+        assert second["cached"] is True
+        assert "decode" not in second["stages"]
+        assert (tmp_path / "a.jpg").read_bytes() == (tmp_path / "b.jpg").read_bytes()
+
+    def test_cache_entry_survives_reconversion(self, tmp_path):
+        """Test that rewriting a hardlinked output leaves the cache intact."""
+        source = write_synthetic_raw(tmp_path / "frame.nef", width=300, height=200)
+        output = tmp_path / "frame.jpg"
+        NEFConverter(cache_dir=tmp_path / "cache", cache_link="hardlink")._convert(
+            source, output
+        )
+        cached = output.read_bytes()
+
+        NEFConverter(quality=50)._convert(source, output)
+        NEFConverter(cache_dir=tmp_path / "cache")._convert(
+            source, tmp_path / "again.jpg"
+        )
+
+        assert output.read_bytes() != cached
+        assert (tmp_path / "again.jpg").read_bytes() == cached
+
+    def test_convert_bytes_in_memory(self, tmp_path):
+        """Test bytes and stream input with stream output."""
+        data = make_synthetic_raw(300, 200)
+        renditions = [Rendition(), Rendition(max_size=100, suffix="_t")]
+        converter = NEFConverter(renditions=renditions)
+
+        full, thumb = converter.convert_bytes(bytearray(data))
+        output = io.BytesIO()
+        file_stats = converter.convert_stream(io.BytesIO(data), output, rendition=1)
+
+        with Image.open(io.BytesIO(full)) as img:
+            assert img.size == (300, 200)
+            assert img.getexif()[0x010F] == "NIKON CORPORATION"
+        assert output.getvalue() == thumb
+        assert file_stats["bytes_read"] == len(data)
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.parametrize("mode", ["full", "preview"])
+    def test_adjustments_are_applied_before_encoding(self, mode):
+        """Test the adjustment stage in the decode and preview paths."""
+        data = make_synthetic_raw(300, 200)
+        plain = NEFConverter(mode=mode)
+        adjusted = NEFConverter(
+            mode=mode, adjustments=Adjustments(downscale=2, exposure=1.0)
+        )
+
+        with Image.open(io.BytesIO(plain.convert_bytes(data)[0])) as img:
+            plain_mean = np.asarray(img).mean()
+        with Image.open(io.BytesIO(adjusted.convert_bytes(data)[0])) as img:
+            assert img.size == (150, 100)
+            assert np.asarray(img).mean() > plain_mean * 1.3
+        assert adjusted.settings()["adjustments"]["downscale"] == 2
+
+    def test_adjustments_keep_16_bit_renditions(self):
+        """Test that 16-bit TIFFs are adjusted at 16 bits."""
+        converter = NEFConverter(
+            renditions=[Rendition(format="TIFF"), Rendition(suffix="_web")],
+            adjustments=Adjustments(downscale=2, dither=True),
+        )
+
+        tiff, jpeg = converter.convert_bytes(make_synthetic_raw(300, 200))
+
+        with Image.open(io.BytesIO(tiff)) as img:
+            assert (img.size, img.mode) == ((150, 100), "I;16")
+        with Image.open(io.BytesIO(jpeg)) as img:
+            assert img.size == (150, 100)
+
+    @pytest.mark.parametrize("parallel", [True, False])
+    def test_iter_convert_bytes_keeps_order(self, parallel):
+        """Test that batched results follow the input order."""
+        sources = [make_synthetic_raw(200 + 20 * i, 100, seed=i) for i in range(4)]
+        sources.insert(2, b"not a raw file")
+        converter = NEFConverter(executor="thread", max_workers=2, max_in_flight=2)
+
+        results = list(converter.iter_convert_bytes(iter(sources), parallel))
+
+        assert [success for success, _, _ in results] == [True, True, False, True, True]
+        assert "error" in results[2][2]
+        widths = []
+        for success, (jpeg,), _ in (r for r in results if r[0]):
+            with Image.open(io.BytesIO(jpeg)) as img:
+                widths.append(img.size[0])
+        assert widths == [200, 220, 240, 260]
@@ -0,0 +1,160 @@
+"""
+Tests for duplicate and burst detection
+
+Covers fingerprints, the fingerprint index and file selection.
+"""
+
+import shutil
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from src.nef_converter.dedupe import (
+    Fingerprint,
+    FingerprintIndex,
+    fingerprint,
+    select_files,
+)
+from src.nef_converter.exif import EXIF_HEADER, build_exif
+from src.nef_converter.synthetic import write_synthetic_raw
+
+# 2024-06-01 12:00:00 UTC
+CAPTURED = 1717243200.0
+
+
+def _nikon_raw(path, serial="3012345", shutter_count=48213):
+    """Write a TIFF with a capture time and a Nikon type 2 maker note."""
+    maker_note = (
+        b"Nikon\x00\x02\x10\x00\x00"
+        + build_exif(
+            ">",
+            {
+                0x001D: (2, len(serial) + 1, serial.encode() + b"\x00"),
+                0x00A7: (4, 1, struct.pack(">I", shutter_count)),
+            },
+        )[len(EXIF_HEADER) :]
+    )
+    tiff = build_exif(
+        "<",
+        {0x010F: (2, 6, b"NIKON\x00")},
+        exif={
+            0x9003: (2, 20, b"2024:06:01 12:00:00\x00"),
+            0x9291: (2, 3, b"25\x00"),
+            0x927C: (7, len(maker_note), maker_note),
+        },
+    )[len(EXIF_HEADER) :]
+    path.write_bytes(tiff)
+    return path
+
+
+class _FakeIndex:
+    """Index returning preset fingerprints and hashes."""
+
+    def __init__(self, prints, hashes):
+        self.prints = prints
+        self.hashes = hashes
+        self.hashed = []
+
+    def get(self, path):
+        return self.prints[path.name], None
+
+    def sha256(self, path, known):
+        self.hashed.append(path.name)
+        return self.hashes[path.name]
+
+
+class TestFingerprint:
+    """Test cases for fingerprint()."""
+
+    def test_synthetic_raw(self, tmp_path):
+        """Test capture time and thumbnail hash, equal for a copy."""
+        source = write_synthetic_raw(tmp_path / "a.nef", width=300, height=200)
+        copy = shutil.copy(source, tmp_path / "b.nef")
+
+        first = fingerprint(source)
+
+        assert first.size == source.stat().st_size
+        assert first.captured == CAPTURED
+        assert first.dhash is not None and first.sharpness > 0
+        assert fingerprint(copy) == first
+
+    def test_nikon_maker_note(self, tmp_path):
+        """Test serial number, shutter count and sub-second capture time."""
+        print_ = fingerprint(_nikon_raw(tmp_path / "a.nef"))
+
+        assert print_.serial == "3012345"
+        assert print_.shutter_count == 48213
+        assert print_.captured == CAPTURED + 0.25
+        assert print_.dhash is None
+
+    def test_rejects_non_tiff_files(self, tmp_path):
+        """Test that other files raise ValueError."""
+        (tmp_path / "a.nef").write_bytes(b"not a raw file")
+        with pytest.raises(ValueError):
+            fingerprint(tmp_path / "a.nef")
+
+
+class TestFingerprintIndex:
+    """Test cases for the FingerprintIndex class."""
+
+    def test_reuses_rows_until_file_changes(self, tmp_path):
+        """Test that a saved fingerprint is reused while the file is unchanged."""
+        source = write_synthetic_raw(tmp_path / "a.nef", width=300, height=200)
+        index = FingerprintIndex(tmp_path / "index.sqlite")
+        first, _ = index.get(source)
+        digest = index.sha256(source, None)
+        index.close()
+
+        index = FingerprintIndex(tmp_path / "index.sqlite")
+        with patch("src.nef_converter.dedupe.fingerprint") as compute:
+            assert index.get(source) == (first, digest)
+            compute.assert_not_called()
+
+        source.write_bytes(source.read_bytes() + b"\x00")
+        assert index.get(source)[0].size == first.size + 1
+        index.close()
+
+
+class TestSelectFiles:
+    """Test cases for select_files()."""
+
+    def test_duplicates_are_confirmed_by_hash(self, tmp_path):
+        """Test that only files with equal content are dropped."""
+        same = Fingerprint(100, CAPTURED, "1", 10, 0xFF)
+        prints = {"a.nef": same, "b.nef": same, "c.nef": same}
+        prints["d.nef"] = Fingerprint(200, CAPTURED, "1", 11, 0xFF)
+        hashes = {"a.nef": "x", "b.nef": "x", "c.nef": "y"}
+        files = [tmp_path / name for name in sorted(prints)]
+        index = _FakeIndex(prints, hashes)
+
+        selected, counts = select_files(files, "duplicates", index)
+
+        assert [path.name for path in selected] == ["a.nef", "c.nef", "d.nef"]
+        assert counts == {"duplicates": 1, "burst_frames": 0}
+        assert "d.nef" not in index.hashed
+
+    def test_bursts_keep_sharpest_frame(self, tmp_path):
+        """Test that close, similar frames of one camera form a burst."""
+        prints = {
+            "1.nef": Fingerprint(1, CAPTURED, "A", 1, 0b0000, sharpness=2.0),
+            "2.nef": Fingerprint(2, CAPTURED + 0.1, "A", 2, 0b0011, sharpness=5.0),
+            "3.nef": Fingerprint(3, CAPTURED + 0.2, "A", 3, 0b0111, sharpness=4.0),
+            # Too late, from another camera, or a different scene
+            "4.nef": Fingerprint(4, CAPTURED + 5.0, "A", 4, 0b0111),
+            "5.nef": Fingerprint(5, CAPTURED + 0.15, "B", 1, 0b0011),
+            "6.nef": Fingerprint(6, CAPTURED + 5.1, "A", 5, 2**64 - 1),
+        }
+        files = [tmp_path / name for name in sorted(prints)]
+
+        off, _ = select_files(files, "off", _FakeIndex(prints, {}))
+        selected, counts = select_files(files, "bursts", _FakeIndex(prints, {}))
+
+        assert off == files
+        assert [path.name for path in selected] == ["2.nef", "4.nef", "5.nef", "6.nef"]
+        assert counts == {"duplicates": 0, "burst_frames": 2}
+
+    def test_rejects_unknown_mode(self, tmp_path):
+        """Test that an unknown mode raises ValueError."""
+        with pytest.raises(ValueError):
+            select_files([], "similar", _FakeIndex({}, {}))
@@ -0,0 +1,270 @@
+"""
+Tests for distributed conversion
+
+Runs a coordinator and several workers on localhost.
+"""
+
+import json
+import socket
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from src.nef_converter import distributed
+from src.nef_converter.converter import NEFConverter
+from src.nef_converter.distributed import Coordinator, Worker
+from src.nef_converter.synthetic import write_synthetic_raw
+
+
+def _write_raws(directory, count):
+    """Write small synthetic raws."""
+    for i in range(count):
+        write_synthetic_raw(directory / f"frame{i}.nef", width=160, height=120, seed=i)
+
+
+def _start_worker(coordinator, name, results, token=None, **kwargs):
+    """Run a worker on a thread, storing its counts or error in results."""
+    converter = NEFConverter(executor="thread", **kwargs)
+    worker = Worker(
+        converter, "127.0.0.1", coordinator.port, name=name, slots=2, token=token
+    )
+
+    def run():
+        try:
+            results[name] = worker.run(connect_timeout=5)
+        except (ConnectionError, ValueError) as e:
+            results[name] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _take_tasks(coordinator, count):
+    """Join as a worker, wait for count tasks, then vanish without results."""
+    sock = socket.create_connection(("127.0.0.1", coordinator.port))
+    hello = {
+        "type": "hello",
+        "name": "flaky",
+        "slots": 1,
+        "settings": coordinator.converter.settings(),
+    }
+    sock.sendall(json.dumps(hello).encode() + b"\n")
+    tasks = []
+    with sock.makefile("rb") as reader:
+        while len(tasks) < count:
+            message = json.loads(reader.readline())
+            if message["type"] == "task":
+                tasks.append(message)
+    return sock, tasks
+
+
+@patch.object(NEFConverter, "_open_directory")
+class TestDistributedBatch:
+    """Test cases for convert_batch() with a coordinator."""
+
+    def test_workers_share_a_batch(self, _open, tmp_path):
+        """Test that two workers convert every file of a batch."""
+        _write_raws(tmp_path, 6)
+        output = tmp_path / "out"
+        converter = NEFConverter(executor="thread")
+        results = {}
+
+        with Coordinator(converter, port=0) as coordinator:
+            threads = [_start_worker(coordinator, name, results) for name in ("a", "b")]
+            successful, total, stats = converter.convert_batch(
+                str(tmp_path), output_directory=str(output), coordinator=coordinator
+            )
+        for thread in threads:
+            thread.join(5)
+
+        assert (successful, total) == (6, 6)
+        assert stats["remote_workers"] == 2
+        assert stats["requeued"] == 0
+        assert sum(w.converted for w in coordinator.workers.values()) == 6
+        assert sum(counts["converted"] for counts in results.values()) == 6
+        for i in range(6):
+            with Image.open(output / f"frame{i}.jpg") as img:
+                assert img.size == (160, 120)
+        assert not (output / ".nef_checkpoint.jsonl").exists()
+
+    def test_tasks_of_lost_workers_are_requeued(self, _open, tmp_path):
+        """Test that a worker's tasks go to another when it disconnects."""
+        _write_raws(tmp_path, 3)
+        converter = NEFConverter(executor="thread")
+        results = {}
+
+        with Coordinator(converter, port=0) as coordinator:
+
+            def flaky_then_healthy():
+                sock, _ = _take_tasks(coordinator, 2)
+                sock.close()
+                _start_worker(coordinator, "healthy", results).join(10)
+
+            helper = threading.Thread(target=flaky_then_healthy, daemon=True)
+            helper.start()
+            successful, total, stats = converter.convert_batch(
+                str(tmp_path),
+                output_directory=str(tmp_path / "out"),
+                coordinator=coordinator,
+            )
+        helper.join(5)
+
+        assert (successful, total) == (3, 3)
+        assert stats["requeued"] == 2
+        assert coordinator.workers["flaky"].requeued == 2
+        assert coordinator.workers["healthy"].converted == 3
+
+    def test_incremental_workers_hash_sources(self, _open, tmp_path):
+        """Test that workers report hashes the coordinator's manifest needs."""
+        _write_raws(tmp_path, 2)
+        converter = NEFConverter(executor="thread", incremental=True)
+        results = {}
+
+        with Coordinator(converter, port=0) as coordinator:
+            _start_worker(coordinator, "a", results)
+            successful, total, _ = converter.convert_batch(
+                str(tmp_path), coordinator=coordinator
+            )
+
+        assert (successful, total) == (2, 2)
+        manifest = json.loads((tmp_path / "export" / ".nef_manifest.json").read_text())
+        assert all(entry["sha256"] for entry in manifest["files"].values())
+
+    def test_malformed_results_fail_their_files(self, _open, tmp_path):
+        """Test that a bad result payload fails one file, not the batch."""
+        _write_raws(tmp_path, 3)
+        converter = NEFConverter(executor="thread")
+        payloads = [
+            {"success": True, "stats": {"seconds": 0.1}},
+            {"success": True, "stats": {"bytes_read": "x", "seconds": 0.1}},
+            {"success": True, "stats": ["not", "a", "dict"]},
+        ]
+
+        def hostile_worker():
+            # Answers each task as it arrives, one slot at a time
+            sock, _ = _take_tasks(coordinator, 0)
+            with sock, sock.makefile("rb") as reader:
+                while payloads:
+                    message = json.loads(reader.readline())
+                    if message["type"] == "task":
+                        result = {"type": "result", "id": message["id"]}
+                        result.update(payloads.pop(0))
+                        sock.sendall(json.dumps(result).encode() + b"\n")
+                reader.readline()  # "done"
+
+        with Coordinator(converter, port=0) as coordinator:
+            helper = threading.Thread(target=hostile_worker, daemon=True)
+            helper.start()
+            successful, total, _ = converter.convert_batch(
+                str(tmp_path), coordinator=coordinator
+            )
+            helper.join(5)
+
+        assert (successful, total) == (0, 3)
+        assert coordinator.workers["flaky"].failed == 3
+
+
+class TestCoordinator:
+    """Test cases for the Coordinator class."""
+
+    def test_rejects_workers_with_other_settings(self):
+        """Test that a worker converting differently is turned away."""
+        results = {}
+        with Coordinator(NEFConverter(quality=90), port=0) as coordinator:
+            _start_worker(coordinator, "odd", results, quality=80).join(5)
+
+        assert isinstance(results["odd"], ValueError)
+        assert "quality" in str(results["odd"])
+        assert coordinator.workers == {}
+
+    def test_rejects_workers_without_the_token(self):
+        """Test that only workers presenting the shared token may join."""
+        results = {}
+        with Coordinator(NEFConverter(), port=0, token="s3cret") as coordinator:
+            _start_worker(coordinator, "anonymous", results).join(5)
+            _start_worker(coordinator, "guess", results, token="secret").join(5)
+            _start_worker(coordinator, "member", results, token="s3cret")
+            for _ in range(50):
+                if "member" in coordinator.workers:
+                    break
+                threading.Event().wait(0.05)
+
+        assert isinstance(results["anonymous"], ValueError)
+        assert "Invalid token" in str(results["guess"])
+        assert list(coordinator.workers) == ["member"]
+
+    def test_requires_a_token_beyond_loopback(self):
+        """Test that other interfaces are not served without a token."""
+        coordinator = Coordinator(NEFConverter(), "0.0.0.0", port=0)
+        with pytest.raises(ValueError, match="token"):
+            coordinator.start()
+
+    def test_silent_workers_are_dropped(self, tmp_path):
+        """Test the heartbeat timeout, and failing a task lost too often."""
+        source = tmp_path / "frame.nef"
+        coordinator = Coordinator(NEFConverter(), port=0)
+
+        def silent_workers():
+            for _ in range(distributed.MAX_ATTEMPTS):
+                sock, tasks = _take_tasks(coordinator, 1)
+                assert tasks[0]["source"] == "frame.nef"
+                # Dropped by the coordinator after the heartbeat timeout
+                assert sock.recv(1) == b""
+                sock.close()
+
+        with patch.object(distributed, "HEARTBEAT_TIMEOUT", 0.2), coordinator:
+            helper = threading.Thread(target=silent_workers, daemon=True)
+            helper.start()
+            task = (None, source, tmp_path / "out" / "frame.jpg")
+            results = list(coordinator.run([task], tmp_path, tmp_path / "out"))
+            helper.join(5)
+
+        assert results == [
+            (False, source, {"error": f"Worker lost {distributed.MAX_ATTEMPTS} times"})
+        ]
+        assert coordinator.requeued == distributed.MAX_ATTEMPTS - 1
+
+
+class TestWorker:
+    """Test cases for the Worker class."""
+
+    def test_gives_up_without_coordinator(self):
+        """Test that an unreachable coordinator raises ConnectionError."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        worker = Worker(NEFConverter(), "127.0.0.1", port)
+        with patch.object(distributed, "CONNECT_RETRY_INTERVAL", 0.01):
+            with pytest.raises(ConnectionError):
+                worker.run(connect_timeout=0.05)
+
+    def test_refuses_task_paths_outside_its_roots(self, tmp_path):
+        """Test that tasks cannot read or write outside the mounted roots."""
+        (tmp_path / "in").mkdir()
+        (tmp_path / "in" / "escape").symlink_to(tmp_path)
+        worker = Worker(NEFConverter(), "127.0.0.1")
+        worker._roots = (tmp_path / "in", tmp_path / "out")
+        sent = []
+        executor = MagicMock()
+
+        with patch.object(worker, "_send", sent.append):
+            for source, output in (
+                ("../secret.nef", "a.jpg"),
+                ("/etc/passwd", "a.jpg"),
+                ("escape/secret.nef", "a.jpg"),
+                ("a.nef", "../../evil.jpg"),
+                ("a.nef", "/tmp/evil.jpg"),
+            ):
+                worker._start(
+                    executor,
+                    {"type": "task", "id": 1, "source": source, "output": output},
+                )
+
+        executor.submit.assert_not_called()
+        assert [message["success"] for message in sent] == [False] * 5
+        assert all("outside" in message["stats"]["error"] for message in sent)
+        assert worker.counts == {"converted": 0, "failed": 5}
+        assert not (tmp_path / "evil.jpg").exists()
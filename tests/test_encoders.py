@@ -0,0 +1,118 @@
+"""
+Tests for output encoders
+
+Covers per-format encoding, option handling and the encoder registry.
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.nef_converter.encoders import (
+    ENCODERS,
+    Encoder,
+    get_encoder,
+    register_encoder,
+)
+
+
+@pytest.fixture
+def image():
+    """Small RGB gradient image."""
+    y, x = np.mgrid[0:48, 0:64]
+    rgb = np.stack([x * 4, y * 5, (x + y) * 2], axis=-1).astype(np.uint8)
+    return Image.fromarray(rgb)
+
+
+class TestEncoders:
+    """Test cases for the output encoders."""
+
+    @pytest.mark.parametrize("name", sorted(ENCODERS))
+    def test_encodes_readable_file(self, name, image):
+        """Test that every registered format round-trips through Pillow."""
+        encoder = get_encoder(name)
+        options = encoder.options({"bits": 8} if name == "TIFF" else None)
+
+        data = encoder.encode(image, 90, options)
+
+        with Image.open(io.BytesIO(data)) as decoded:
+            assert decoded.format == name
+            assert decoded.size == image.size
+
+    def test_jpeg_options_reach_the_encoder(self, image):
+        """Test progressive mode and chroma subsampling options."""
+        encoder = get_encoder("jpeg")
+        options = encoder.options({"progressive": True, "subsampling": "4:4:4"})
+
+        data = encoder.encode(image, 90, options)
+
+        with Image.open(io.BytesIO(data)) as decoded:
+            assert decoded.info.get("progressive")
+            assert decoded.layer[0][1:3] == (1, 1)
+
+    def test_exif_is_embedded(self, image):
+        """Test that EXIF data is written into the output."""
+        exif = Image.Exif()
+        exif[0x010F] = "NIKON CORPORATION"
+        encoder = get_encoder("WEBP")
+
+        data = encoder.encode(image, 90, encoder.options(), exif.tobytes())
+
+        with Image.open(io.BytesIO(data)) as decoded:
+            assert decoded.getexif()[0x010F] == "NIKON CORPORATION"
+
+    def test_tiff_keeps_16_bit_arrays(self):
+        """Test that 16-bit TIFF output is written from the array itself."""
+        encoder = get_encoder("TIFF")
+        rgb16 = np.full((8, 10, 3), 0x1234, dtype=np.uint16)
+
+        data = encoder.encode(rgb16, 95, encoder.options())
+
+        assert encoder.bit_depth(encoder.options()) == 16
+        with Image.open(io.BytesIO(data)) as decoded:
+            assert decoded.tag_v2[0x0102] == (16, 16, 16)
+
+    def test_unknown_option_is_rejected(self):
+        """Test that options are checked against the encoder's defaults."""
+        with pytest.raises(ValueError, match="Unknown PNG option"):
+            get_encoder("PNG").options({"method": 6})
+
+    def test_unknown_format_is_rejected(self):
+        """Test the error for formats without an encoder."""
+        with pytest.raises(ValueError, match="Unsupported output format"):
+            get_encoder("BMP")
+
+    def test_jpg_is_an_alias_for_jpeg(self):
+        """Test that format aliases resolve to their encoder."""
+        assert get_encoder("jpg") is get_encoder("JPEG")
+        assert "JPG" not in ENCODERS
+
+    def test_encoders_must_implement_encode(self):
+        """Test that Encoder is abstract until encode() is implemented."""
+
+        class Incomplete(Encoder):
+            name = "NONE"
+
+        with pytest.raises(TypeError):
+            Encoder()
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_register_encoder(self, image):
+        """Test that registered encoders become available by name."""
+
+        class RawEncoder(Encoder):
+            name = "RAWRGB"
+            extension = ".rgb"
+
+            def encode(self, pixels, quality, options, exif_data=None):
+                return pixels.tobytes()
+
+        register_encoder(RawEncoder())
+        try:
+            encoder = get_encoder("rawrgb")
+            assert encoder.encode(image, 90, encoder.options()) == image.tobytes()
+        finally:
+            del ENCODERS["RAWRGB"]
@@ -0,0 +1,92 @@
+"""
+Tests for execution backends
+
+Covers the thread/process choice and pool creation.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.nef_converter import executors
+from src.nef_converter.converter import NEFConverter
+from src.nef_converter.executors import create_executor, resolve_executor
+
+
+class TestExecutors:
+    """Test cases for executor selection."""
+
+    def test_explicit_kinds_are_kept(self):
+        """Test that thread and process are used as given."""
+        assert resolve_executor("thread") == "thread"
+        assert resolve_executor("process") == "process"
+
+    def test_process_pool_is_the_default(self):
+        """Test that the default backend needs no probe; auto is opt-in."""
+        from src.nef_converter.cli import create_parser
+
+        with patch.object(executors, "measure_gil_release") as probe:
+            assert NEFConverter().executor == "process"
+            assert create_parser().parse_args([]).executor == "process"
+            assert resolve_executor(NEFConverter().executor) == "process"
+        probe.assert_not_called()
+
+    def test_unknown_kind_is_rejected(self):
+        """Test that unknown executors raise."""
+        with pytest.raises(ValueError, match="Unknown executor"):
+            resolve_executor("fiber")
+        with pytest.raises(ValueError, match="Unknown executor"):
+            NEFConverter(executor="fiber")
+
+    def test_auto_uses_threads_on_single_cpu(self):
+        """Test that one CPU picks threads without probing."""
+        with (
+            patch("src.nef_converter.executors.os.cpu_count", return_value=1),
+            patch.object(executors, "measure_gil_release") as probe,
+        ):
+            assert resolve_executor("auto") == "thread"
+        probe.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "decode, encode, expected",
+        [(0.95, 0.9, "thread"), (0.95, 0.5, "process"), (0.5, 0.95, "process")],
+    )
+    def test_auto_follows_measured_efficiency(self, decode, encode, expected):
+        """Test that threads need both stages to scale."""
+        with (
+            patch("src.nef_converter.executors.os.cpu_count", return_value=8),
+            patch.object(
+                executors,
+                "measure_gil_release",
+                return_value={"decode": decode, "encode": encode},
+            ),
+        ):
+            assert resolve_executor("auto") == expected
+
+    def test_create_executor_types(self):
+        """Test that the pool type follows the resolved kind."""
+        with create_executor("thread", 2) as pool:
+            assert isinstance(pool, ThreadPoolExecutor)
+        with create_executor("process", 1) as pool:
+            assert isinstance(pool, ProcessPoolExecutor)
+
+    def test_parallel_efficiency_is_bounded(self):
+        """Test the efficiency measurement on trivial work."""
+        efficiency = executors._parallel_efficiency(lambda: sum(range(1000)), 2)
+
+        assert 0 < efficiency
+
+    def test_worker_warm_up(self):
+        """Test that warming a worker imports and runs the pipeline."""
+        with patch.object(executors.logger, "debug") as debug:
+            executors.warm_worker()
+
+        debug.assert_not_called()
+
+    def test_process_pool_is_warmed(self):
+        """Test that process pools start workers with warm_worker()."""
+        with patch("src.nef_converter.executors.ProcessPoolExecutor") as pool:
+            create_executor("process", 2)
+
+        pool.assert_called_once_with(max_workers=2, initializer=executors.warm_worker)
@@ -0,0 +1,120 @@
+"""
+Tests for EXIF passthrough
+
+Covers reading raw EXIF structures, the maker note and sub-IFDs, the
+thumbnail policy and the APP1 size limit.
+"""
+
+import io
+import struct
+
+import pytest
+from PIL import Image
+
+from src.nef_converter.encoders import get_encoder
+from src.nef_converter.exif import (
+    EXIF_HEADER,
+    EXIF_IFD,
+    GPS_IFD,
+    MAKER_NOTE,
+    build_exif,
+    read_exif,
+    reset_orientation,
+)
+from src.nef_converter.synthetic import make_synthetic_raw
+
+# Nikon maker notes carry their own TIFF header, so they survive relocation
+MAKER_NOTE_DATA = b"Nikon\x00\x02\x10\x00\x00MM\x00*\x00\x00\x00\x08" + bytes(40)
+
+
+def _big_endian_raw(maker_note=MAKER_NOTE_DATA):
+    """Build a big-endian TIFF like a NEF, with Exif, GPS and Interop IFDs."""
+
+    def entry(field_type, fmt, *values):
+        return (field_type, len(values), struct.pack(f">{len(values)}{fmt}", *values))
+
+    primary = {
+        0x010F: (2, 18, b"NIKON CORPORATION\x00"),
+        0x0112: entry(3, "H", 6),
+        0x0100: entry(4, "I", 6000),  # ImageWidth is not carried over
+    }
+    exif = {
+        0x829A: entry(5, "I", 1, 250),
+        0x9003: (2, 20, b"2024:06:01 12:00:00\x00"),
+        MAKER_NOTE: (7, len(maker_note), maker_note),
+    }
+    gps = {0x0000: (1, 4, bytes([2, 3, 0, 0])), 0x0001: (2, 2, b"N\x00")}
+    interop = {0x0001: (2, 4, b"R98\x00")}
+    return build_exif(">", primary, exif, gps, interop)[len(EXIF_HEADER) :]
+
+
+class TestReadExif:
+    """Test cases for read_exif()."""
+
+    def test_round_trip_keeps_sub_ifds_and_maker_note(self):
+        """Test that Pillow sees the copied tags in an encoded JPEG."""
+        exif_data = read_exif(_big_endian_raw())
+        assert exif_data[:8] == EXIF_HEADER + b"MM"
+
+        image = Image.new("RGB", (32, 24))
+        encoder = get_encoder("JPEG")
+        jpeg = encoder.encode(image, 90, encoder.options(), exif_data)
+
+        with Image.open(io.BytesIO(jpeg)) as img:
+            exif = img.getexif()
+            assert exif[0x010F] == "NIKON CORPORATION"
+            assert exif[0x0112] == 6
+            assert 0x0100 not in exif
+            assert exif.get_ifd(EXIF_IFD)[MAKER_NOTE] == MAKER_NOTE_DATA
+            assert exif.get_ifd(EXIF_IFD)[0x9003] == "2024:06:01 12:00:00"
+            assert exif.get_ifd(GPS_IFD)[0x0001] == "N"
+
+    def test_reset_orientation(self):
+        """Test that only the Orientation value changes."""
+        exif_data = read_exif(_big_endian_raw())
+
+        upright = reset_orientation(exif_data)
+
+        assert len(upright) == len(exif_data)
+        with Image.open(io.BytesIO(_jpeg_with(upright))) as img:
+            exif = img.getexif()
+            assert exif[0x0112] == 1
+            assert exif.get_ifd(EXIF_IFD)[MAKER_NOTE] == MAKER_NOTE_DATA
+
+    def test_thumbnail_policy(self):
+        """Test that "keep" embeds the raw's RGB thumbnail as a JPEG."""
+        raw = make_synthetic_raw(300, 200)
+        assert read_exif(raw) is not None
+
+        exif_data = read_exif(raw, thumbnail="keep")
+        thumbnail = exif_data[exif_data.index(b"\xff\xd8") :]
+        with Image.open(io.BytesIO(thumbnail)) as thumb:
+            assert thumb.format == "JPEG"
+            assert thumb.size == (160, 107)
+        assert len(exif_data) > len(read_exif(raw))
+
+    def test_oversized_maker_note_is_dropped(self):
+        """Test that metadata is trimmed to fit one APP1 segment."""
+        exif_data = read_exif(_big_endian_raw(maker_note=bytes(70000)))
+
+        assert len(exif_data) < 0xFFFF
+        with Image.open(io.BytesIO(_jpeg_with(exif_data))) as img:
+            exif = img.getexif()
+            assert MAKER_NOTE not in exif.get_ifd(EXIF_IFD)
+            assert exif.get_ifd(EXIF_IFD)[0x9003] == "2024:06:01 12:00:00"
+
+    def test_rejects_non_tiff_data(self):
+        """Test that files that are not TIFF-based raise ValueError."""
+        with pytest.raises(ValueError):
+            read_exif(b"\x00\x00\x00\x0cftypcrx ")
+        with pytest.raises(ValueError):
+            read_exif(b"II*\x00\xff\xff\xff\x00")
+        with pytest.raises(ValueError):
+            read_exif(_big_endian_raw(), thumbnail="large")
+
+
+def _jpeg_with(exif_data):
+    """Encode a small JPEG carrying exif_data."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(buffer, "JPEG", exif=exif_data)
+    return buffer.getvalue()
@@ -0,0 +1,62 @@
+"""
+Tests for the conversion manifest
+
+Covers skip decisions for incremental batch runs.
+"""
+
+import os
+
+from src.nef_converter.manifest import ConversionManifest, file_sha256
+
+SETTINGS = {"quality": 95, "mode": "full"}
+
+
+def _recorded_manifest(tmp_path, source):
+    """Build a saved manifest recording one converted source."""
+    (tmp_path / "a.jpg").write_bytes(b"jpeg")
+    manifest = ConversionManifest(tmp_path / "manifest.json")
+    manifest.record("a.nef", source.stat(), file_sha256(source), SETTINGS, ["a.jpg"])
+    manifest.save()
+    return ConversionManifest.load(tmp_path / "manifest.json")
+
+
+class TestConversionManifest:
+    """Test cases for the ConversionManifest class."""
+
+    def test_unchanged_source_is_current(self, tmp_path):
+        """Test that a recorded, unchanged source is skipped."""
+        source = tmp_path / "a.nef"
+        source.write_bytes(b"raw data")
+        manifest = _recorded_manifest(tmp_path, source)
+
+        assert manifest.is_current("a.nef", source, SETTINGS)
+        assert not manifest.is_current("a.nef", source, {**SETTINGS, "quality": 80})
+
+    def test_touched_source_is_verified_by_hash(self, tmp_path):
+        """Test that an mtime change alone does not force reconversion."""
+        source = tmp_path / "a.nef"
+        source.write_bytes(b"raw data")
+        manifest = _recorded_manifest(tmp_path, source)
+
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert manifest.is_current("a.nef", source, SETTINGS)
+
+        source.write_bytes(b"new data")
+        assert not manifest.is_current("a.nef", source, SETTINGS)
+
+    def test_missing_output_is_not_current(self, tmp_path):
+        """Test that deleting an output forces reconversion."""
+        source = tmp_path / "a.nef"
+        source.write_bytes(b"raw data")
+        manifest = _recorded_manifest(tmp_path, source)
+
+        (tmp_path / "a.jpg").unlink()
+        assert not manifest.is_current("a.nef", source, SETTINGS)
+
+    def test_unreadable_manifest_starts_empty(self, tmp_path):
+        """Test that a corrupt manifest is ignored rather than fatal."""
+        path = tmp_path / "manifest.json"
+        path.write_text("{not json")
+
+        assert ConversionManifest.load(path).entries == {}
@@ -0,0 +1,39 @@
+"""
+Tests for output renditions
+
+Covers rendition validation, naming and size fitting.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from src.nef_converter.renditions import Rendition, fit_size
+
+
+class TestRendition:
+    """Test cases for the Rendition class."""
+
+    def test_path_for_adds_suffix_and_extension(self):
+        """Test that renditions are named after the primary output."""
+        output = Path("out/day1/DSC_0001.jpg")
+
+        assert Rendition().path_for(output) == output
+        assert Rendition(400, suffix="_thumb", format="WEBP").path_for(output) == Path(
+            "out/day1/DSC_0001_thumb.webp"
+        )
+
+    @pytest.mark.parametrize(
+        "kwargs", [{"format": "BMP"}, {"max_size": 0}, {"quality": 101}]
+    )
+    def test_invalid_rendition_is_rejected(self, kwargs):
+        """Test validation of format, size and quality."""
+        with pytest.raises(ValueError):
+            Rendition(**kwargs)
+
+    def test_fit_size_keeps_aspect_ratio(self):
+        """Test downscaling to a long edge without upscaling."""
+        assert fit_size((6000, 4000), 2048) == (2048, 1365)
+        assert fit_size((4000, 6000), 400) == (267, 400)
+        assert fit_size((300, 200), 2048) == (300, 200)
+        assert fit_size((300, 200), None) == (300, 200)
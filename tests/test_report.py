@@ -0,0 +1,89 @@
+"""
+Tests for run reports
+
+Covers stage timing and the aggregation of per-file statistics.
+"""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from src.nef_converter.report import RunReport, StageTimer, _percentile, tail_idle
+
+
+class TestRunReport:
+    """Test cases for the RunReport class."""
+
+    def test_percentile_uses_nearest_rank(self):
+        """Test nearest-rank percentiles on unsorted samples."""
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+
+        assert _percentile(values, 50) == 3.0
+        assert _percentile(values, 95) == 5.0
+        assert _percentile([], 50) == 0.0
+
+    def test_stage_timer_charges_laps(self):
+        """Test that laps accumulate per stage."""
+        timer = StageTimer()
+        timer.lap("read")
+        timer.lap("decode")
+        timer.lap("read")
+
+        assert list(timer.stages) == ["read", "decode"]
+        assert sum(timer.stages.values()) == pytest.approx(timer.total, abs=0.01)
+
+    def test_tail_idle_counts_workers_left_without_files(self):
+        """Test the tail of a batch on four workers."""
+        completions = [1.0, 2.0, 3.0, 7.0, 8.0, 9.0, 10.0]
+
+        # The last four completions each leave a worker idle until 10.0
+        assert tail_idle(completions, 4) == (3.0, 3.0 + 2.0 + 1.0)
+        assert tail_idle(completions, 1) == (0.0, 0.0)
+        assert tail_idle([], 4) == (0.0, 0.0)
+
+    def test_report_aggregates_stages(self, tmp_path):
+        """Test per-stage percentiles, byte totals and the JSON output."""
+        report = RunReport({"quality": 95})
+        for index in range(1, 11):
+            report.add(
+                Path(f"{index}.nef"),
+                {
+                    "bytes_read": 100,
+                    "bytes_written": 10,
+                    "seconds": index * 0.3,
+                    "stages": {"decode": index * 0.2, "encode": index * 0.1},
+                },
+            )
+        report.add_failure()
+        report.wall_seconds = 2.0
+        report.write(tmp_path / "report.json")
+
+        data = json.loads((tmp_path / "report.json").read_text())
+        assert data["files"] == {
+            "total": 11,
+            "converted": 10,
+            "failed": 1,
+            "skipped": 0,
+        }
+        assert data["bytes"]["read"] == 1000
+        assert data["bytes"]["written"] == 100
+        assert data["files_per_second"] == 5.0
+        assert data["stages"]["decode"]["p50"] == pytest.approx(1.0)
+        assert data["stages"]["decode"]["p95"] == pytest.approx(2.0)
+        assert data["stages"]["decode"]["share"] == pytest.approx(2 / 3)
+        assert "read" not in data["stages"]
+        assert data["slowest"][0] == {"path": "10.nef", "seconds": 3.0}
+
+    def test_first_file_time_is_measured_from_start(self):
+        """Test that the first added file fixes first_file_seconds."""
+        report = RunReport(started=time.perf_counter() - 5.0)
+        assert report.to_dict()["first_file_seconds"] is None
+
+        report.add(Path("1.nef"), {"seconds": 1.0})
+        first = report.first_file_seconds
+        report.add(Path("2.nef"), {"seconds": 1.0})
+
+        assert first is not None and first >= 5.0
+        assert report.to_dict()["first_file_seconds"] == first
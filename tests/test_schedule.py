@@ -0,0 +1,56 @@
+"""
+Tests for work ordering
+
+Covers cost estimates from raw headers and schedules.
+"""
+
+import pytest
+
+from src.nef_converter.schedule import estimate_cost, order_files
+from src.nef_converter.synthetic import write_synthetic_raw
+
+
+class TestEstimateCost:
+    """Test cases for estimate_cost()."""
+
+    def test_reads_raw_dimensions(self, tmp_path):
+        """Test that the cost is the raw image's sample count."""
+        path = write_synthetic_raw(tmp_path / "a.nef", width=400, height=300)
+        assert estimate_cost(path) == 400 * 300
+
+    def test_falls_back_to_file_size(self, tmp_path):
+        """Test files without a readable TIFF header."""
+        path = tmp_path / "a.nef"
+        path.write_bytes(b"\x00" * 5000)
+        assert estimate_cost(path) == 5000.0
+        assert estimate_cost(tmp_path / "missing.nef") == 0.0
+
+
+class TestOrderFiles:
+    """Test cases for order_files()."""
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        """Write raws of different sizes, in discovery order."""
+        sizes = {"mid.nef": 300, "small.nef": 100, "huge.nef": 600, "tie.nef": 300}
+        return [
+            write_synthetic_raw(tmp_path / name, width=size, height=size)
+            for name, size in sizes.items()
+        ]
+
+    @pytest.mark.parametrize(
+        "schedule, expected",
+        [
+            ("discovery", ["mid", "small", "huge", "tie"]),
+            ("largest", ["huge", "mid", "tie", "small"]),
+            ("smallest", ["small", "mid", "tie", "huge"]),
+        ],
+    )
+    def test_schedules(self, files, schedule, expected):
+        """Test each schedule; equal costs keep discovery order."""
+        assert [path.stem for path in order_files(files, schedule)] == expected
+
+    def test_rejects_unknown_schedule(self, files):
+        """Test that an unknown schedule raises ValueError."""
+        with pytest.raises(ValueError):
+            order_files(files, "random")
@@ -0,0 +1,322 @@
+"""
+Tests for the conversion server
+
+Covers the job API over TCP and Unix sockets, and job priorities.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from src.nef_converter.converter import NEFConverter
+from src.nef_converter.server import (
+    ConversionServer,
+    HTTPError,
+    Job,
+    parse_priority,
+)
+from src.nef_converter.synthetic import make_synthetic_raw, write_synthetic_raw
+
+
+async def _request(server, method, path, body=b"", headers=None, socket_path=None):
+    """Send one HTTP request and return (status, headers, body)."""
+    if socket_path is not None:
+        reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    if method == "POST":
+        lines.append(f"Content-Length: {len(body)}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode().split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in header_lines)
+    return int(status_line.split()[1]), response_headers, content
+
+
+def _json(server, method, path, payload=None, **kwargs):
+    """Send a request with an optional JSON body."""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    headers = {"Content-Type": "application/json"} if payload is not None else {}
+    return _request(server, method, path, body, headers, **kwargs)
+
+
+class TestConversionServer:
+    """Test cases for the ConversionServer class."""
+
+    def test_parse_priority(self):
+        """Test named, numeric and invalid priorities."""
+        assert parse_priority(None) == 5
+        assert parse_priority("Interactive") == 0
+        assert parse_priority("bulk") == 10
+        assert parse_priority("3") == 3
+        assert parse_priority(-1) == -1
+        with pytest.raises(HTTPError):
+            parse_priority("urgent")
+
+    def test_path_and_upload_jobs(self, tmp_path):
+        """Test submitting a path and raw bytes, then fetching results."""
+        source = write_synthetic_raw(tmp_path / "frame.nef", width=300, height=200)
+        server = ConversionServer(
+            NEFConverter(executor="thread"), workers=1, roots=[tmp_path]
+        )
+
+        async def scenario():
+            await server.start(port=0)
+            try:
+                status, _, body = await _json(
+                    server, "POST", "/jobs", {"path": str(source)}
+                )
+                assert status == 202
+                path_job = json.loads(body)["id"]
+
+                status, _, body = await _request(
+                    server,
+                    "POST",
+                    "/jobs?name=upload.nef&priority=interactive",
+                    make_synthetic_raw(300, 200, seed=1),
+                )
+                assert status == 202
+                upload_job = json.loads(body)
+
+                status, headers, jpeg = await _request(
+                    server, "GET", f"/jobs/{upload_job['id']}/result"
+                )
+                assert status == 200
+                assert headers["Content-Type"] == "image/jpeg"
+                assert jpeg[:2] == b"\xff\xd8"
+
+                status, _, written = await _request(
+                    server, "GET", f"/jobs/{path_job}/result"
+                )
+                assert status == 200
+                assert written == (tmp_path / "export" / "frame.jpg").read_bytes()
+
+                _, _, body = await _json(server, "GET", f"/jobs/{path_job}")
+                assert json.loads(body)["state"] == "done"
+                _, _, body = await _json(server, "GET", "/health")
+                assert json.loads(body)["jobs"] == {"done": 2}
+            finally:
+                await server.close()
+
+        asyncio.run(scenario())
+
+        with Image.open(tmp_path / "export" / "frame.jpg") as img:
+            assert img.size == (300, 200)
+
+    def test_errors(self, tmp_path):
+        """Test unknown jobs, bad submissions and failed conversions."""
+        server = ConversionServer(
+            NEFConverter(executor="thread"), workers=1, roots=[tmp_path]
+        )
+
+        async def scenario():
+            await server.start(port=0)
+            try:
+                status, _, _ = await _request(server, "GET", "/jobs/missing")
+                assert status == 404
+                status, _, _ = await _json(server, "POST", "/jobs", {"file": "x"})
+                assert status == 400
+                status, _, _ = await _request(server, "DELETE", "/jobs/x")
+                assert status == 405
+                for length in ("abc", "-1"):
+                    status, _, _ = await _request(
+                        server, "GET", "/health", headers={"Content-Length": length}
+                    )
+                    assert status == 400
+
+                _, _, body = await _json(
+                    server, "POST", "/jobs", {"path": str(tmp_path / "none.nef")}
+                )
+                job_id = json.loads(body)["id"]
+                status, _, body = await _request(
+                    server, "GET", f"/jobs/{job_id}/result"
+                )
+                assert status == 409
+                _, _, body = await _json(server, "GET", f"/jobs/{job_id}")
+                assert json.loads(body)["state"] == "failed"
+            finally:
+                await server.close()
+
+        asyncio.run(scenario())
+
+    def test_path_jobs_are_confined_to_roots(self, tmp_path):
+        """Test that path jobs outside the roots, or without roots, are refused."""
+        root = tmp_path / "photos"
+        root.mkdir()
+        (root / "escape").symlink_to(tmp_path)
+        confined = ConversionServer(
+            NEFConverter(executor="thread"), workers=1, roots=[root]
+        )
+        unconfined = ConversionServer(NEFConverter(executor="thread"), workers=1)
+
+        async def scenario():
+            await confined.start(port=0)
+            await unconfined.start(port=0)
+            try:
+                for spec in (
+                    {"path": str(tmp_path / "other.nef")},
+                    {"path": str(root / ".." / "other.nef")},
+                    {"path": str(root / "escape" / "other.nef")},
+                    {"path": str(root / "a.nef"), "output": str(tmp_path / "a.jpg")},
+                    {"path": str(root / "a.nef"), "output": "/etc/passwd"},
+                ):
+                    status, _, _ = await _json(confined, "POST", "/jobs", spec)
+                    assert status == 403, spec
+                status, _, _ = await _json(
+                    unconfined, "POST", "/jobs", {"path": str(root / "a.nef")}
+                )
+                assert status == 403
+
+                status, _, body = await _json(
+                    confined, "POST", "/jobs", {"path": str(root / "a.nef")}
+                )
+                assert status == 202
+                job = confined.jobs[json.loads(body)["id"]]
+                assert job.output == root.resolve() / "export" / "a.jpg"
+            finally:
+                await confined.close()
+                await unconfined.close()
+
+        asyncio.run(scenario())
+
+    def test_refuses_non_loopback_hosts(self):
+        """Test that the server does not listen on other interfaces."""
+        server = ConversionServer(NEFConverter(executor="thread"), workers=1)
+        with pytest.raises(ValueError, match="loopback"):
+            asyncio.run(server.start("0.0.0.0", 0))
+
+    def test_upload_results_are_released_beyond_the_byte_limit(self):
+        """Test that the oldest upload results are released, the newest kept."""
+        server = ConversionServer(NEFConverter(executor="thread"), workers=1)
+
+        async def scenario():
+            jobs = [
+                Job(f"job{i}", 5, f"{i}.nef", results=[b"x" * 60]) for i in (0, 1, 2)
+            ]
+            for job in jobs:
+                job.state = "done"
+                job.done.set()
+                server.jobs[job.id] = job
+                server._retire(job)
+
+            assert [job.released for job in jobs] == [True, True, False]
+            assert jobs[0].results == [] and jobs[2].results == [b"x" * 60]
+            assert jobs[0].to_dict()["released"] is True
+            assert server._retained_bytes == 60
+            with pytest.raises(HTTPError) as error:
+                await server._send_result(None, jobs[0], {})
+            assert error.value.status == 410
+
+        with patch("src.nef_converter.server.MAX_RETAINED_RESULT_BYTES", 100):
+            asyncio.run(scenario())
+
+    def test_uploads_are_refused_beyond_the_queued_byte_limit(self):
+        """Test that queued upload bytes are bounded, and freed once converted."""
+        release = threading.Event()
+
+        def fake_convert(args):
+            release.wait(5)
+            return True, [b"jpeg"], {"seconds": 0.0}
+
+        server = ConversionServer(NEFConverter(executor="thread"), workers=1)
+
+        async def scenario():
+            await server.start(port=0)
+            try:
+                status, _, body = await _request(server, "POST", "/jobs", b"x" * 60)
+                assert status == 202
+                first = json.loads(body)["id"]
+
+                # Refused from its Content-Length, and through the Python API
+                status, _, _ = await _request(server, "POST", "/jobs", b"y" * 60)
+                assert status == 503
+                with pytest.raises(HTTPError) as error:
+                    server.submit(b"y" * 60)
+                assert error.value.status == 503
+                _, _, body = await _json(server, "GET", "/health")
+                assert json.loads(body)["upload_bytes"] == 60
+
+                release.set()
+                await asyncio.wait_for(server.jobs[first].done.wait(), 5)
+                assert server._upload_bytes == 0
+                status, _, _ = await _request(server, "POST", "/jobs", b"y" * 60)
+                assert status == 202
+            finally:
+                await server.close()
+
+        with (
+            patch("src.nef_converter.server.MAX_QUEUED_UPLOAD_BYTES", 100),
+            patch.object(
+                NEFConverter, "_convert_memory_task", staticmethod(fake_convert)
+            ),
+        ):
+            asyncio.run(scenario())
+
+    def test_unix_socket(self, tmp_path):
+        """Test the API over a Unix socket."""
+        socket_path = tmp_path / "nef.sock"
+        server = ConversionServer(NEFConverter(executor="thread"), workers=1)
+
+        async def scenario():
+            await server.start(socket_path=socket_path)
+            try:
+                assert server.address == f"unix:{socket_path}"
+                status, _, body = await _request(
+                    server, "GET", "/health", socket_path=socket_path
+                )
+                assert status == 200
+                assert json.loads(body)["workers"] == 1
+            finally:
+                await server.close()
+
+        asyncio.run(scenario())
+
+    def test_interactive_jobs_overtake_bulk(self, tmp_path):
+        """Test that queued jobs run in priority order."""
+        order = []
+        release = threading.Event()
+
+        def fake_convert(args):
+            _, nef_path, _ = args
+            if nef_path.name == "blocker.nef":
+                release.wait(5)
+            order.append(nef_path.name)
+            return True, nef_path, {"seconds": 0.0}
+
+        server = ConversionServer(NEFConverter(executor="thread"), workers=1)
+
+        async def scenario():
+            await server.start(port=0)
+            try:
+                jobs = [server.submit(tmp_path / "blocker.nef", "bulk")]
+                await asyncio.sleep(0.05)  # the blocker occupies the worker
+                jobs += [
+                    server.submit(tmp_path / f"bulk{i}.nef", "bulk") for i in (1, 2)
+                ]
+                jobs.append(server.submit(tmp_path / "click.nef", "interactive"))
+                release.set()
+                await asyncio.wait_for(
+                    asyncio.gather(*[job.done.wait() for job in jobs]), 5
+                )
+            finally:
+                await server.close()
+
+        with patch.object(
+            NEFConverter, "_convert_single_file", staticmethod(fake_convert)
+        ):
+            start = time.monotonic()
+            asyncio.run(scenario())
+
+        assert order == ["blocker.nef", "click.nef", "bulk1.nef", "bulk2.nef"]
+        assert time.monotonic() - start < 5
@@ -0,0 +1,63 @@
+"""
+Tests for start-up profiling and lazy imports
+
+Covers the fresh-interpreter measurements behind --profile-startup.
+"""
+
+import subprocess
+import sys
+
+from src.nef_converter.startup import (
+    PACKAGE_ROOT,
+    format_startup_profile,
+    import_times,
+    time_version_command,
+)
+
+
+class TestStartup:
+    """Test cases for start-up profiling."""
+
+    def test_package_import_is_lazy(self):
+        """Test that importing the package and CLI skips the pipeline."""
+        code = (
+            "import sys, nef_converter, nef_converter.cli; "
+            "heavy = {'rawpy', 'numpy', 'PIL', 'tkinter', 'tqdm'}; "
+            "print(sorted(heavy & set(sys.modules)))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=PACKAGE_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_lazy_attributes_resolve(self):
+        """Test that public names are importable from the package."""
+        import src.nef_converter as package
+        from src.nef_converter.converter import NEFConverter
+
+        assert package.NEFConverter is NEFConverter
+        assert "NEFConverter" in dir(package)
+
+    def test_version_command_is_timed(self):
+        """Test timing --version in a fresh interpreter."""
+        assert 0 < time_version_command(runs=1) < 30
+
+    def test_import_times_report_requested_modules(self):
+        """Test parsing of -X importtime output."""
+        times = import_times(modules=("numpy", "nef_converter.converter"))
+
+        assert set(times) == {"numpy", "nef_converter.converter"}
+        assert times["nef_converter.converter"] >= times["numpy"] > 0
+
+    def test_profile_lines(self):
+        """Test the printed profile."""
+        lines = format_startup_profile(0.05, 0.5)
+
+        assert lines[0].startswith("nef2jpg --version:")
+        assert "CLI ready: 0.050s" in lines
+        assert "First file converted: 0.500s" in lines
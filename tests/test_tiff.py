@@ -0,0 +1,74 @@
+"""
+Tests for TIFF serialisation
+
+Covers the native RGB TIFF writer.
+"""
+
+import io
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.nef_converter.exif import EXIF_IFD, GPS_IFD, MAKER_NOTE, build_exif
+from src.nef_converter.tiff import STRIP_BYTES, write_rgb_tiff
+
+
+class TestWriteRGBTiff:
+    """Test cases for write_rgb_tiff."""
+
+    @pytest.mark.parametrize("compression", ["none", "deflate"])
+    def test_round_trip(self, compression):
+        """Test that Pillow decodes the pixels, predictor included."""
+        y, x = np.mgrid[0:300, 0:700]
+        rgb = np.stack([x * 90, y * 200, (x + y) * 60], axis=-1).astype(np.uint16)
+        assert rgb.nbytes > STRIP_BYTES
+
+        data = write_rgb_tiff(rgb, compression)
+
+        with Image.open(io.BytesIO(data)) as img:
+            assert img.size == (700, 300)
+            assert img.tag_v2[0x0102] == (16, 16, 16)
+            # Pillow reads 16-bit RGB as 8-bit, keeping the high bytes
+            np.testing.assert_array_equal(np.asarray(img), rgb >> 8)
+
+    def test_embeds_exif_sub_ifds(self):
+        """Test that big-endian EXIF is relocated into the little-endian TIFF."""
+        maker_note = b"Nikon\x00\x02\x10\x00\x00MM\x00*\x00\x00\x00\x08"
+        exif_data = build_exif(
+            ">",
+            {0x010F: (2, 6, b"NIKON\x00"), 0x0128: (3, 1, b"\x00\x03")},
+            exif={
+                0x829A: (5, 1, struct.pack(">II", 1, 250)),
+                MAKER_NOTE: (7, len(maker_note), maker_note),
+            },
+            gps={0x0006: (5, 1, struct.pack(">II", 1234, 10))},
+        )
+        rgb = np.zeros((20, 30, 3), dtype=np.uint8)
+
+        data = write_rgb_tiff(rgb, "deflate", exif_data=exif_data)
+
+        with Image.open(io.BytesIO(data)) as img:
+            exif = img.getexif()
+            assert (exif[0x010F], exif[0x0128]) == ("NIKON", 3)
+            assert exif.get_ifd(EXIF_IFD)[0x829A] == 1 / 250
+            assert exif.get_ifd(EXIF_IFD)[MAKER_NOTE] == maker_note
+            assert exif.get_ifd(GPS_IFD)[0x0006] == 123.4
+            np.testing.assert_array_equal(np.asarray(img), rgb)
+
+    def test_deflate_shrinks_smooth_data(self):
+        """Test that the predictor makes smooth gradients compress well."""
+        rgb = np.tile(np.arange(256, dtype=np.uint16) * 256, (64, 1))
+        rgb = np.repeat(rgb[..., None], 3, axis=-1)
+
+        assert len(write_rgb_tiff(rgb, "deflate")) < rgb.nbytes // 20
+
+    def test_rejects_unsupported_arrays(self):
+        """Test validation of shape, dtype and compression."""
+        with pytest.raises(ValueError):
+            write_rgb_tiff(np.zeros((4, 4), dtype=np.uint16))
+        with pytest.raises(ValueError):
+            write_rgb_tiff(np.zeros((4, 4, 3), dtype=np.float32))
+        with pytest.raises(ValueError):
+            write_rgb_tiff(np.zeros((4, 4, 3), dtype=np.uint8), "lzw")
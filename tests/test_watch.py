@@ -0,0 +1,222 @@
+"""
+Tests for NEF Converter watch mode
+
+Covers event filtering, write-completion detection and pool-backed
+submission of new files.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from watchdog.events import FileClosedEvent, FileCreatedEvent, FileMovedEvent
+
+from src.nef_converter import watch
+from src.nef_converter.converter import NEFConverter
+from src.nef_converter.synthetic import make_synthetic_raw
+from src.nef_converter.watch import NEFWatchHandler
+
+
+def _recording_convert(results):
+    """Build a stand-in for _convert_single_file that records its calls."""
+    calls = []
+
+    def fake_convert(args):
+        _, nef_path, _ = args
+        calls.append(nef_path)
+        return results.pop(0) if results else (True, nef_path, {})
+
+    return calls, staticmethod(fake_convert)
+
+
+class TestNEFWatchHandler:
+    """Test cases for the NEFWatchHandler class."""
+
+    def test_ignores_non_nef_files(self, tmp_path):
+        """Test that files without a .nef extension are ignored."""
+        calls, fake = _recording_convert([])
+        with patch.object(NEFConverter, "_convert_single_file", fake):
+            handler = NEFWatchHandler(NEFConverter(), tmp_path)
+            handler.on_closed(FileClosedEvent(str(tmp_path / "photo.jpg")))
+
+        assert calls == []
+
+    def test_waits_for_size_to_settle(self, tmp_path):
+        """Test that a created file is only converted once it stops growing."""
+        nef = tmp_path / "a.nef"
+        nef.write_bytes(b"partial")
+        calls, fake = _recording_convert([])
+
+        with patch.object(NEFConverter, "_convert_single_file", fake):
+            handler = NEFWatchHandler(NEFConverter(), tmp_path)
+            handler.on_created(FileCreatedEvent(str(nef)))
+            handler.poll_pending()
+            nef.write_bytes(b"partial plus the rest")
+            handler.poll_pending()
+            handler.poll_pending()
+            assert calls == []
+
+            handler.poll_pending()
+
+        assert calls == [nef]
+        assert str(nef) in handler.processed_files
+
+    def test_moved_file_is_converted_immediately(self, tmp_path):
+        """Test that a file renamed into place skips the settle polling."""
+        calls, fake = _recording_convert([])
+        with patch.object(NEFConverter, "_convert_single_file", fake):
+            handler = NEFWatchHandler(NEFConverter(), tmp_path)
+            handler.on_moved(
+                FileMovedEvent(str(tmp_path / ".a.nef.part"), str(tmp_path / "a.nef"))
+            )
+
+        assert calls == [tmp_path / "a.nef"]
+
+    def test_retries_truncated_file_with_backoff(self, tmp_path):
+        """Test that a truncated-file error requeues the file."""
+        nef = tmp_path / "a.nef"
+        nef.write_bytes(b"complete")
+        calls, fake = _recording_convert(
+            [(False, nef, {"error": "Input/output error"})]
+        )
+
+        with (
+            patch.object(NEFConverter, "_convert_single_file", fake),
+            patch.object(watch, "RETRY_DELAYS", (0.0,)),
+        ):
+            handler = NEFWatchHandler(NEFConverter(), tmp_path)
+            handler.on_closed(FileClosedEvent(str(nef)))
+            for _ in range(watch.SETTLE_CHECKS + 1):
+                handler.poll_pending()
+
+        assert calls == [nef, nef]
+        assert str(nef) in handler.processed_files
+
+    def test_corrupt_file_fails_without_retrying(self, tmp_path):
+        """Test that only truncation errors are retried."""
+        nef = tmp_path / "a.nef"
+        nef.write_bytes(b"complete")
+        calls, fake = _recording_convert(
+            [(False, nef, {"error": "Corrupt JPEG data: bad Huffman code"})]
+        )
+
+        with patch.object(NEFConverter, "_convert_single_file", fake):
+            handler = NEFWatchHandler(NEFConverter(), tmp_path)
+            handler.on_closed(FileClosedEvent(str(nef)))
+            for _ in range(watch.SETTLE_CHECKS + 1):
+                handler.poll_pending()
+
+        assert calls == [nef]
+        assert str(nef) not in handler.processed_files
+        assert watch._is_truncation_error("Corrupted data or unexpected EOF")
+        assert not watch._is_truncation_error("data corrupted at 1024")
+
+    def test_real_truncated_raw_is_recognised(self, tmp_path):
+        """Test the hints against what rawpy raises for a raw cut in half."""
+        data = make_synthetic_raw(width=300, height=200)
+        nef = tmp_path / "a.nef"
+        nef.write_bytes(data[: len(data) // 2])
+        converter = NEFConverter()
+
+        success, _, file_stats = NEFConverter._convert_single_file(
+            (converter, nef, tmp_path / "a.jpg")
+        )
+
+        assert not success
+        assert watch._is_truncation_error(file_stats["error"])
+
+        nef.write_bytes(data)
+        success, _, file_stats = NEFConverter._convert_single_file(
+            (converter, nef, tmp_path / "a.jpg")
+        )
+        assert success, file_stats
+
+    def test_submits_to_pool_with_backpressure(self, tmp_path):
+        """Test that events are queued to the pool and bounded in flight."""
+        release = threading.Event()
+        running = []
+
+        def fake_convert(args):
+            _, nef_path, _ = args
+            running.append(nef_path)
+            release.wait(5)
+            return True, nef_path, {}
+
+        with (
+            patch.object(
+                NEFConverter, "_convert_single_file", staticmethod(fake_convert)
+            ),
+            ThreadPoolExecutor(max_workers=4) as executor,
+        ):
+            handler = NEFWatchHandler(
+                NEFConverter(), tmp_path, executor, max_in_flight=2
+            )
+            for name in ("a.nef", "b.nef"):
+                handler.on_closed(FileClosedEvent(str(tmp_path / name)))
+
+            # A third file must wait until one of the first two finishes
+            third = threading.Thread(
+                target=handler.on_closed,
+                args=(FileClosedEvent(str(tmp_path / "c.nef")),),
+            )
+            third.start()
+            third.join(0.2)
+            assert third.is_alive()
+
+            release.set()
+            third.join(5)
+
+        assert {p.name for p in running} == {"a.nef", "b.nef", "c.nef"}
+        assert {Path(p).name for p in handler.processed_files} == {
+            "a.nef",
+            "b.nef",
+            "c.nef",
+        }
+
+    def test_file_waiting_for_a_slot_is_submitted_once(self, tmp_path):
+        """Test that a file found twice while waiting for a slot runs once."""
+        release = threading.Event()
+        running = []
+
+        def fake_convert(args):
+            _, nef_path, _ = args
+            running.append(nef_path)
+            release.wait(5)
+            return True, nef_path, {}
+
+        with (
+            patch.object(
+                NEFConverter, "_convert_single_file", staticmethod(fake_convert)
+            ),
+            ThreadPoolExecutor(max_workers=2) as executor,
+        ):
+            handler = NEFWatchHandler(
+                NEFConverter(), tmp_path, executor, max_in_flight=1
+            )
+            handler.on_closed(FileClosedEvent(str(tmp_path / "a.nef")))
+
+            # The observer and the poller both find b.nef while a.nef blocks
+            waiters = [
+                threading.Thread(
+                    target=handler.on_closed,
+                    args=(FileClosedEvent(str(tmp_path / "b.nef")),),
+                ),
+                threading.Thread(
+                    target=handler.on_moved,
+                    args=(
+                        FileMovedEvent(
+                            str(tmp_path / "b.nef.part"), str(tmp_path / "b.nef")
+                        ),
+                    ),
+                ),
+            ]
+            for waiter in waiters:
+                waiter.start()
+            for waiter in waiters:
+                waiter.join(0.2)
+            release.set()
+            for waiter in waiters:
+                waiter.join(5)
+
+        assert sorted(p.name for p in running) == ["a.nef", "b.nef"]